@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""增量回填清单 - V6.1.0
+
+每个成员一份清单（cache_dir/manifests/{成员}.json），记录每个日期的缓存由哪些输入生成：
+
+    {
+      "version": 1,
+      "member": "张三",
+      "entries": {
+        "2026-03-01": {
+          "config": "<配置指纹>",
+          "sources": {"/path/HealthAutoExport-2026-03-01.json": {"size": ..., "mtime_ns": ..., "blake2b": "..."},
+                      "/path/Workout Data/2026-03-01.json": null},     # null = 探测过但不存在
+          "cache": {"file": "2026-03-01_张三.json", "size": ..., "mtime_ns": ..., "blake2b": "..."}  # 无数据时为 null
+        }
+      }
+    }
+
+generate_cache_only.py --incremental 据此只重算输入变化的日期：
+- 源文件 size 变化、出现/消失 -> 变化；只有 mtime 变化时比对内容哈希（同步工具常见）
+- 与缓存相关的配置（成员档案、目录、sleep_config、report_metrics）变化 -> 变化
+- 缓存文件被删除或被其它流程改写 -> 重算
+
+cache.file 为相对 cache_dir 的路径（cache_layout=sharded 时含 成员/年/月 子目录）。
+
+SQLite 历史存储（history_backend=sqlite）下 cache 记录为 {"blake2b": "..."}，与存储中的文档哈希比对。
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from export_snapshot import file_digest
+from utils import atomic_write_json, directory_index, safe_member_name
+
+MANIFEST_VERSION = 1
+MANIFEST_DIRNAME = 'manifests'
+
+# 影响每日缓存内容的顶层配置项
+_CONFIG_KEYS = ('sleep_config', 'report_metrics')
+
+
+def config_fingerprint(config: Dict[str, Any], member_cfg: Dict[str, Any]) -> str:
+    """与缓存内容相关的配置指纹"""
+    relevant = {key: config.get(key) for key in _CONFIG_KEYS}
+    relevant['member'] = member_cfg
+    raw = json.dumps(relevant, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _stat(path: Path, indexed: bool = True) -> Optional[Tuple[int, int]]:
+    """(size, mtime_ns)；文件不存在返回 None
+
+    indexed=True 时存在性先查目录索引，避免逐个 stat 缺失候选；
+    回填过程中持续写入的缓存目录不走索引（每次写入都会使索引失效）。
+    """
+    if indexed and not directory_index(path.parent).exists(path.name):
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def cache_relpath(cache_dir: Path, cache_file: Path) -> str:
+    """缓存文件相对 cache_dir 的路径（sharded 布局含 成员/年/月 子目录）"""
+    try:
+        return cache_file.relative_to(cache_dir).as_posix()
+    except ValueError:
+        return cache_file.name
+
+
+class CacheManifest:
+    """单个成员的增量回填清单"""
+
+    def __init__(self, cache_dir: Union[str, Path], member_name: str):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.member_name = member_name
+        self.path = self.cache_dir / MANIFEST_DIRNAME / f'{safe_member_name(member_name)}.json'
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # 本次运行内的文件哈希缓存（同一导出文件会被相邻两天引用）
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get('version') == MANIFEST_VERSION:
+            entries = data.get('entries')
+            if isinstance(entries, dict):
+                self.entries = entries
+
+    def save(self) -> None:
+        atomic_write_json(self.path, {'version': MANIFEST_VERSION, 'member': self.member_name, 'entries': self.entries},
+                          indent=1, sort_keys=True)
+
+    # ---------- 文件状态 ----------
+
+    def _digest(self, path: Path, size: int, mtime_ns: int) -> str:
+        key = str(path)
+        cached = self._digests.get(key)
+        if cached is not None and cached[:2] == (size, mtime_ns):
+            return cached[2]
+        digest = file_digest(path)
+        self._digests[key] = (size, mtime_ns, digest)
+        return digest
+
+    def _same_file(self, path: Path, recorded: Optional[Dict[str, Any]], indexed: bool = True) -> bool:
+        current = _stat(path, indexed)
+        if recorded is None or current is None:
+            return recorded is None and current is None
+        size, mtime_ns = current
+        if recorded.get('size') != size:
+            return False
+        if recorded.get('mtime_ns') == mtime_ns:
+            return True
+        # 只有 mtime 变化：内容哈希一致视为未变，并记下新的 mtime
+        if recorded.get('blake2b') != self._digest(path, size, mtime_ns):
+            return False
+        recorded['mtime_ns'] = mtime_ns
+        return True
+
+    def _describe(self, path: Path, previous: Optional[Dict[str, Any]] = None,
+                  indexed: bool = True) -> Optional[Dict[str, Any]]:
+        current = _stat(path, indexed)
+        if current is None:
+            return None
+        size, mtime_ns = current
+        if previous and previous.get('size') == size and previous.get('mtime_ns') == mtime_ns:
+            digest = previous.get('blake2b')
+        else:
+            digest = self._digest(path, size, mtime_ns)
+        return {'size': size, 'mtime_ns': mtime_ns, 'blake2b': digest}
+
+    # ---------- 查询 / 记录 ----------
+
+    def is_fresh(self, date_str: str, sources: Iterable[Path], fingerprint: str, store=None) -> bool:
+        """该日期的缓存（或"无数据"结论）是否仍与当前输入一致
+
+        store 为非文件存储（SQLite）时按文档哈希检查缓存是否仍在且未被改写。
+        """
+        entry = self.entries.get(date_str)
+        if not entry or entry.get('config') != fingerprint:
+            return False
+        recorded_sources = entry.get('sources') or {}
+        sources = [Path(p) for p in sources]
+        if set(recorded_sources) != {str(p) for p in sources}:
+            return False
+        for path in sources:
+            if not self._same_file(path, recorded_sources[str(path)]):
+                return False
+        if entry.get('cache') is None:
+            return True
+        return self.cache_current(date_str, store)
+
+    def cache_current(self, date_str: str, store=None) -> bool:
+        """记录的缓存输出是否仍与当前缓存一致（不检查输入文件）"""
+        cache = (self.entries.get(date_str) or {}).get('cache')
+        if not cache:
+            return False
+        if 'file' not in cache:
+            return store is not None and store.digest(date_str, self.member_name) == cache.get('blake2b')
+        return self._same_file(self.cache_dir / cache['file'], cache, indexed=False)
+
+    def update_cache(self, date_str: str, cache_file: Optional[Path] = None,
+                     cache_digest: Optional[str] = None) -> None:
+        """缓存被就地改写（rescore.py 只重算评分字段）后更新输出记录，输入与配置记录保持不变"""
+        entry = self.entries.get(date_str)
+        if not entry:
+            return
+        if cache_digest is not None:
+            entry['cache'] = {'blake2b': cache_digest}
+        elif cache_file is not None:
+            described = self._describe(Path(cache_file), indexed=False)
+            if described is not None:
+                described['file'] = cache_relpath(self.cache_dir, Path(cache_file))
+            entry['cache'] = described
+
+    def cache_digest(self, date_str: str) -> Optional[str]:
+        cache = (self.entries.get(date_str) or {}).get('cache')
+        return cache.get('blake2b') if cache else None
+
+    def describe_sources(self, date_str: str, sources: Iterable[Path]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """生成前记录输入文件状态（生成期间源文件被同步改写时，下次仍会判定为变化）"""
+        previous_sources = (self.entries.get(date_str) or {}).get('sources') or {}
+        return {str(p): self._describe(Path(p), previous_sources.get(str(p))) for p in sources}
+
+    def record(self, date_str: str, source_states: Dict[str, Optional[Dict[str, Any]]], fingerprint: str,
+               cache_file: Optional[Path], cache_digest: Optional[str] = None) -> Optional[str]:
+        """记录本次生成的输入（describe_sources 的结果）与输出，返回缓存文件哈希（无数据时为 None）
+
+        cache_digest 给出时（SQLite 存储）直接记录文档哈希，不检查文件。
+        """
+        entry = {
+            'config': fingerprint,
+            'sources': source_states,
+            'cache': None,
+        }
+        if cache_digest is not None:
+            entry['cache'] = {'blake2b': cache_digest}
+        elif cache_file is not None:
+            described = self._describe(Path(cache_file), indexed=False)
+            if described is not None:
+                described['file'] = cache_relpath(self.cache_dir, Path(cache_file))
+                entry['cache'] = described
+        self.entries[date_str] = entry
+        return entry['cache']['blake2b'] if entry['cache'] else None
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""每日缓存读取（进程级 LRU）- V6.1.0
+
+HealthScoreHistory、HealthAlertDetector 与周报/月报 load_cache 都经由 history_store 读取每日缓存，
+存储后端的读取再统一经过这里，一次运行中同一天的缓存只解码一次：
+- json 后端：read_cache_json(path)，按路径缓存解析结果，(mtime_ns, size) 校验，文件被改写后自动重新解析
+- sqlite 后端：以 daily_cache.digest 校验（get_or_load，范围读取用 lookup / remember 一次取回未命中的日期）
+- 条目数上限 CACHE_READER_MAX_ENTRIES，超出时淘汰最久未用的条目
+- cache_reader_stats() 返回命中/未命中计数
+
+注意: 返回值在多个调用方之间共享，调用方不得原地修改（merge_detail 等均返回新对象）。
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+# 约一年的单成员摘要；日报回看 30 天、周报/月报各读一到两个月，多成员批量运行时按最近使用淘汰
+CACHE_READER_MAX_ENTRIES = 512
+
+_cache: "OrderedDict[Hashable, Tuple[Any, Any]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {'hits': 0, 'misses': 0}
+
+
+def lookup(key: Hashable, signature: Any) -> Tuple[bool, Any]:
+    """(是否命中, 值)；未命中时由调用方加载后 remember()（批量加载时一次取回全部未命中的条目）"""
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == signature:
+            _cache.move_to_end(key)
+            _cache_stats['hits'] += 1
+            return True, entry[1]
+        _cache_stats['misses'] += 1
+    return False, None
+
+
+def remember(key: Hashable, signature: Any, value: Any) -> None:
+    with _cache_lock:
+        _cache[key] = (signature, value)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_READER_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def get_or_load(key: Hashable, signature: Any, loader: Callable[[], Any]) -> Any:
+    """signature 与缓存条目一致时直接返回，否则调用 loader() 并缓存结果"""
+    hit, value = lookup(key, signature)
+    if hit:
+        return value
+    value = loader()
+    remember(key, signature, value)
+    return value
+
+
+def read_cache_json(path: Union[str, Path]) -> Optional[Any]:
+    """读取 JSON 缓存文件，文件不存在时返回 None（不计入命中统计）
+
+    json.JSONDecodeError 原样抛出，由调用方按各自策略处理。
+    """
+    key = os.fspath(path)
+    try:
+        st = os.stat(key)
+    except FileNotFoundError:
+        return None
+    signature = (st.st_mtime_ns, st.st_size)
+    hit, value = lookup(key, signature)
+    if hit:
+        return value
+    try:
+        with open(key, 'r', encoding='utf-8') as f:
+            value = json.load(f)
+    except FileNotFoundError:
+        # stat 与 open 之间被删除（原子替换不会出现这种情况）
+        return None
+    remember(key, signature, value)
+    return value
+
+
+def invalidate(key: Hashable) -> None:
+    """写入方改写缓存后丢弃旧条目"""
+    with _cache_lock:
+        _cache.pop(os.fspath(key) if isinstance(key, Path) else key, None)
+
+
+def clear_cache_reader() -> None:
+    """清空缓存（测试或长驻进程中手动释放内存时使用）"""
+    with _cache_lock:
+        _cache.clear()
+
+
+def cache_reader_stats() -> Dict[str, int]:
+    """返回缓存命中统计"""
+    with _cache_lock:
+        return {**_cache_stats, 'entries': len(_cache)}
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""Health Auto Export 导出文件读取 - V6.1.0
+
+- 进程级解析缓存：同一导出文件在一次运行中只解析一次
+  （日报的指标/睡眠/运动读取、批量缓存生成的 N / N-1 天共用）
+- 缓存键为文件路径，按 (mtime, size) 校验，文件变化后自动重新解析
+- 超大文件（秒级心率可达数百 MB）走流式解析：逐条遍历
+  data.metrics[*].data[*] 与 data.workouts，边读边累计每个指标的
+  count/total/min/max，只保留调用方需要的样本，峰值内存与文件大小无关
+- read_columns：指标样本一次性转换为列式存储（见 metric_columns.py）
+- read_sleep_index：睡眠会话按入睡时间建索引，睡眠窗口直接切片
+- 可选二进制快照（export_snapshot.py）：跨进程复用已解析的列与文档骨架，源文件未变时跳过 JSON 解码
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Container, Dict, Optional, Tuple, Union
+
+from export_snapshot import load_snapshot, snapshot_settings, write_snapshot
+from metric_columns import MetricColumns, SleepIndex, build_columns
+
+# 最多保留的缓存条目数（每个文件最多四条：文档、文档骨架、列式指标、睡眠索引）。
+# 批量回填时同时活跃的是：当日健康文件、次日健康文件（睡眠）、当日运动文件
+EXPORT_CACHE_MAX_ENTRIES = 12
+
+_export_cache: "OrderedDict[str, Tuple[Tuple[int, int], Any]]" = OrderedDict()
+_export_cache_lock = threading.Lock()
+_export_cache_stats = {'hits': 0, 'misses': 0}
+
+# 超过该大小（MB）的导出文件改用流式解析；config.json 中 export_stream_threshold_mb 可覆盖
+EXPORT_STREAM_THRESHOLD_MB = 64
+
+# 流式读取的单次读块大小（字符数）
+_STREAM_CHUNK_CHARS = 1 << 20
+
+# 始终完整保留样本的指标（睡眠记录按会话计，体积小且需要逐条解析）
+_ALWAYS_KEEP_METRICS = ('sleep_analysis',)
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# 数字之后仍可能属于该数字的字符（"1" | ".5"、"1e" | "3"）
+_NUMBER_TAIL = re.compile(r'[0-9.eE+\-]*\Z')
+_decoder = json.JSONDecoder()
+
+
+def _cache_key(path: Union[str, Path]) -> str:
+    return os.path.abspath(os.path.expanduser(str(path)))
+
+
+def file_signature(path: Union[str, Path]) -> Optional[Tuple[int, int]]:
+    """返回 (mtime_ns, size)，文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _cache_get(key: str, signature: Tuple[int, int]) -> Optional[Any]:
+    with _export_cache_lock:
+        entry = _export_cache.get(key)
+        if entry is not None and entry[0] == signature:
+            _export_cache.move_to_end(key)
+            _export_cache_stats['hits'] += 1
+            return entry[1]
+    return None
+
+
+def _cache_put(key: str, signature: Tuple[int, int], data: Any) -> None:
+    with _export_cache_lock:
+        _export_cache_stats['misses'] += 1
+        _export_cache[key] = (signature, data)
+        _export_cache.move_to_end(key)
+        while len(_export_cache) > EXPORT_CACHE_MAX_ENTRIES:
+            _export_cache.popitem(last=False)
+
+
+def load_export_json(path: Union[str, Path]) -> Optional[Any]:
+    """读取并解析导出 JSON 文件（进程级 LRU 缓存）
+
+    返回:
+        解析后的对象；文件不存在时返回 None
+
+    异常:
+        json.JSONDecodeError / OSError 原样抛出，由调用方按各自策略处理
+
+    注意: 返回值在多个调用方之间共享，调用方不得原地修改。
+    """
+    key = _cache_key(path)
+    signature = file_signature(key)
+    if signature is None:
+        return None
+
+    data = _cache_get(key, signature)
+    if data is not None:
+        return data
+
+    with open(key, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    _cache_put(key, signature, data)
+    return data
+
+
+class _TokenStream:
+    """按块读取 JSON 文本的最小游标
+
+    容器结构（对象/数组的括号、逗号、键）逐个 token 推进；
+    叶子值（单条样本、单个 workout、字符串键）交给 JSONDecoder.raw_decode，
+    缓冲区不足时按倍数追加读取，保证超长值也是线性时间。
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(max(_STREAM_CHUNK_CHARS, len(self._buf) - self._pos))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """跳过空白并返回下一个字符；文件结束返回空串"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"导出文件格式错误: 期望 {ch!r}，实际 {got!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        """解码下一个完整 JSON 值"""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # 数字可能被读块截断（如 "12" | "3"、"1." | "5"）：其后到缓冲区末尾只剩数字字符时补读后重试
+            if (isinstance(obj, (int, float)) and not isinstance(obj, bool)
+                    and _NUMBER_TAIL.match(self._buf, end) and self._fill()):
+                continue
+            self._pos = end
+            return obj
+
+    def iter_object(self):
+        """逐个产出对象的键；调用方必须在下一次迭代前消费对应的值"""
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            sep = self.peek()
+            self._pos += 1
+            if sep == '}':
+                return
+            if sep != ',':
+                raise ValueError(f"导出文件格式错误: 对象中出现 {sep!r}")
+
+    def iter_array(self):
+        """逐个产出数组下标；调用方必须在下一次迭代前消费对应的元素"""
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            sep = self.peek()
+            self._pos += 1
+            if sep == ']':
+                return
+            if sep != ',':
+                raise ValueError(f"导出文件格式错误: 数组中出现 {sep!r}")
+
+
+def _new_summary() -> Dict[str, Any]:
+    return {'count': 0, 'total': 0.0, 'min': None, 'max': None}
+
+
+def _stream_metric(ts: _TokenStream, keep, summary_only, sample_filter, sample_sink) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {}
+    kept = []
+    summary = _new_summary()
+    pending = None
+
+    def accept(name, sample):
+        if name in _ALWAYS_KEEP_METRICS:
+            kept.append(sample)
+            return
+        if sample_sink is not None:
+            sample_sink(name, sample)
+        if sample_filter is not None and not sample_filter(sample):
+            return
+        qty = sample.get('qty') if isinstance(sample, dict) else None
+        if isinstance(qty, (int, float)) and not isinstance(qty, bool):
+            summary['count'] += 1
+            summary['total'] += qty
+            if summary['min'] is None or qty < summary['min']:
+                summary['min'] = qty
+            if summary['max'] is None or qty > summary['max']:
+                summary['max'] = qty
+        if (keep is None or name in keep) and name not in summary_only:
+            kept.append(sample)
+
+    for key in ts.iter_object():
+        if key == 'data' and ts.peek() == '[':
+            name = entry.get('name')
+            if name is None:
+                # data 出现在 name 之前：暂存原始样本，等拿到指标名后再筛选
+                pending = [ts.value() for _ in ts.iter_array()]
+            else:
+                for _ in ts.iter_array():
+                    accept(name, ts.value())
+        else:
+            entry[key] = ts.value()
+
+    if pending is not None:
+        name = entry.get('name')
+        for sample in pending:
+            accept(name, sample)
+
+    entry['data'] = kept
+    if entry.get('name') not in _ALWAYS_KEEP_METRICS:
+        entry['summary'] = summary
+    return entry
+
+
+def stream_export(path: Union[str, Path],
+                  keep: Optional[Container[str]] = None,
+                  summary_only: Container[str] = (),
+                  sample_filter: Optional[Callable[[Any], bool]] = None,
+                  sample_sink: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+    """流式解析导出文件，返回与 json.load 同形的文档
+
+    参数:
+        keep: 需要保留样本的指标名集合；None 表示全部保留，空集合表示只要统计
+        summary_only: 即使在 keep 范围内也只统计、不保留样本的指标名
+        sample_filter: 样本过滤函数，只有通过过滤的样本参与统计和保留
+        sample_sink: 每个指标样本（过滤前）的回调 (指标名, 样本)，用于边读边构建列存储
+
+    每个指标额外带 summary = {count, total, min, max}（仅统计数值型 qty）。
+    sleep_analysis、workouts 及其它字段始终完整保留。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        ts = _TokenStream(f)
+        doc: Dict[str, Any] = {}
+        for key in ts.iter_object():
+            if key != 'data' or ts.peek() != '{':
+                doc[key] = ts.value()
+                continue
+            section: Dict[str, Any] = {}
+            for sub in ts.iter_object():
+                if sub == 'metrics' and ts.peek() == '[':
+                    section['metrics'] = [_stream_metric(ts, keep, summary_only, sample_filter, sample_sink) for _ in ts.iter_array()]
+                elif sub == 'workouts' and ts.peek() == '[':
+                    section['workouts'] = [ts.value() for _ in ts.iter_array()]
+                else:
+                    section[sub] = ts.value()
+            doc['data'] = section
+        if ts.peek() != '':
+            raise ValueError("导出文件格式错误: 顶层对象后存在多余内容")
+    return doc
+
+
+def stream_threshold_bytes() -> int:
+    """流式解析的文件大小阈值（字节）"""
+    threshold_mb = EXPORT_STREAM_THRESHOLD_MB
+    try:
+        from utils import load_config
+        configured = load_config().get('export_stream_threshold_mb')
+        if isinstance(configured, (int, float)) and not isinstance(configured, bool) and configured >= 0:
+            threshold_mb = configured
+    except Exception:
+        pass
+    return int(threshold_mb * 1024 * 1024)
+
+
+def _stream_variant(key: str, keep, summary_only, tag) -> str:
+    keep_tag = '*' if keep is None else ','.join(sorted(keep))
+    return f"{key}#stream:{keep_tag}|{','.join(sorted(summary_only))}|{tag or ''}"
+
+
+def read_export(path: Union[str, Path],
+                keep: Optional[Container[str]] = None,
+                summary_only: Container[str] = (),
+                sample_filter: Optional[Callable[[Any], bool]] = None,
+                tag: Optional[str] = None) -> Optional[Any]:
+    """按文件大小选择读取方式
+
+    - 小于阈值：等同 load_export_json，返回完整文档（不含 summary，不做样本过滤）
+    - 超过阈值：stream_export，结果按 (keep, summary_only, tag) 缓存；
+      keep 为空集合时可复用同一文件任意已缓存的流式结果（只需要睡眠/运动等非样本字段）
+
+    sample_filter 不可哈希，需要缓存时由调用方用 tag 标识其语义（如 "day=2026-03-01"）。
+    调用方需同时兼容两种返回形态。
+    """
+    key = _cache_key(path)
+    signature = file_signature(key)
+    if signature is None:
+        return None
+    if keep is not None and len(keep) == 0 and snapshot_settings()[0]:
+        # V6.1.0: 启用快照时，只需要非样本字段的读取走文档骨架（快照命中时不解码 JSON）
+        variant = _stream_variant(key, (), (), None)
+        data = _cache_get(variant, signature)
+        if data is None and read_columns(key) is not None:
+            data = _cache_get(variant, signature)
+        if data is not None:
+            return data
+
+    if signature[1] < stream_threshold_bytes():
+        return load_export_json(key)
+
+    if keep is not None and len(keep) == 0:
+        with _export_cache_lock:
+            for cached_key in reversed(_export_cache):
+                entry = _export_cache[cached_key]
+                if cached_key.startswith(key + '#stream:') and entry[0] == signature:
+                    _export_cache.move_to_end(cached_key)
+                    _export_cache_stats['hits'] += 1
+                    return entry[1]
+
+    variant = None
+    if sample_filter is None or tag is not None:
+        variant = _stream_variant(key, keep, summary_only, tag)
+        data = _cache_get(variant, signature)
+        if data is not None:
+            return data
+
+    data = stream_export(key, keep=keep, summary_only=summary_only, sample_filter=sample_filter)
+    if variant is not None:
+        _cache_put(variant, signature, data)
+    return data
+
+
+def read_columns(path: Union[str, Path]) -> Optional[Dict[str, MetricColumns]]:
+    """读取导出文件的全部指标为列式存储 {指标名: MetricColumns}
+
+    与 read_export 共用缓存与流式阈值；大文件流式构建列时，
+    同时缓存一份不含样本的文档，随后的睡眠/运动读取（keep=()）直接命中。
+
+    返回:
+        列式指标字典；文件不存在时返回 None
+    """
+    key = _cache_key(path)
+    signature = file_signature(key)
+    if signature is None:
+        return None
+    columns_key = key + '#columns'
+    columns = _cache_get(columns_key, signature)
+    if columns is not None:
+        return columns
+
+    skeleton_key = _stream_variant(key, (), (), None)
+    use_snapshot, snapshot_dir = snapshot_settings()
+    if use_snapshot:
+        loaded = load_snapshot(key, signature, snapshot_dir)
+        if loaded is not None:
+            columns, skeleton = loaded
+            _cache_put(skeleton_key, signature, skeleton)
+            _cache_put(columns_key, signature, columns)
+            return columns
+
+    if signature[1] < stream_threshold_bytes():
+        doc = load_export_json(key)
+        metrics = doc.get('data', {}).get('metrics', []) if isinstance(doc, dict) else []
+        columns = build_columns(metrics)
+        skeleton = export_skeleton(doc) if use_snapshot else None
+        if skeleton is not None:
+            _cache_put(skeleton_key, signature, skeleton)
+    else:
+        columns = {}
+
+        def sink(name, sample):
+            if not name or not isinstance(sample, dict):
+                return
+            col = columns.get(name)
+            if col is None:
+                col = columns[name] = MetricColumns(name)
+            col.append(sample.get('startDate') or sample.get('date'), sample.get('qty'))
+
+        doc = stream_export(key, keep=(), sample_sink=sink)
+        for metric in doc.get('data', {}).get('metrics', []):
+            col = columns.get(metric.get('name'))
+            if col is not None and not col.unit:
+                col.unit = metric.get('units', '') or ''
+        for col in columns.values():
+            col.finalize()
+        skeleton = doc
+        _cache_put(skeleton_key, signature, doc)
+
+    _cache_put(columns_key, signature, columns)
+    if use_snapshot and skeleton is not None:
+        write_snapshot(key, signature, columns, skeleton, snapshot_dir)
+    return columns
+
+
+def export_skeleton(doc: Any) -> Optional[Dict[str, Any]]:
+    """完整文档 -> 文档骨架：指标只保留名称/单位（睡眠记录保留），其余字段原样引用
+
+    与流式读取 keep=() 的返回形态一致，供快照与只需要运动/睡眠的读取使用。
+    """
+    if not isinstance(doc, dict):
+        return None
+    data = doc.get('data')
+    if not isinstance(data, dict):
+        return doc
+    metrics = []
+    for metric in data.get('metrics', []) or []:
+        if not isinstance(metric, dict):
+            continue
+        if metric.get('name') in _ALWAYS_KEEP_METRICS:
+            metrics.append(metric)
+        else:
+            metrics.append(dict(metric, data=[]))
+    skeleton = dict(doc)
+    skeleton['data'] = dict(data, metrics=metrics)
+    return skeleton
+
+
+def _sleep_records(doc: Any) -> list:
+    """提取睡眠记录（兼容 data.sleep_analysis 与 metrics 中的 sleep_analysis 两种结构）"""
+    data = doc.get('data', {}) if isinstance(doc, dict) else {}
+    if not isinstance(data, dict):
+        return []
+    sleep_data = data.get('sleep_analysis')
+    if not sleep_data:
+        metrics = data.get('metrics', [])
+        metrics_dict = {m.get('name'): m for m in metrics if isinstance(m, dict) and 'name' in m}
+        sleep_data = metrics_dict.get('sleep_analysis', {})
+    if not isinstance(sleep_data, dict):
+        return []
+    return sleep_data.get('data', []) or []
+
+
+def read_sleep_index(path: Union[str, Path]) -> Optional[SleepIndex]:
+    """读取导出文件的睡眠会话索引（与 read_export 共用缓存，按文件签名校验）
+
+    返回:
+        SleepIndex；文件不存在时返回 None
+    """
+    key = _cache_key(path)
+    signature = file_signature(key)
+    if signature is None:
+        return None
+    index_key = key + '#sleep'
+    index = _cache_get(index_key, signature)
+    if index is not None:
+        return index
+    # 只需要睡眠记录，大文件流式读取时不保留任何指标样本
+    index = SleepIndex(_sleep_records(read_export(key, keep=())))
+    _cache_put(index_key, signature, index)
+    return index
+
+
+def clear_export_cache() -> None:
+    """清空解析缓存（测试或长驻进程中手动释放内存时使用）"""
+    with _export_cache_lock:
+        _export_cache.clear()
+
+
+def export_cache_stats() -> Dict[str, int]:
+    """返回缓存命中统计"""
+    with _export_cache_lock:
+        return {**_export_cache_stats, 'entries': len(_export_cache)}
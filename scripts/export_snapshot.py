@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""导出文件二进制快照 - V6.1.0
+
+重复生成同一日期的报告/评分时，原始 JSON 每次都要重新解码。启用快照后
+（config.json: export_snapshot=true），首次解析某个导出文件时在旁边写一份紧凑快照：
+
+    .HealthAutoExport-2026-03-01.json.snap
+
+文件布局（小端）：
+    8 字节魔数 b'HAESNAP1' | 4 字节头长度 | JSON 头 | 填充到 8 字节对齐 | 数据区
+
+- JSON 头：源文件签名 (mtime_ns, size, blake2b)、每个指标的名称/单位/样本数/数据偏移、
+  文档骨架（workouts、睡眠记录等不含指标样本的部分）
+- 数据区：每个指标依次为 wall(int64) / epoch(int64) / qty(float64) / undated(float64) 四列
+
+加载时 mmap 快照、按偏移直接拷贝为 array 列，不做任何 JSON 样本解码。
+校验：mtime/size 一致直接使用；size 一致但 mtime 变化（同步/复制）时比对内容哈希，
+一致则沿用并更新签名。快照损坏或版本不符时视为不存在，回退到解析原始 JSON。
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from metric_columns import MetricColumns
+
+SNAPSHOT_MAGIC = b'HAESNAP1'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = '.snap'
+
+_HEADER_LEN = struct.Struct('<I')
+_HASH_CHUNK = 1 << 20
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_settings() -> Tuple[bool, Optional[Path]]:
+    """(是否启用, 快照目录)；目录为 None 表示写在导出文件旁边"""
+    try:
+        from utils import load_config
+        config = load_config()
+    except Exception:
+        return False, None
+    enabled = config.get('export_snapshot') is True
+    snapshot_dir = config.get('export_snapshot_dir')
+    if enabled and isinstance(snapshot_dir, str) and snapshot_dir.strip():
+        return True, Path(snapshot_dir).expanduser()
+    return enabled, None
+
+
+def snapshot_path(source: Union[str, Path], snapshot_dir: Optional[Path] = None) -> Path:
+    """导出文件对应的快照路径
+
+    集中存放时不同成员的导出文件可能同名，文件名追加源路径哈希区分。
+    """
+    source = Path(source)
+    if snapshot_dir is None:
+        return source.with_name(f'.{source.name}{SNAPSHOT_SUFFIX}')
+    tag = hashlib.blake2b(str(source.resolve()).encode('utf-8'), digest_size=6).hexdigest()
+    return snapshot_dir / f'{source.name}.{tag}{SNAPSHOT_SUFFIX}'
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """源文件内容哈希（blake2b-128）"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _column_bytes(values: array) -> bytes:
+    if _LITTLE_ENDIAN:
+        return values.tobytes()
+    swapped = array(values.typecode, values)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _column_from(buf, typecode: str, offset: int, count: int) -> array:
+    values = array(typecode)
+    values.frombytes(buf[offset:offset + count * values.itemsize])
+    if not _LITTLE_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def write_snapshot(source: Union[str, Path],
+                   signature: Tuple[int, int],
+                   columns: Dict[str, MetricColumns],
+                   skeleton: Any,
+                   snapshot_dir: Optional[Path] = None) -> Optional[Path]:
+    """写入快照（临时文件 + 原子替换）；写入失败（只读目录等）返回 None，不影响主流程"""
+    target = snapshot_path(source, snapshot_dir)
+    tmp = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+    try:
+        digest = file_digest(source)
+        metrics = []
+        blobs = []
+        offset = 0
+        for name, col in columns.items():
+            entry = {'name': name, 'unit': col.unit, 'n': len(col.qty), 'undated': len(col.undated),
+                     'offset': offset}
+            for values in (col.wall, col.epoch, col.qty, col.undated):
+                blob = _column_bytes(values)
+                blobs.append(blob)
+                offset += len(blob)
+            metrics.append(entry)
+
+        header = json.dumps({
+            'version': SNAPSHOT_VERSION,
+            'source': {'mtime_ns': signature[0], 'size': signature[1], 'blake2b': digest},
+            'metrics': metrics,
+            'skeleton': skeleton,
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        prefix_len = len(SNAPSHOT_MAGIC) + _HEADER_LEN.size + len(header)
+        padding = b'\0' * (-prefix_len % 8)
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(_HEADER_LEN.pack(len(header)))
+            f.write(header)
+            f.write(padding)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp, target)
+        return target
+    except (OSError, TypeError, ValueError) as e:
+        logger.debug(f"写入导出快照失败 {target}: {e}")
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        return None
+
+
+def load_snapshot(source: Union[str, Path],
+                  signature: Tuple[int, int],
+                  snapshot_dir: Optional[Path] = None) -> Optional[Tuple[Dict[str, MetricColumns], Any]]:
+    """读取与源文件一致的快照，返回 (列式指标, 文档骨架)；快照缺失/过期/损坏返回 None"""
+    target = snapshot_path(source, snapshot_dir)
+    try:
+        with open(target, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                return None
+            pos = len(SNAPSHOT_MAGIC)
+            (header_len,) = _HEADER_LEN.unpack_from(buf, pos)
+            pos += _HEADER_LEN.size
+            header = json.loads(buf[pos:pos + header_len].decode('utf-8'))
+            if header.get('version') != SNAPSHOT_VERSION:
+                return None
+            stamp = header.get('source') or {}
+            if stamp.get('size') != signature[1]:
+                return None
+            if stamp.get('mtime_ns') != signature[0]:
+                # 内容未变但 mtime 变化（同步/复制）：哈希一致则沿用，写回时更新签名
+                if stamp.get('blake2b') != file_digest(source):
+                    return None
+                _restamp(target, signature)
+
+            data_start = pos + header_len
+            data_start += -data_start % 8
+            columns: Dict[str, MetricColumns] = {}
+            for entry in header.get('metrics', []):
+                n, undated = entry['n'], entry['undated']
+                offset = data_start + entry['offset']
+                col = MetricColumns(entry['name'], entry.get('unit', ''))
+                col.wall = _column_from(buf, 'q', offset, n)
+                col.epoch = _column_from(buf, 'q', offset + 8 * n, n)
+                col.qty = _column_from(buf, 'd', offset + 16 * n, n)
+                col.undated = _column_from(buf, 'd', offset + 24 * n, undated)
+                if len(col.qty) != n or len(col.undated) != undated:
+                    return None
+                columns[entry['name']] = col.finalize()
+            return columns, header.get('skeleton')
+    except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.debug(f"读取导出快照失败 {target}: {e}")
+        return None
+
+
+def _restamp(target: Path, signature: Tuple[int, int]) -> None:
+    """哈希校验通过后原地更新快照头中的 mtime（长度不变时），下次走快速路径"""
+    try:
+        with open(target, 'r+b') as f:
+            f.seek(len(SNAPSHOT_MAGIC))
+            (header_len,) = _HEADER_LEN.unpack(f.read(_HEADER_LEN.size))
+            raw = f.read(header_len)
+            header = json.loads(raw.decode('utf-8'))
+            old_mtime = header['source']['mtime_ns']
+            old = f'"mtime_ns":{old_mtime},'.encode('utf-8')
+            new = f'"mtime_ns":{signature[0]},'.encode('utf-8')
+            if len(old) != len(new) or raw.count(old) != 1:
+                return
+            f.seek(len(SNAPSHOT_MAGIC) + _HEADER_LEN.size + raw.index(old))
+            f.write(new)
+    except (OSError, ValueError, KeyError):
+        pass
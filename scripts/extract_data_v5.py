@@ -2,8 +2,10 @@
 """提取Apple Health数据用于V6.0.5报告生成 - 支持多成员"""
 
 import json
+import os
 import re
 import sys
+from dataclasses import replace
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict
@@ -11,8 +13,11 @@ from typing import List, Dict
 
 # V5.8.1: 使用共用工具函数
 sys.path.insert(0, str(Path(__file__).parent))
-from utils import load_config, MAX_MEMBERS, KJ_TO_KCAL, ConfigError, handle_error, infer_duration_unit, get_workout_field
+from utils import (load_config, KJ_TO_KCAL, ConfigError, handle_error, infer_duration_unit, get_workout_field,
+                   build_aggregation_plan, evaluate_aggregation_plan, find_existing_file)
 from health_score import calculate_zone_times_from_workouts
+from export_reader import read_columns, read_export
+from member_registry import map_members, member_shard_size, pop_shard_arg, MemberRegistry
 
 def _sanitize_path(path_str, default_path):
     """路径安全验证：防止路径遍历攻击"""
@@ -78,11 +83,6 @@ def get_member_config(member_idx=0):
         )
         return None
 
-    # 检查成员数量限制（最多 MAX_MEMBERS 位）
-    if len(members) > MAX_MEMBERS:
-        print(f"⚠️ 警告: 成员数 {len(members)} 超过上限 {MAX_MEMBERS}，仅处理前 {MAX_MEMBERS} 位", file=sys.stderr)
-        members = members[:MAX_MEMBERS]
-
     # 检查索引是否越界（同时防止负索引误取最后一个成员）
     if member_idx < 0 or member_idx >= len(members):
         print(f"⚠️ 警告: 成员索引 {member_idx} 超出范围，回退到第一个成员(0)", file=sys.stderr)
@@ -125,44 +125,12 @@ def get_sleep_config():
 
 
 def get_all_members_count():
-    """获取配置的成员总数（最多 MAX_MEMBERS）"""
+    """获取配置的成员总数"""
     config = load_config()
-    members = config.get('members', [])
-    return min(len(members), MAX_MEMBERS)
-
-def extract_metric_avg(metrics, metric_name):
-    """提取平均值和数据点数"""
-    metric = metrics.get(metric_name, {})
-    data = metric.get('data', [])
-    if not data:
-        return None, 0
-    values = [d.get('qty', 0) for d in data if d.get('qty') is not None]
-    if not values:
-        return None, 0
-    return sum(values) / len(values), len(values)
-
-def extract_metric_sum(metrics, metric_name):
-    """提取总和"""
-    metric = metrics.get(metric_name, {})
-    data = metric.get('data', [])
-    if not data:
-        return 0
-    return sum(d.get('qty', 0) for d in data if d.get('qty') is not None)
-
-
-def extract_workout_data(date_str, workout_dir=None, health_dir=None):
-    """
-    提取运动数据 - V5.8.1:
-    1. 支持双文件名: YYYY-MM-DD.json 和 HealthAutoExport-YYYY-MM-DD.json
-    2. 兼容 workout 结构: data.workouts.data 和 data.workouts
-    """
-    from datetime import datetime
-    from pathlib import Path
-    import re
-
-    date = datetime.strptime(date_str, '%Y-%m-%d')
+    return len(config.get('members', []))
 
-    # 使用传入的路径或全局默认路径
+def _resolve_dirs(health_dir=None, workout_dir=None):
+    """使用传入的路径或全局默认路径"""
     if workout_dir is None:
         workout_dir = Path('~/Health Auto Export/Workout Data').expanduser()
     else:
@@ -172,27 +140,58 @@ def extract_workout_data(date_str, workout_dir=None, health_dir=None):
         health_dir = Path('~/Health Auto Export/Health Data').expanduser()
     else:
         health_dir = Path(health_dir).expanduser()
+    return health_dir, workout_dir
 
-    # 尝试多种文件路径
-    workout_paths = [
+
+def workout_file_candidates(date_str, workout_dir=None, health_dir=None):
+    """运动文件候选路径（按优先级，取第一个存在的）"""
+    health_dir, workout_dir = _resolve_dirs(health_dir, workout_dir)
+    return [
         workout_dir / f'{date_str}.json',
         workout_dir / f'HealthAutoExport-{date_str}.json',
         health_dir / f'HealthAutoExport-{date_str}.json',
         health_dir / f'{date_str}.json',
     ]
 
-    workout_file = None
-    for p in workout_paths:
-        if p.exists():
-            workout_file = p
-            break
+
+def export_source_files(date_str, health_dir=None, workout_dir=None, sleep_config=None):
+    """V6.1.0: extract_daily_data 读取（或探测）的全部导出文件，供增量回填判断输入是否变化
+
+    包含当日指标文件、睡眠窗口文件和全部运动文件候选（候选出现/消失也会改变结果）。
+    """
+    from utils import sleep_source_files
+    health_dir, workout_dir = _resolve_dirs(health_dir, workout_dir)
+    read_mode = (sleep_config or {}).get('read_mode', 'next_day')
+    files = [health_dir / f'HealthAutoExport-{date_str}.json']
+    files += sleep_source_files(date_str, health_dir, read_mode)
+    files += workout_file_candidates(date_str, workout_dir, health_dir)
+    return list(dict.fromkeys(files))
+
+
+def extract_workout_data(date_str, workout_dir=None, health_dir=None):
+    """
+    提取运动数据 - V5.8.1:
+    1. 支持双文件名: YYYY-MM-DD.json 和 HealthAutoExport-YYYY-MM-DD.json
+    2. 兼容 workout 结构: data.workouts.data 和 data.workouts
+    """
+    from datetime import datetime
+    from pathlib import Path
+    import re
+
+    date = datetime.strptime(date_str, '%Y-%m-%d')
+
+    # 尝试多种文件路径
+    workout_paths = workout_file_candidates(date_str, workout_dir, health_dir)
+
+    # V6.1.0: 通过目录索引判断存在性，批量回填时每个目录只扫描一次
+    workout_file = find_existing_file(workout_paths)
 
     if not workout_file:
         return []
 
     try:
-        with open(workout_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # V6.1.0: 只需要 workouts，大文件流式读取时不保留任何指标样本
+        data = read_export(workout_file, keep=()) or {}
     except Exception as e:
         print(f"⚠️  读取运动文件失败: {workout_file} - {e}", file=sys.stderr)
         return []
@@ -307,6 +306,17 @@ def extract_workout_data(date_str, workout_dir=None, health_dir=None):
 
     return workouts
 
+
+# V6.1.0: 流式解析时需要保留样本的指标（heart_rate_data 输出逐点心率）
+_STREAM_KEEP_METRICS = {'heart_rate'}
+
+# V6.1.0: 提取输出包含全部指标（与 report_metrics.selected 无关）；
+# 步长、速度保持源单位（按展示单位换算只在日报中进行），能量与血氧的换算同原提取逻辑
+_SOURCE_UNIT_CONVERSIONS = ('length_cm', 'speed_kmh')
+_EXTRACT_PLAN = [replace(item, convert=None) if item.convert in _SOURCE_UNIT_CONVERSIONS else item
+                 for item in build_aggregation_plan()]
+
+
 def extract_daily_data(date_str, health_dir=None, workout_dir=None, user_profile=None, sleep_config=None):
     """提取完整的一天数据 - V5.8.1: 支持多成员路径传入"""
     date = datetime.strptime(date_str, '%Y-%m-%d')
@@ -328,7 +338,7 @@ def extract_daily_data(date_str, health_dir=None, workout_dir=None, user_profile
     # 读取当日数据文件
     data_file = health_dir / f'HealthAutoExport-{date_str}.json'
 
-    if not data_file.exists():
+    if find_existing_file([data_file]) is None:
         from utils import DataError, handle_error
         handle_error(
             DataError(f"数据文件不存在: {data_file}"),
@@ -338,8 +348,8 @@ def extract_daily_data(date_str, health_dir=None, workout_dir=None, user_profile
         return None
 
     try:
-        with open(data_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # V6.1.0: 指标样本在解析时一次性转为列式存储
+        metrics = read_columns(data_file) or {}
     except json.JSONDecodeError as e:
         from utils import DataError, handle_error
         handle_error(
@@ -357,77 +367,73 @@ def extract_daily_data(date_str, health_dir=None, workout_dir=None, user_profile
         )
         return None
 
-    # 提取指标
-    metrics_list = data.get('data', {}).get('metrics', [])
-    metrics = {m['name']: m for m in metrics_list if 'name' in m}
+    # V6.1.0: 与日报共用由 METRIC_DEFS 生成的聚合计划（整文件口径，不按日过滤）
+    aggregated = evaluate_aggregation_plan(_EXTRACT_PLAN, metrics)
+
+    def metric_value(key, default=None):
+        value = aggregated.get(key, (None, 0))[0]
+        return default if value is None else value
 
     # HRV (心率变异性)
-    hrv_raw, hrv_measurement_count = extract_metric_avg(metrics, 'heart_rate_variability')
+    hrv_raw, hrv_measurement_count = aggregated.get('hrv', (None, 0))
 
     # V5.8.1: 使用 resting_heart_rate 而不是 heart_rate
-    resting_hr_raw, _ = extract_metric_avg(metrics, 'resting_heart_rate')
+    resting_hr_raw = metric_value('resting_hr')
 
     # 步数
-    steps = extract_metric_sum(metrics, 'step_count')
+    steps = metric_value('steps', 0)
 
     # 距离 (km) - 数据单位已经是km，不需要再转换
-    distance = extract_metric_sum(metrics, 'walking_running_distance')
+    distance = metric_value('distance', 0)
 
-    # 活动能量 (kJ)
-    active_energy = extract_metric_sum(metrics, 'active_energy')
+    # 活动能量：源数据 kJ，聚合计划中已换算为 kcal
+    active_energy_kcal = metric_value('active_energy', 0)
 
     # 爬楼层数
-    flights = extract_metric_sum(metrics, 'flights_climbed')
+    flights = metric_value('flights_climbed', 0)
 
     # 站立时间 (分钟) - 保持分钟单位，不除以60
-    stand_time = extract_metric_sum(metrics, 'apple_stand_time')
-
-    # V5.8.1: 修复血氧百分比单位问题
-    spo2_raw, _ = extract_metric_avg(metrics, 'blood_oxygen_saturation')
-    if spo2_raw and spo2_raw <= 1.0:
-        spo2 = spo2_raw * 100
-    elif spo2_raw:
-        spo2 = spo2_raw
-    else:
-        spo2 = None
+    stand_time = metric_value('apple_stand_time', 0)
+
+    # V5.8.1: 修复血氧百分比单位问题（聚合计划中统一换算为百分比）
+    spo2 = metric_value('spo2')
 
-    basal_energy = extract_metric_sum(metrics, 'basal_energy_burned')  # kJ
-    respiratory, _ = extract_metric_avg(metrics, 'respiratory_rate')
+    basal_energy_kcal = metric_value('basal_energy_burned', 0)
+    respiratory = metric_value('respiratory_rate')
 
     # ===== 高级指标提取（V6.0.5 新增）=====
     # 心肺能力
-    vo2_max, _ = extract_metric_avg(metrics, 'vo2_max')
-    physical_effort, _ = extract_metric_avg(metrics, 'physical_effort')
+    vo2_max = metric_value('vo2_max')
+    physical_effort = metric_value('physical_effort')
 
     # 步行步态
-    walking_speed, _ = extract_metric_avg(metrics, 'walking_speed')
-    walking_step_length, _ = extract_metric_avg(metrics, 'walking_step_length')
-    walking_heart_rate_average, _ = extract_metric_avg(metrics, 'walking_heart_rate_average')
-    walking_asymmetry_percentage, _ = extract_metric_avg(metrics, 'walking_asymmetry_percentage')
-    walking_double_support_percentage, _ = extract_metric_avg(metrics, 'walking_double_support_percentage')
+    walking_speed = metric_value('walking_speed')
+    walking_step_length = metric_value('walking_step_length')
+    walking_heart_rate_average = metric_value('walking_heart_rate_average')
+    walking_asymmetry_percentage = metric_value('walking_asymmetry_percentage')
+    walking_double_support_percentage = metric_value('walking_double_support_percentage')
 
     # 高级跑步
-    running_speed, _ = extract_metric_avg(metrics, 'running_speed')
-    running_power, _ = extract_metric_avg(metrics, 'running_power')
-    running_stride_length, _ = extract_metric_avg(metrics, 'running_stride_length')
-    running_ground_contact_time, _ = extract_metric_avg(metrics, 'running_ground_contact_time')
-    running_vertical_oscillation, _ = extract_metric_avg(metrics, 'running_vertical_oscillation')
+    running_speed = metric_value('running_speed')
+    running_power = metric_value('running_power')
+    running_stride_length = metric_value('running_stride_length')
+    running_ground_contact_time = metric_value('running_ground_contact_time')
+    running_vertical_oscillation = metric_value('running_vertical_oscillation')
 
     # 活动与机能
-    apple_exercise_time = extract_metric_sum(metrics, 'apple_exercise_time')
-    apple_stand_hour = extract_metric_sum(metrics, 'apple_stand_hour')
-    stair_speed_up, _ = extract_metric_avg(metrics, 'stair_speed_up')
+    apple_exercise_time = metric_value('apple_exercise_time', 0)
+    apple_stand_hour = metric_value('apple_stand_hour', 0)
+    stair_speed_up = metric_value('stair_speed_up')
 
     # 睡眠相关
-    breathing_disturbances, _ = extract_metric_avg(metrics, 'breathing_disturbances')
+    breathing_disturbances = metric_value('breathing_disturbances')
 
     # 环境暴露
-    headphone_audio_exposure, _ = extract_metric_avg(metrics, 'headphone_audio_exposure')
-    environmental_audio_exposure, _ = extract_metric_avg(metrics, 'environmental_audio_exposure')
+    headphone_audio_exposure = metric_value('headphone_audio_exposure')
+    environmental_audio_exposure = metric_value('environmental_audio_exposure')
 
     # 平均心率
-    heart_rate_avg, _ = extract_metric_avg(metrics, 'heart_rate')
-    running_vert_osc, _ = extract_metric_avg(metrics, 'running_vertical_oscillation')
+    heart_rate_avg = metric_value('heart_rate_avg')
 
     # V5.8.1: 睡眠数据使用统一解析函数
     from utils import parse_sleep_data_unified
@@ -466,8 +472,12 @@ def extract_daily_data(date_str, health_dir=None, workout_dir=None, user_profile
         workouts = []
 
     # 心率数据（用于计算心率区间）
+    # V6.1.0: 逐点输出保留源文件的时间字符串与顺序；小文件命中 read_columns 已缓存的完整文档，
+    # 大文件流式读取时只保留 heart_rate 样本
     heart_rate_data = []
-    hr_metric = metrics.get('heart_rate', {})
+    data = read_export(data_file, keep=_STREAM_KEEP_METRICS) or {}
+    hr_metric = next((m for m in data.get('data', {}).get('metrics', [])
+                      if isinstance(m, dict) and m.get('name') == 'heart_rate'), {})
     for hr_point in hr_metric.get('data', []):
         ts = hr_point.get('date') or hr_point.get('startDate') or hr_point.get('timestamp')
         hr = hr_point.get('qty')
@@ -478,9 +488,9 @@ def extract_daily_data(date_str, health_dir=None, workout_dir=None, user_profile
             })
 
     # 活动能量合并（统一换算到 kcal）
-    # active_energy 来源于 Apple Health 指标，单位是 kJ；workout.energy_kcal 已经是 kcal
-    if active_energy and active_energy > 0:
-        total_energy_kcal = active_energy / KJ_TO_KCAL
+    # active_energy 来源于 Apple Health 指标（已换算为 kcal）；workout.energy_kcal 已经是 kcal
+    if active_energy_kcal and active_energy_kcal > 0:
+        total_energy_kcal = active_energy_kcal
     else:
         total_energy_kcal = sum(w.get('energy_kcal', 0) for w in workouts)
 
@@ -525,7 +535,7 @@ def extract_daily_data(date_str, health_dir=None, workout_dir=None, user_profile
         'stand_time_min': int(stand_time),
 
         'spo2': round(spo2, 1) if spo2 else None,
-        'basal_energy_kcal': round(basal_energy / KJ_TO_KCAL, 1) if basal_energy else 0,
+        'basal_energy_kcal': round(basal_energy_kcal, 1) if basal_energy_kcal else 0,
         'respiratory_rate': round(respiratory, 1) if respiratory else None,
 
         # 高级指标
@@ -572,36 +582,50 @@ def extract_daily_data(date_str, health_dir=None, workout_dir=None, user_profile
 
     return result
 
-def extract_all_members_data(date_str):
-    """V5.8.1: 提取所有成员的数据"""
+def get_extract_workers(member_count):
+    """V6.1.0: 多成员提取的进程数（config.json: extract_workers，0 或未配置 = 按 CPU 核数自动）"""
+    workers = load_config().get('extract_workers', 0)
+    if not isinstance(workers, int) or isinstance(workers, bool) or workers <= 0:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, member_count))
+
+
+def _extract_member(idx, member_config, date_str, sleep_config):
+    """提取单个成员数据（异常由 map_members 按成员隔离，不影响其他成员）"""
+    profile = member_config['profile']
+    print(f"Extracting data for member {idx}: {profile.get('name', 'Unknown')}...", file=sys.stderr)
+    return extract_daily_data(date_str, member_config['health_dir'], member_config['workout_dir'],
+                              profile, sleep_config)
+
+
+def extract_all_members_data(date_str, shard=None):
+    """V5.8.1: 提取所有成员的数据
+
+    V6.1.0: 成员之间互不依赖，按 extract_workers 分发到进程池并行提取（JSON 解码受 GIL 限制，
+    线程无法并行）；结果按成员顺序汇总，单个成员失败（包括工作进程崩溃）只跳过该成员。shard=(K, N) 时只提取该分片的成员。
+    """
     config = load_config()
-    members = config.get('members', [])
+    registry = MemberRegistry.from_config(config)
     sleep_config = get_sleep_config()
 
-    # 限制最多 MAX_MEMBERS 位成员
-    if len(members) > MAX_MEMBERS:
-        print(f"⚠️ 成员数 {len(members)} 超过上限 {MAX_MEMBERS}，仅处理前 {MAX_MEMBERS} 位", file=sys.stderr)
-        members = members[:MAX_MEMBERS]
-
-    if not members:
+    if not len(registry):
         print("Error: No members configured in config.json", file=sys.stderr)
         return None
 
-    all_members_data = []
-
-    for idx, _ in enumerate(members):
+    jobs = []
+    for idx, _ in registry.select(shard):
         member_config = get_member_config(idx)
         if not member_config:
             print(f"Warning: 成员 {idx} 配置无效，已跳过", file=sys.stderr)
             continue
-        health_dir = member_config['health_dir']
-        workout_dir = member_config['workout_dir']
-        profile = member_config['profile']
-
-        print(f"Extracting data for member {idx}: {profile.get('name', 'Unknown')}...", file=sys.stderr)
+        jobs.append((idx, member_config, date_str, sleep_config))
 
-        data = extract_daily_data(date_str, health_dir, workout_dir, profile, sleep_config)
-        if data:
+    all_members_data = []
+    workers = get_extract_workers(len(jobs)) if jobs else 1
+    for (idx, *_), data, error in map_members(_extract_member, jobs, workers, member_shard_size(config)):
+        if error:
+            print(f"Warning: 成员 {idx} 提取失败: {error}", file=sys.stderr)
+        elif data:
             all_members_data.append(data)
         else:
             print(f"Warning: No data found for member {idx}", file=sys.stderr)
@@ -618,26 +642,32 @@ def extract_all_members_data(date_str):
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print("Usage: python extract_data_v5.py YYYY-MM-DD [member_index|all]", file=sys.stderr)
+        print("Usage: python extract_data_v5.py YYYY-MM-DD [member_index|all] [--shard K/N]", file=sys.stderr)
         print("Examples:", file=sys.stderr)
         print("  python extract_data_v5.py 2026-03-01       # 提取第一个成员数据（默认）", file=sys.stderr)
         print("  python extract_data_v5.py 2026-03-01 1     # 提取第二个成员数据", file=sys.stderr)
         print("  python extract_data_v5.py 2026-03-01 2     # 提取第三个成员数据", file=sys.stderr)
         print("  python extract_data_v5.py 2026-03-01 all   # 提取所有成员数据（V5.8.1+）", file=sys.stderr)
+        print("  python extract_data_v5.py 2026-03-01 all --shard 0/4   # 只提取第 0 片成员（索引 % 4 == 0）", file=sys.stderr)
         sys.exit(1)
 
-    date_str = sys.argv[1]
+    try:
+        shard, args = pop_shard_arg(sys.argv[1:])
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    date_str = args[0]
 
     # 检查是否使用 'all' 参数
-    if len(sys.argv) > 2 and sys.argv[2].lower() == 'all':
+    if len(args) > 1 and args[1].lower() == 'all':
         # 提取所有成员数据
-        data = extract_all_members_data(date_str)
+        data = extract_all_members_data(date_str, shard)
     else:
         # 提取单个成员数据
         try:
-            member_idx = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+            member_idx = int(args[1]) if len(args) > 1 else 0
         except ValueError:
-            print(f"Error: member_index 必须是整数或 'all'，当前输入: {sys.argv[2]}", file=sys.stderr)
+            print(f"Error: member_index 必须是整数或 'all'，当前输入: {args[1]}", file=sys.stderr)
             sys.exit(1)
         member_config = get_member_config(member_idx)
         if not member_config:
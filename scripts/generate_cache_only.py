@@ -7,8 +7,18 @@
 用法：
   python3 scripts/generate_cache_only.py 2026-02-01 2026-03-05    # 批量生成
   python3 scripts/generate_cache_only.py 2026-03-01               # 单日
+  python3 scripts/generate_cache_only.py 2026-01-01 2026-03-05 --incremental
+      # V6.1.0: 只重算源文件或相关配置变化的日期，以及其后受影响的日期（见 cache_manifest.py）
+  python3 scripts/generate_cache_only.py 2026-01-01 2026-03-05 --shard 0/4
+      # V6.1.0: 只处理索引 % 4 == 0 的成员；成员间并发数由 member_workers 控制（见 member_registry.py）
+  python3 scripts/generate_cache_only.py --changed 2026-03-01,2026-03-03 [--until 2026-03-31]
+      # V6.1.0: 导出文件被修改的日期 -> 只重算读取它们的日期及其后受影响的日期（见 recompute_planner.py）
+
+V6.1.0: 两阶段回填 —— 先用进程池（extract_workers）并行提取全部 (成员, 日期) 的原始数据，
+再按成员顺序计算评分与睡眠债（成员之间按 member_workers 并行）。
 """
 
+import os
 import sys
 import json
 from datetime import datetime, timedelta
@@ -16,9 +26,15 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 
-from extract_data_v5 import extract_daily_data
-from health_score import calculate_all_scores, HealthScoreHistory
-from utils import safe_member_name
+from extract_data_v5 import extract_daily_data, export_source_files
+from health_score import calculate_all_scores, day_hr_zone_times, HealthScoreHistory, SCORE_LOOKBACK_DAYS
+from utils import member_lock
+from cache_manifest import CacheManifest, config_fingerprint
+from history_store import open_history_store
+from recompute_planner import (AffectedFrontier, affected_dates, cache_dates_for_exports, parse_changed_dates,
+                               pop_option_arg)
+from member_registry import (MemberRegistry, apply_member_registry, map_members, member_cache_dir, member_shard_size, member_workers,
+                             pop_shard_arg)
 
 
 def load_config():
@@ -30,7 +46,8 @@ def load_config():
     for config_path in config_paths:
         if config_path.exists():
             with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                # V6.1.0: 合并独立成员注册表（members_file / members_dir）
+                return apply_member_registry(json.load(f), config_path.parent)
     print("❌ 找不到 config.json")
     sys.exit(1)
 
@@ -38,20 +55,23 @@ def load_config():
 def get_member_config(config, index):
     """获取成员配置"""
     members = config.get("members", [])
-    if index < len(members):
+    if 0 <= index < len(members):
         return members[index]
     return None
 
 
-def generate_cache_for_date(date_str, member_idx, member_name, config):
-    """为指定日期和成员生成缓存"""
-    
-    # 提取数据
+def get_cache_dir(config, member_cfg=None):
+    """缓存目录（V6.1.0: 按成员解析，支持 member_dirs 与成员级 cache_dir）"""
+    return member_cache_dir(config, member_cfg)
+
+
+def extract_cache_input(date_str, member_idx, config):
+    """提取单日原始数据（两阶段回填的阶段 1），无数据或失败时返回 None"""
     try:
         member_cfg = get_member_config(config, member_idx)
         if not member_cfg:
             print(f"   ❌ {date_str} - 成员配置不存在")
-            return False
+            return None
         
         # 获取睡眠配置
         sleep_config = config.get('sleep_config', {'read_mode': 'next_day', 'start_hour': 20, 'end_hour': 12})
@@ -73,20 +93,91 @@ def generate_cache_for_date(date_str, member_idx, member_name, config):
         )
         if not data:
             print(f"   ⚠️  {date_str} - 无数据")
-            return False
+            return None
         
         # 检查数据有效性
         if not isinstance(data, dict) or 'hrv' not in data:
             print(f"   ⚠️  {date_str} - 数据格式异常")
-            return False
+            return None
             
     except Exception as e:
         print(f"   ❌ {date_str} - 提取失败: {e}")
-        return False
+        return None
+    return data
+
+
+def fallback_health_scores(data, member_cfg):
+    """评分计算失败时写入缓存的默认评分"""
+    return {
+        'strain': 10.0, 'recovery': 50, 'recovery_status': 'yellow',
+        'sleep_performance': 70, 'sleep_need': 7.8,
+        'actual_sleep_hours': data.get('sleep', {}).get('total_hours', 7),
+        'body_age': member_cfg.get('age', 30),
+        'chronological_age': member_cfg.get('age', 30),
+        'age_impact': 0.0, 'pace_of_aging': 0.0
+    }
+
+
+def score_cache_fields(data, health_scores, prev_debt=None):
+    """缓存中由评分决定的字段：睡眠债（当天 / 累计）与 health_scores
+
+    prev_debt 为前一天的累计睡眠债，None 表示无法读取（累计值只算当天）。
+    V6.1.0: 缓存回填与 rescore.py 共用。
+    """
+    # 计算睡眠债：允许少量还债
+    sleep_total = data.get('sleep', {}).get('total_hours', 0)
+    sleep_need = health_scores['sleep_need']
+    daily_debt = round(sleep_need - sleep_total, 2)
+    # 允许少量"还债"，但不要无限负向累积
+    if daily_debt < 0:
+        daily_debt = max(-1.0, daily_debt)
+    try:
+        accumulated_debt = max(0, prev_debt + daily_debt)
+    except TypeError:
+        accumulated_debt = max(0, daily_debt)
+
+    return {
+        'sleep_debt_daily': round(daily_debt, 2),
+        'sleep_debt_accumulated': round(accumulated_debt, 2),
+        'health_scores': {
+            'strain': health_scores['strain'],
+            'recovery': health_scores['recovery'],
+            'recovery_status': health_scores['recovery_status'],
+            'sleep_performance': health_scores['sleep_performance'],
+            'sleep_need': health_scores['sleep_need'],
+            'actual_sleep_hours': round(sleep_total, 2),
+            'body_age': health_scores['body_age'],
+            'chronological_age': health_scores['chronological_age'],
+            'age_impact': health_scores['age_impact'],
+            'pace_of_aging': health_scores['pace_of_aging'],
+            'zone_times': health_scores.get('zone_times', {
+                'zone_1': 0, 'zone_2': 0, 'zone_3': 0, 'zone_4': 0, 'zone_5': 0
+            }),
+            'hrv_rmssd': data.get('hrv', {}).get('value', 0) if isinstance(data.get('hrv'), dict) else 0,
+            'rhr': data.get('resting_hr', {}).get('value', 0) if isinstance(data.get('resting_hr'), dict) else 0
+        }
+    }
+
+
+def generate_cache_for_date(date_str, member_idx, member_name, config, history=None, data=None):
+    """为指定日期和成员生成缓存
+
+    V6.1.0: history 由调用方传入时在多天之间复用，已读过的历史缓存不再重复打开；
+    缓存写入 history.store（json 文件或 SQLite，见 history_store.py）。
+    data 为阶段 1 已提取的当日数据时直接评分，不再重复提取。
+    """
+    
+    # 提取数据
+    if data is None:
+        data = extract_cache_input(date_str, member_idx, config)
+        if data is None:
+            return False
+    member_cfg = get_member_config(config, member_idx)
     
     # 初始化历史记录管理器
-    cache_dir = Path(config.get("cache_dir", str(Path(__file__).parent.parent / 'cache' / 'daily'))).expanduser()
-    history = HealthScoreHistory(cache_dir)
+    cache_dir = get_cache_dir(config, member_cfg)
+    if history is None:
+        history = HealthScoreHistory(cache_dir, store=open_history_store(config, cache_dir))
     
     # 计算健康评分
     try:
@@ -94,32 +185,15 @@ def generate_cache_for_date(date_str, member_idx, member_name, config):
         health_scores = calculate_all_scores(data, member_cfg, history, zone_times)
     except Exception as e:
         print(f"   ⚠️ {date_str} - 评分计算失败: {e}，使用默认值")
-        health_scores = {
-            'strain': 10.0, 'recovery': 50, 'recovery_status': 'yellow',
-            'sleep_performance': 70, 'sleep_need': 7.8,
-            'actual_sleep_hours': data.get('sleep', {}).get('total_hours', 7),
-            'body_age': member_cfg.get('age', 30),
-            'chronological_age': member_cfg.get('age', 30),
-            'age_impact': 0.0, 'pace_of_aging': 0.0
-        }
-    
-    # 计算睡眠债：允许少量还债
-    sleep_total = data.get('sleep', {}).get('total_hours', 0)
-    sleep_need = health_scores['sleep_need']
-    daily_debt = round(sleep_need - sleep_total, 2)
-    # 允许少量"还债"，但不要无限负向累积
-    if daily_debt < 0:
-        daily_debt = max(-1.0, daily_debt)
+        health_scores = fallback_health_scores(data, member_cfg)
 
     prev_date = (datetime.strptime(date_str, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
     try:
         prev_debt = history.get_sleep_debt(prev_date, member_name)
-        accumulated_debt = max(0, prev_debt + daily_debt)
     except Exception:
-        accumulated_debt = max(0, daily_debt)
+        prev_debt = None
     
     # 准备缓存数据
-    safe_name = safe_member_name(member_name)
     apple_stand_min = data.get('apple_stand_time')
     if apple_stand_min is None:
         apple_stand_min = data.get('stand_time_min', 0)
@@ -142,36 +216,18 @@ def generate_cache_for_date(date_str, member_idx, member_name, config):
         'workouts': data.get('workouts', []),
         'has_workout': data.get('has_workout', False),
         'zone_times': data.get('zone_times', {'zone_1': 0, 'zone_2': 0, 'zone_3': 0, 'zone_4': 0, 'zone_5': 0}),
+        # V6.1.0: 全天心率样本不写入缓存，保存 Strain 用到的心率区间，rescore.py 据此重算
+        'hr_zone_times': health_scores.get('hr_zone_times'),
         'sleep': data.get('sleep', {}),
         'bedtime': data.get('bedtime') or data.get('sleep', {}).get('bedtime', '--'),
         'waketime': data.get('waketime') or data.get('sleep', {}).get('waketime', '--'),
         'sleep_latency_min': data.get('sleep_latency_min', 20),
-        'sleep_debt_daily': round(daily_debt, 2),
-        'sleep_debt_accumulated': round(accumulated_debt, 2),
-        'health_scores': {
-            'strain': health_scores['strain'],
-            'recovery': health_scores['recovery'],
-            'recovery_status': health_scores['recovery_status'],
-            'sleep_performance': health_scores['sleep_performance'],
-            'sleep_need': health_scores['sleep_need'],
-            'actual_sleep_hours': round(sleep_total, 2),
-            'body_age': health_scores['body_age'],
-            'chronological_age': health_scores['chronological_age'],
-            'age_impact': health_scores['age_impact'],
-            'pace_of_aging': health_scores['pace_of_aging'],
-            'zone_times': health_scores.get('zone_times', {
-                'zone_1': 0, 'zone_2': 0, 'zone_3': 0, 'zone_4': 0, 'zone_5': 0
-            }),
-            'hrv_rmssd': data.get('hrv', {}).get('value', 0) if isinstance(data.get('hrv'), dict) else 0,
-            'rhr': data.get('resting_hr', {}).get('value', 0) if isinstance(data.get('resting_hr'), dict) else 0
-        }
+        **score_cache_fields(data, health_scores, prev_debt),
     }
     
     # 保存缓存
-    cache_file = cache_dir / f"{date_str}_{safe_name}.json"
-    cache_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(cache_file, 'w', encoding='utf-8') as f:
-        json.dump(cache_data, f, ensure_ascii=False, indent=2)
+    history.store.put(date_str, member_name, cache_data)
+    history.remember(date_str, member_name, cache_data)
     
     print(f"   ✅ {date_str} - Strain:{health_scores['strain']:.1f} Recovery:{health_scores['recovery']}% BodyAge:{health_scores['body_age']:.1f}")
     return True
@@ -188,15 +244,189 @@ def generate_date_range(start_date, end_date):
     return dates
 
 
+def generate_member_caches(dates, member_idx, member_name, config, incremental=False, prefetched=None,
+                           changed_dates=None):
+    """为单个成员按日期顺序生成缓存，返回 (成功数, 失败数, 跳过数)
+
+    prefetched 为阶段 1 的提取结果 {日期: (输入文件状态, 数据或 None)}；其中的日期只做评分与睡眠债链，
+    不在其中的日期（计划之后输入又发生变化）现场提取。
+
+    V6.1.0: 每天生成后把输入文件与缓存输出记入成员清单。增量模式下输入未变的日期直接跳过；
+    某天的缓存内容发生变化时，其后 SCORE_LOOKBACK_DAYS 天内的日期都重算（基线、睡眠债依赖之前的缓存），
+    重算结果再变化则继续向后延伸（见 recompute_planner.AffectedFrontier）。
+    changed_dates 给出时为重算计划模式：只重算这些日期及其后受影响的日期，边界之后提前结束。
+    整个过程持有成员锁（并行回填、回填与日报同时运行时同一成员串行写入），缓存为原子写入。
+    """
+    member_cfg = get_member_config(config, member_idx) or {}
+    sleep_config = config.get('sleep_config', {'read_mode': 'next_day', 'start_hour': 20, 'end_hour': 12})
+    cache_dir = get_cache_dir(config, member_cfg)
+    fingerprint = config_fingerprint(config, member_cfg)
+
+    with member_lock(cache_dir, member_name):
+        # 清单与历史在持锁后加载，看到的是上一个写者完成后的状态
+        manifest = CacheManifest(cache_dir, member_name)
+        store = open_history_store(config, cache_dir)
+        history = HealthScoreHistory(cache_dir, store=store)
+        success_count, fail_count, skipped_count = 0, 0, 0
+        frontier = AffectedFrontier()
+        last_changed = max(changed_dates) if changed_dates else None
+        try:
+            # SQLite 存储下缓存写入按事务批量提交（json 存储逐文件写入）
+            with store.batch():
+                for date_str in dates:
+                    sources = export_source_files(date_str, member_cfg.get('health_dir'), member_cfg.get('workout_dir'),
+                                                  sleep_config)
+                    if changed_dates is not None:
+                        if date_str not in changed_dates and not frontier.covers(date_str):
+                            if date_str > last_changed:
+                                break
+                            skipped_count += 1
+                            continue
+                    elif (incremental and not frontier.covers(date_str)
+                          and manifest.is_fresh(date_str, sources, fingerprint, store)):
+                        skipped_count += 1
+                        continue
+
+                    previous_digest = manifest.cache_digest(date_str)
+                    if prefetched is not None and date_str in prefetched:
+                        # 输入文件状态在阶段 1 提取之前记录
+                        source_states, data = prefetched.pop(date_str)
+                        ok = data is not None and generate_cache_for_date(date_str, member_idx, member_name, config,
+                                                                          history, data)
+                    else:
+                        source_states = manifest.describe_sources(date_str, sources)
+                        ok = generate_cache_for_date(date_str, member_idx, member_name, config, history)
+                    if store.backend == 'json':
+                        digest = manifest.record(date_str, source_states, fingerprint,
+                                                 store.path(date_str, member_name) if ok else None)
+                    else:
+                        digest = manifest.record(date_str, source_states, fingerprint, None,
+                                                 store.digest(date_str, member_name) if ok else None)
+                    if digest != previous_digest:
+                        frontier.mark(date_str)
+                    if ok:
+                        success_count += 1
+                    else:
+                        fail_count += 1
+        finally:
+            manifest.save()
+    return success_count, fail_count, skipped_count
+
+
+def _member_job(pos, total, dates, member_idx, member_name, config, incremental, prefetched=None,
+                changed_dates=None):
+    """单个成员的回填任务（可在子进程中执行）"""
+    print(f"\n👤 成员 {pos}/{total}: {member_name}", flush=True)
+    return generate_member_caches(dates, member_idx, member_name, config, incremental=incremental,
+                                  prefetched=prefetched, changed_dates=changed_dates)
+
+
+# ==================== V6.1.0: 两阶段并行回填 ====================
+#
+# 阶段 1：所有 (成员, 日期) 的原始数据提取互不依赖，按连续日期分块提交进程池
+#         （同一块内相邻日期共用导出文件解析缓存）；
+# 阶段 2：每个成员按日期顺序做评分与睡眠债链（只读写内存中的历史窗口，很快），成员之间并行。
+
+EXTRACT_BLOCK_DAYS = 16
+
+
+def get_backfill_workers(config, task_count):
+    """阶段 1 的提取进程数（config.json: extract_workers，0 = CPU 核数）"""
+    workers = config.get('extract_workers', 0)
+    if not isinstance(workers, int) or isinstance(workers, bool) or workers <= 0:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, task_count))
+
+
+def plan_member_dates(dates, member_idx, member_name, config, incremental, changed_dates=None):
+    """需要提取的日期：全量模式为全部日期；增量模式与重算计划模式为变化日期（增量模式下为输入变化的日期）
+    向后展开回看窗口（执行时继续延伸的日期现场提取）"""
+    if changed_dates is not None:
+        return affected_dates(changed_dates, dates[-1] if dates else None)
+    if not incremental:
+        return list(dates)
+    member_cfg = get_member_config(config, member_idx) or {}
+    sleep_config = config.get('sleep_config', {'read_mode': 'next_day', 'start_hour': 20, 'end_hour': 12})
+    cache_dir = get_cache_dir(config, member_cfg)
+    manifest = CacheManifest(cache_dir, member_name)
+    store = open_history_store(config, cache_dir)
+    fingerprint = config_fingerprint(config, member_cfg)
+    stale = []
+    for date_str in dates:
+        sources = export_source_files(date_str, member_cfg.get('health_dir'), member_cfg.get('workout_dir'),
+                                      sleep_config)
+        if not manifest.is_fresh(date_str, sources, fingerprint, store):
+            stale.append(date_str)
+    return affected_dates(stale, dates[-1]) if stale else []
+
+
+def _extract_block(member_idx, member_name, block, config):
+    """提取一块连续日期，返回 [(日期, (输入文件状态, 数据或 None))]
+
+    输入文件状态在提取之前记录（提取期间源文件被改写时，下次仍会判定为变化）；
+    全天心率样本在此换算为心率区间（hr_zone_times），不随结果传回主进程。
+    """
+    member_cfg = get_member_config(config, member_idx) or {}
+    sleep_config = config.get('sleep_config', {'read_mode': 'next_day', 'start_hour': 20, 'end_hour': 12})
+    manifest = CacheManifest(get_cache_dir(config, member_cfg), member_name)
+    age = member_cfg.get('age', 30) or 30
+    results = []
+    for date_str in block:
+        sources = export_source_files(date_str, member_cfg.get('health_dir'), member_cfg.get('workout_dir'),
+                                      sleep_config)
+        source_states = manifest.describe_sources(date_str, sources)
+        data = extract_cache_input(date_str, member_idx, config)
+        if data is not None and 'heart_rate_data' in data:
+            data['hr_zone_times'] = day_hr_zone_times(data, age)
+            del data['heart_rate_data']
+        results.append((date_str, (source_states, data)))
+    return results
+
+
+def prefetch_daily_data(plans, names, config, workers):
+    """阶段 1：并行提取，返回 {成员索引: {日期: (输入文件状态, 数据或 None)}}；names 为 {成员索引: 成员名}"""
+    block_days = max(1, min(EXTRACT_BLOCK_DAYS, -(-max(len(d) for d in plans.values()) // workers)))
+    jobs = [(member_idx, names[member_idx], member_dates[start:start + block_days], config)
+            for member_idx, member_dates in plans.items()
+            for start in range(0, len(member_dates), block_days)]
+    prefetched = {member_idx: {} for member_idx in plans}
+    for (member_idx, _, block, _), result, error in map_members(_extract_block, jobs, workers, workers * 4):
+        if error:
+            # 该块留给阶段 2 现场提取
+            print(f"   ⚠️ 提取 {block[0]} ~ {block[-1]} 失败: {error}")
+            continue
+        prefetched[member_idx].update(result)
+    return prefetched
+
+
 def main():
-    if len(sys.argv) < 2:
+    try:
+        shard, argv = pop_shard_arg(sys.argv[1:])
+        changed_spec, argv = pop_option_arg(argv, '--changed')
+        until, argv = pop_option_arg(argv, '--until')
+        changed = parse_changed_dates(changed_spec) if changed_spec is not None else None
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    args = [a for a in argv if not a.startswith('--')]
+    incremental = '--incremental' in argv
+    if len(args) < 1 and changed is None:
         print("用法:")
-        print(f"  python3 {sys.argv[0]} START_DATE [END_DATE]")
+        print(f"  python3 {sys.argv[0]} START_DATE [END_DATE] [--incremental] [--shard K/N]")
+        print(f"  python3 {sys.argv[0]} --changed DATE[,DATE...] [--until DATE] [--shard K/N]")
         print(f"  python3 {sys.argv[0]} 2026-02-01 2026-03-05    # 批量生成")
         print(f"  python3 {sys.argv[0]} 2026-03-01               # 单日")
+        print(f"  python3 {sys.argv[0]} 2026-02-01 2026-03-05 --incremental    # 只重算输入变化的日期")
+        print(f"  python3 {sys.argv[0]} 2026-02-01 2026-03-05 --shard 0/4      # 只处理第 0 片成员")
+        print(f"  python3 {sys.argv[0]} --changed 2026-03-01   # 导出文件修改后只重算受影响的日期")
         sys.exit(1)
     
-    start_date, end_date = sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else sys.argv[1]
+    if changed is not None:
+        # 重算计划模式：扫描范围从最早的变化日期到 --until（默认今天），实际在受影响边界之后结束
+        start_date = changed[0]
+        end_date = until or datetime.now().strftime('%Y-%m-%d')
+    else:
+        start_date, end_date = args[0], args[1] if len(args) > 1 else args[0]
     
     try:
         datetime.strptime(start_date, '%Y-%m-%d')
@@ -206,39 +436,72 @@ def main():
         sys.exit(1)
     
     config = load_config()
-    members = config.get("members", [])
-    if not members:
+    registry = MemberRegistry.from_config(config)
+    if not len(registry):
         print("❌ config.json 中没有配置成员")
         sys.exit(1)
+    selected = registry.select(shard)
     
     dates = generate_date_range(start_date, end_date)
-    print(f"📅 将生成 {len(dates)} 天的缓存 ({start_date} 到 {end_date})")
-    print(f"👥 成员数: {len(members)}\n")
+    workers = member_workers(config)
+    # V6.1.0: 重算计划模式下每个成员从读取了变化文件的最早缓存日期开始
+    member_changed = {}
+    member_dates = {}
+    if changed is not None:
+        sleep_config = config.get('sleep_config', {'read_mode': 'next_day', 'start_hour': 20, 'end_hour': 12})
+        for idx, member_cfg in selected:
+            cache_dates = [d for d in cache_dates_for_exports(changed, member_cfg, sleep_config) if d <= end_date]
+            member_changed[idx] = set(cache_dates)
+            member_dates[idx] = generate_date_range(cache_dates[0], end_date) if cache_dates else []
+        print(f"📅 导出文件变化: {', '.join(changed)}，重算受影响的日期（最长向后 {SCORE_LOOKBACK_DAYS} 天，"
+              f"缓存变化时继续延伸，至多到 {end_date}）")
+    else:
+        print(f"📅 将生成 {len(dates)} 天的缓存 ({start_date} 到 {end_date}){' [增量]' if incremental else ''}")
+    print(f"👥 成员数: {len(selected)}" + (f"（分片 {shard[0]}/{shard[1]}，共 {len(registry)}）" if shard else "")
+          + (f"，并发 {workers}" if workers > 1 else "") + "\n")
     
     total_generated, total_failed = 0, 0
+
+    # V6.1.0: 阶段 1 —— 所有 (成员, 日期) 的提取并行执行
+    plans = {idx: plan_member_dates(member_dates.get(idx, dates), idx, registry.name(idx), config, incremental,
+                                    member_changed.get(idx))
+             for idx, _ in selected}
+    task_count = sum(len(d) for d in plans.values())
+    extract_workers = get_backfill_workers(config, task_count)
+    prefetched = {}
+    if extract_workers > 1 and task_count > 1:
+        print(f"⚙️  阶段 1: 并行提取 {task_count} 个成员日（{extract_workers} 进程）", flush=True)
+        prefetched = prefetch_daily_data({idx: d for idx, d in plans.items() if d},
+                                         {idx: registry.name(idx) for idx in plans}, config, extract_workers)
+        print(f"⚙️  阶段 2: 按成员顺序评分与累计睡眠债", flush=True)
     
-    for idx, member in enumerate(members):
-        member_name = member.get('name', f'成员{idx+1}')
-        print(f"\n👤 成员 {idx+1}/{len(members)}: {member_name}")
-        success_count, fail_count = 0, 0
-        
-        for date_str in dates:
-            if generate_cache_for_date(date_str, idx, member_name, config):
-                success_count += 1
-            else:
-                fail_count += 1
+    # V6.1.0: 成员之间互不依赖，按分片并发处理（同一成员的日期仍按顺序评分）
+    jobs = [(pos, len(selected), member_dates.get(idx, dates), idx, registry.name(idx), config, incremental,
+             prefetched.pop(idx, None), member_changed.get(idx))
+            for pos, (idx, _) in enumerate(selected, 1)]
+    for (_, _, _, idx, member_name, _, _, _, _), result, error in map_members(
+            _member_job, jobs, workers, member_shard_size(config)):
+        if error:
+            print(f"   ❌ {member_name} 处理失败: {error}")
+            total_failed += len(plans.get(idx) or dates)
+            continue
+        success_count, fail_count, skipped_count = result
         
-        print(f"   完成: {success_count} 成功, {fail_count} 失败")
+        if incremental or changed is not None:
+            print(f"   {member_name} 完成: {success_count} 成功, {fail_count} 失败, {skipped_count} 未变化跳过")
+        else:
+            print(f"   {member_name} 完成: {success_count} 成功, {fail_count} 失败")
         total_generated += success_count
         total_failed += fail_count
     
     print(f"\n{'='*50}")
     print(f"✅ 缓存生成完成")
     print(f"   总计: {total_generated} 成功, {total_failed} 失败")
-    if len(dates) >= 14:
-        print(f"💡 已生成 {len(dates)} 天数据，Pace of Aging 趋势将准确计算")
-    else:
-        print(f"⚠️  只生成了 {len(dates)} 天数据，Pace of Aging 需要至少14天才能准确计算")
+    if changed is None:
+        if len(dates) >= 14:
+            print(f"💡 已生成 {len(dates)} 天数据，Pace of Aging 趋势将准确计算")
+        else:
+            print(f"⚠️  只生成了 {len(dates)} 天数据，Pace of Aging 需要至少14天才能准确计算")
 
 
 if __name__ == '__main__':
@@ -5,7 +5,7 @@ V6.0.6 AI分析报告生成器 - Medical Dashboard 模板版
 - 支持多语言切换 (CN/EN)
 - 严格真实值：缺失即'--'，不估算
 - 仅在有运动时显示心率曲线
-- 支持多成员报告生成（最多3人，控制token消耗）
+- 支持多成员报告生成（V6.1.0: 不限人数，成员注册表见 member_registry.py）
 
 用法:
   python3 scripts/generate_v5_medical_dashboard.py <YYYY-MM-DD> < ai_analysis.json
@@ -24,14 +24,26 @@ from playwright.sync_api import sync_playwright
 
 # V5.9.0: 使用共用工具函数
 sys.path.insert(0, str(Path(__file__).parent))
-from utils import (load_config, safe_member_name, pick_member_ai_analysis, MAX_MEMBERS, 
-                   KJ_TO_KCAL, count_text_units, METRIC_DEFS, CATEGORY_ORDER, CATEGORY_LABELS)
+from utils import (load_config, safe_member_name, pick_member_ai_analysis,
+                   KJ_TO_KCAL, count_text_units, METRIC_DEFS, CATEGORY_ORDER, CATEGORY_LABELS,
+                   build_aggregation_plan, evaluate_aggregation_plan, find_existing_file, member_lock)
 
 # V6.0.5: 导入健康评分模块
 from health_score import calculate_all_scores, HealthScoreHistory
 
 # V6.0.6: 导入健康警告检测模块
 from health_alerts import check_health_alerts
+from history_store import open_history_store
+from member_timeline import MemberTimeline
+from cache_reader import cache_reader_stats
+
+# V6.1.0: 导出文件共享解析缓存
+from export_reader import read_columns, read_export
+from metric_columns import MetricColumns
+from timestamp_decoder import parse_datetime
+
+# V6.1.0: 成员注册表（不限成员数，按成员解析缓存/输出目录）
+from member_registry import MemberRegistry, member_cache_dir, member_output_dir, pop_shard_arg
 
 # ==================== 全局配置（从 config.json 加载）====================
 CONFIG = load_config()
@@ -41,8 +53,8 @@ if LANGUAGE not in ("CN", "EN"):
 MEMBERS = CONFIG.get("members", [])
 ANALYSIS_LIMITS = CONFIG.get("analysis_limits", {})
 
-# 成员数量（最多3人）
-MEMBER_COUNT = min(len(MEMBERS), MAX_MEMBERS)
+# 成员数量
+MEMBER_COUNT = len(MEMBERS)
 
 # ==================== report_metrics 配置（V5.9.0 新增）====================
 REPORT_METRICS_CFG = CONFIG.get("report_metrics", {})
@@ -161,6 +173,8 @@ def _metric_unit(metrics, name: str) -> str:
     """从 metrics 中提取指定指标的单位"""
     if isinstance(metrics, dict):
         m = metrics.get(name, {})
+        if isinstance(m, MetricColumns):
+            return m.unit.strip().lower()
         if isinstance(m, dict):
             return str(m.get('units', '')).strip().lower()
         return ''
@@ -171,24 +185,6 @@ def _metric_unit(metrics, name: str) -> str:
     return ''
 
 
-def _convert_length_to_cm(v: float, unit: str) -> float:
-    """长度单位转换为厘米"""
-    if v is None:
-        return None
-    if unit in ('m', 'meter', 'meters'):
-        return v * 100.0
-    return v
-
-
-def _convert_speed_to_kmh(v: float, unit: str) -> float:
-    """速度单位转换为 km/h"""
-    if v is None:
-        return None
-    if unit in ('m/s', 'meter/s', 'meters/s'):
-        return v * 3.6
-    return v
-
-
 def _display_unit(data: dict, metric_key: str, fallback: str = '') -> str:
     """从 data['_metric_units'] 中获取单位"""
     units_map = data.get('_metric_units', {})
@@ -200,52 +196,8 @@ def _display_unit(data: dict, metric_key: str, fallback: str = '') -> str:
 
 def _parse_datetime_flexible(value):
     """解析多种时间格式（秒/毫秒时间戳、ISO、常见日期字符串）。"""
-    if value is None or value == '':
-        return None
-
-    # 1) 数值类型时间戳
-    if isinstance(value, (int, float)):
-        ts = float(value)
-        if ts > 1e12:  # 毫秒
-            ts /= 1000.0
-        try:
-            return datetime.fromtimestamp(ts)
-        except Exception:
-            return None
-
-    # 2) 字符串
-    text = str(value).strip()
-    if not text:
-        return None
-
-    # 2.1 纯数字字符串
-    try:
-        ts = float(text)
-        if ts > 1e12:
-            ts /= 1000.0
-        return datetime.fromtimestamp(ts)
-    except Exception:
-        pass
-
-    # 2.2 ISO / 带时区
-    iso_text = text.replace('Z', '+00:00')
-    match = re.match(r'(.+?)\s+([+-]\d{4})$', iso_text)
-    if match:
-        dt_part, tz_part = match.groups()
-        iso_text = f"{dt_part}{tz_part[:3]}:{tz_part[3:]}"
-    try:
-        return datetime.fromisoformat(iso_text)
-    except Exception:
-        pass
-
-    # 2.3 常见格式兜底
-    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M'):
-        try:
-            return datetime.strptime(text, fmt)
-        except Exception:
-            continue
-
-    return None
+    # V6.1.0: 与样本时间解码器共用同一份通用解析
+    return parse_datetime(value)
 # =====================================================
 
 HOME = Path.home()
@@ -274,7 +226,9 @@ def get_member_config(index: int):
             "age": member.get("age"),
             "gender": member.get("gender"),
             "height_cm": member.get("height_cm"),
-            "weight_kg": member.get("weight_kg")
+            "weight_kg": member.get("weight_kg"),
+            "cache_dir": member_cache_dir(CONFIG, member),
+            "output_dir": member_output_dir(CONFIG, member),
         }
 
     # 默认配置
@@ -286,7 +240,9 @@ def get_member_config(index: int):
         "age": None,
         "gender": None,
         "height_cm": None,
-        "weight_kg": None
+        "weight_kg": None,
+        "cache_dir": CACHE_DIR,
+        "output_dir": OUTPUT_DIR,
     }
 
 
@@ -369,62 +325,19 @@ def verify_ai_analysis(ai_analysis: dict, selected_metric_keys: list = None) ->
 
 
 def _parse_metrics(date_str: str, health_dir: Path = None):
+    """读取当日导出文件的全部指标（V6.1.0: 列式存储 {指标名: MetricColumns}）"""
     health_dir = health_dir or DEFAULT_HEALTH_DIR
     p = health_dir / f'HealthAutoExport-{date_str}.json'
-    if not p.exists():
-        return {}
     try:
-        data = json.loads(p.read_text(encoding='utf-8'))
+        # V6.1.0: 共享解析缓存；样本在解析时一次性转为按时间排序的数值列
+        columns = read_columns(p)
     except json.JSONDecodeError as e:
         print(f"⚠️ 解析文件失败: {p} - {e}")
         return {}
     except Exception as e:
         print(f"⚠️ 读取文件失败: {p} - {e}")
         return {}
-
-    metrics = {m.get('name'): m for m in data.get('data', {}).get('metrics', [])}
-    if 'sleep_analysis' in data.get('data', {}):
-        metrics['sleep_analysis'] = data['data']['sleep_analysis']
-    return metrics
-
-
-def _values(metrics: dict, name: str, target_date: str = None):
-    m = metrics.get(name, {})
-    arr = m.get('data', []) if isinstance(m, dict) else []
-
-    # V6.0.5: 统一兼容字符串日期与数字时间戳（秒/毫秒）
-    if target_date:
-        filtered_arr = []
-        for x in arr:
-            if not isinstance(x, dict):
-                continue
-            st = x.get('startDate') or x.get('date')
-            if st is None:
-                continue
-
-            st_dt = _parse_datetime_flexible(st)
-            if st_dt is not None:
-                st_date = st_dt.strftime('%Y-%m-%d')
-                if st_date == target_date:
-                    filtered_arr.append(x)
-                continue
-
-            # 兜底：无法解析时按字符串前缀匹配
-            st_str = str(st)
-            if st_str.startswith(target_date):
-                filtered_arr.append(x)
-        arr = filtered_arr
-
-    vals = [x.get('qty') for x in arr if isinstance(x, dict) and x.get('qty') is not None]
-    return vals
-
-
-def _avg(vals):
-    return (sum(vals) / len(vals)) if vals else None
-
-
-def _sum(vals):
-    return (sum(vals)) if vals else None
+    return columns or {}
 
 
 def load_data(date_str: str, health_dir: Path = None, workout_dir: Path = None):
@@ -436,52 +349,27 @@ def load_data(date_str: str, health_dir: Path = None, workout_dir: Path = None):
     if not metrics:
         raise FileNotFoundError(f'未找到源数据: {health_dir}/HealthAutoExport-{date_str}.json')
 
-    hrv_vals = _values(metrics, 'heart_rate_variability', date_str)
-    rhr_vals = _values(metrics, 'resting_heart_rate', date_str)
-    steps_vals = _values(metrics, 'step_count', date_str)
-    dist_vals = _values(metrics, 'walking_running_distance', date_str)
-    active_vals = _values(metrics, 'active_energy', date_str)
-    spo2_vals = _values(metrics, 'blood_oxygen_saturation', date_str)
-    flights_vals = _values(metrics, 'flights_climbed', date_str)
-    stand_vals = _values(metrics, 'apple_stand_time', date_str)
-    basal_vals = _values(metrics, 'basal_energy_burned', date_str)
-    resp_vals = _values(metrics, 'respiratory_rate', date_str)
-
-    # V5.9.0: 新增指标读取
-    heart_vals = _values(metrics, 'heart_rate', date_str)
-    vo2_vals = _values(metrics, 'vo2_max', date_str)
-    exercise_vals = _values(metrics, 'apple_exercise_time', date_str)
-    stand_hour_vals = _values(metrics, 'apple_stand_hour', date_str)
-    physical_effort_vals = _values(metrics, 'physical_effort', date_str)
-
-    walking_step_length_vals = _values(metrics, 'walking_step_length', date_str)
-    walking_hr_avg_vals = _values(metrics, 'walking_heart_rate_average', date_str)
-    walking_asym_vals = _values(metrics, 'walking_asymmetry_percentage', date_str)
-    walking_double_support_vals = _values(metrics, 'walking_double_support_percentage', date_str)
-    walking_speed_vals = _values(metrics, 'walking_speed', date_str)
-
-    running_stride_vals = _values(metrics, 'running_stride_length', date_str)
-    running_vertical_vals = _values(metrics, 'running_vertical_oscillation', date_str)
-    running_ground_vals = _values(metrics, 'running_ground_contact_time', date_str)
-    running_power_vals = _values(metrics, 'running_power', date_str)
-    running_speed_vals = _values(metrics, 'running_speed', date_str)
-
-    stair_speed_vals = _values(metrics, 'stair_speed_up', date_str)
-    breathing_disturb_vals = _values(metrics, 'breathing_disturbances', date_str)
-
-    headphone_audio_vals = _values(metrics, 'headphone_audio_exposure', date_str)
-    environmental_audio_vals = _values(metrics, 'environmental_audio_exposure', date_str)
-
-    # 能量通常是kJ，转kcal
-    active_kcal = (_sum(active_vals) / KJ_TO_KCAL) if active_vals else None
-    basal_kcal = (_sum(basal_vals) / KJ_TO_KCAL) if basal_vals else None
-
-    # 血氧智能单位
-    spo2_avg = _avg(spo2_vals)
-    if spo2_avg is None:
-        spo2 = None
-    else:
-        spo2 = spo2_avg if spo2_avg > 1 else spo2_avg * 100
+    # V6.1.0: 按 METRIC_DEFS 生成的聚合计划一次性计算全部指标（未选中的非必需指标直接跳过）
+    aggregated = evaluate_aggregation_plan(
+        build_aggregation_plan(get_selected_metric_keys()), metrics, date_str
+    )
+
+    def agg_value(key, ndigits=None):
+        value = aggregated.get(key, (None, 0))[0]
+        if value is None or ndigits is None:
+            return value
+        return round(value, ndigits)
+
+    def agg_int(key, rounded=False):
+        value = agg_value(key)
+        if value is None:
+            return None
+        return int(round(value)) if rounded else int(value)
+
+    hrv_count = aggregated.get('hrv', (None, 0))[1]
+    active_kcal = agg_value('active_energy')
+    basal_kcal = agg_value('basal_energy_burned')
+    spo2 = agg_value('spo2')
 
     # 运动 - 按顺序尝试多种文件名格式
     workouts = []
@@ -490,14 +378,12 @@ def load_data(date_str: str, health_dir: Path = None, workout_dir: Path = None):
         workout_dir / f'{date_str}.json',
         health_dir / f'HealthAutoExport-{date_str}.json',
     ]
-    wp = None
-    for p in workout_paths:
-        if p.exists():
-            wp = p
-            break
-    if wp and wp.exists():
+    # V6.1.0: 通过目录索引判断存在性，不再逐个 stat 候选路径
+    wp = find_existing_file(workout_paths)
+    if wp:
         try:
-            wd = json.loads(wp.read_text(encoding='utf-8'))
+            # V6.1.0: 只需要 workouts，大文件流式读取时不保留任何指标样本
+            wd = read_export(wp, keep=()) or {}
         except Exception as e:
             print(f"⚠️ 解析运动文件失败: {wp} - {e}")
             wd = {}
@@ -609,11 +495,7 @@ def load_data(date_str: str, health_dir: Path = None, workout_dir: Path = None):
             sleep_deep_raw = deep_candidate if isinstance(deep_candidate, (int, float)) else None
             sleep_rem_raw = rem_candidate if isinstance(rem_candidate, (int, float)) else None
 
-    # V5.9.0: 单位转换
-    walking_step_length_unit = _metric_unit(metrics, 'walking_step_length')
-    walking_speed_unit = _metric_unit(metrics, 'walking_speed')
-    running_speed_unit = _metric_unit(metrics, 'running_speed')
-
+    # V5.9.0: 单位校验（长度/速度换算已在聚合计划中完成）
     bd_unit = _metric_unit(metrics, 'breathing_disturbances')
     pe_unit = _metric_unit(metrics, 'physical_effort')
     if bd_unit not in ('count', 'count/min', '', 'index'):
@@ -624,44 +506,44 @@ def load_data(date_str: str, health_dir: Path = None, workout_dir: Path = None):
     data = {
         'date': date_str,
         'hrv': {
-            'value': round(_avg(hrv_vals), 1) if hrv_vals else None,
-            'measurement_count': len(hrv_vals),
-            'points': len(hrv_vals),  # 兼容旧字段
+            'value': agg_value('hrv', 1),
+            'measurement_count': hrv_count,
+            'points': hrv_count,  # 兼容旧字段
         },
-        'resting_hr': {'value': round(_avg(rhr_vals)) if rhr_vals else None},
-        'steps': int(_sum(steps_vals)) if steps_vals else None,
-        'distance': round(_sum(dist_vals), 2) if dist_vals else None,
+        'resting_hr': {'value': agg_int('resting_hr', rounded=True)},
+        'steps': agg_int('steps'),
+        'distance': agg_value('distance', 2),
         'active_energy': int(round(total_active_kcal)) if total_active_kcal is not None else None,
         'spo2': round(spo2, 1) if spo2 is not None else None,
-        'flights_climbed': int(_sum(flights_vals)) if flights_vals else None,
-        'apple_stand_time': int(_sum(stand_vals)) if stand_vals else None,
+        'flights_climbed': agg_int('flights_climbed'),
+        'apple_stand_time': agg_int('apple_stand_time'),
         'basal_energy_burned': int(round(basal_kcal)) if basal_kcal is not None else None,
-        'respiratory_rate': round(_avg(resp_vals), 1) if resp_vals else None,
+        'respiratory_rate': agg_value('respiratory_rate', 1),
 
         # V5.9.0: 新增指标
-        'heart_rate_avg': round(_avg(heart_vals), 1) if heart_vals else None,
-        'vo2_max': round(_avg(vo2_vals), 2) if vo2_vals else None,
-        'apple_exercise_time': int(round(_sum(exercise_vals))) if exercise_vals else None,
-        'apple_stand_hour': int(round(_sum(stand_hour_vals))) if stand_hour_vals else None,
-        'physical_effort': round(_avg(physical_effort_vals), 2) if physical_effort_vals else None,
-
-        'walking_step_length': _convert_length_to_cm(_avg(walking_step_length_vals), walking_step_length_unit) if walking_step_length_vals else None,
-        'walking_heart_rate_average': round(_avg(walking_hr_avg_vals), 1) if walking_hr_avg_vals else None,
-        'walking_asymmetry_percentage': round(_avg(walking_asym_vals), 2) if walking_asym_vals else None,
-        'walking_double_support_percentage': round(_avg(walking_double_support_vals), 2) if walking_double_support_vals else None,
-        'walking_speed': _convert_speed_to_kmh(_avg(walking_speed_vals), walking_speed_unit) if walking_speed_vals else None,
-
-        'running_stride_length': round(_avg(running_stride_vals), 2) if running_stride_vals else None,
-        'running_vertical_oscillation': round(_avg(running_vertical_vals), 2) if running_vertical_vals else None,
-        'running_ground_contact_time': round(_avg(running_ground_vals), 2) if running_ground_vals else None,
-        'running_power': round(_avg(running_power_vals), 2) if running_power_vals else None,
-        'running_speed': _convert_speed_to_kmh(_avg(running_speed_vals), running_speed_unit) if running_speed_vals else None,
-
-        'stair_speed_up': round(_avg(stair_speed_vals), 3) if stair_speed_vals else None,
-        'breathing_disturbances': round(_avg(breathing_disturb_vals), 2) if breathing_disturb_vals else None,
-
-        'headphone_audio_exposure': round(_avg(headphone_audio_vals), 1) if headphone_audio_vals else None,
-        'environmental_audio_exposure': round(_avg(environmental_audio_vals), 1) if environmental_audio_vals else None,
+        'heart_rate_avg': agg_value('heart_rate_avg', 1),
+        'vo2_max': agg_value('vo2_max', 2),
+        'apple_exercise_time': agg_int('apple_exercise_time', rounded=True),
+        'apple_stand_hour': agg_int('apple_stand_hour', rounded=True),
+        'physical_effort': agg_value('physical_effort', 2),
+
+        'walking_step_length': agg_value('walking_step_length'),
+        'walking_heart_rate_average': agg_value('walking_heart_rate_average', 1),
+        'walking_asymmetry_percentage': agg_value('walking_asymmetry_percentage', 2),
+        'walking_double_support_percentage': agg_value('walking_double_support_percentage', 2),
+        'walking_speed': agg_value('walking_speed'),
+
+        'running_stride_length': agg_value('running_stride_length', 2),
+        'running_vertical_oscillation': agg_value('running_vertical_oscillation', 2),
+        'running_ground_contact_time': agg_value('running_ground_contact_time', 2),
+        'running_power': agg_value('running_power', 2),
+        'running_speed': agg_value('running_speed'),
+
+        'stair_speed_up': agg_value('stair_speed_up', 3),
+        'breathing_disturbances': agg_value('breathing_disturbances', 2),
+
+        'headphone_audio_exposure': agg_value('headphone_audio_exposure', 1),
+        'environmental_audio_exposure': agg_value('environmental_audio_exposure', 1),
 
         # V5.9.0: 睡眠指标（从 sleep_result 填充）
         'sleep_total_hours': round(sleep_total_raw, 2) if sleep_total_raw is not None else None,
@@ -1353,14 +1235,19 @@ def generate_report(date_str, ai_analysis, template, health_dir=None, workout_di
         member_cfg = members[0] if members else None
 
     # V6.0.5: 计算新的健康评分系统
-    cache_dir = Path(CONFIG.get("cache_dir", str(Path(__file__).parent.parent / 'cache' / 'daily'))).expanduser()
-    history = HealthScoreHistory(cache_dir)
+    cache_dir = member_cache_dir(CONFIG, member_cfg)
+    history_store = open_history_store(CONFIG, cache_dir)
+    member_name = member_cfg.get('name', '默认用户') if member_cfg else '默认用户'
+    # V6.1.0: 成员最近 90 天缓存一次读入，评分、睡眠债与风险信号共用
+    timeline = MemberTimeline(history_store, member_name, date_str)
+    history = HealthScoreHistory(cache_dir, store=history_store)
+    history.attach_timeline(timeline)
 
     health_scores = calculate_all_scores(data, member_cfg, history)
 
     # V6.0.6: 检测健康风险信号
     print(f"   检测健康风险信号...")
-    health_alerts_html = check_health_alerts(data, cache_dir, member_cfg.get('name', '默认用户') if member_cfg else '默认用户', LANGUAGE)
+    health_alerts_html = check_health_alerts(data, cache_dir, member_name, LANGUAGE, history_store, timeline)
     html = html.replace('{{HEALTH_ALERTS}}', health_alerts_html)
 
     # 旧模板占位符兼容：统一映射到 V6 指标，避免中英文模板显示两套体系
@@ -1704,12 +1591,9 @@ def generate_report(date_str, ai_analysis, template, health_dir=None, workout_di
             # 睡眠不足：债务累积（无单日上限，但总债务有上限）
             daily_debt = max(daily_debt, -4.0)  # 单日最多欠 4 小时
 
-        # 获取累积睡眠债（从昨天缓存）
-        cache_dir = Path(CONFIG.get("cache_dir", str(Path(__file__).parent.parent / 'cache' / 'daily'))).expanduser()
-        history = HealthScoreHistory(cache_dir)
-
+        # 获取累积睡眠债（从昨天缓存；成员时间线已读入）
         prev_date = (datetime.strptime(date_str, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
-        prev_debt = history.get_sleep_debt(prev_date, member_cfg.get('name', '默认用户') if member_cfg else '默认用户')
+        prev_debt = timeline.sleep_debt(prev_date)
         
         # 累积债务计算：昨日债务 + 今日变化
         # 注意：债务为正表示有睡眠信用（睡多了），为负表示欠债（睡少了）
@@ -1743,9 +1627,12 @@ def generate_report(date_str, ai_analysis, template, health_dir=None, workout_di
             'spo2': data['spo2'],
             'workouts': data['workouts'],
             'has_workout': data['has_workout'],
-            'zone_times': health_scores.get('zone_times', {
+            # V6.1.0: 顶层保存评分输入（当天运动区间、全天心率区间），rescore.py 据此重算 Strain；
+            # 最终采用的区间见 health_scores.zone_times
+            'zone_times': data.get('zone_times') or {
                 'zone_1': 0, 'zone_2': 0, 'zone_3': 0, 'zone_4': 0, 'zone_5': 0
-            }),
+            },
+            'hr_zone_times': health_scores.get('hr_zone_times'),
             'sleep': sleep_data,
             'bedtime': bedtime,
             'waketime': waketime,
@@ -1770,11 +1657,12 @@ def generate_report(date_str, ai_analysis, template, health_dir=None, workout_di
                 'rhr': data['resting_hr'].get('value', 0) if isinstance(data.get('resting_hr'), dict) else 0
             }
         }
-        safe_name = safe_member_name(member_cfg.get('name', '默认用户') if member_cfg else '默认用户')
-        cache_path = cache_dir / f'{date_str}_{safe_name}.json'
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
-        print(f'   数据缓存: {cache_path}')
+        cache_member = member_cfg.get('name', '默认用户') if member_cfg else '默认用户'
+        # V6.1.0: 与并行的缓存回填互斥，写入为原子替换
+        with member_lock(cache_dir, cache_member):
+            history_store.put(date_str, cache_member, cache_data)
+        timeline.put(date_str, cache_data)
+        print(f'   数据缓存: {history_store.location(date_str, cache_member)}')
     except Exception as e:
         print(f'   缓存保存失败: {e}')
 
@@ -1799,21 +1687,27 @@ if __name__ == '__main__':
     from datetime import datetime
 
     if len(sys.argv) < 2:
-        print('用法: python3 scripts/generate_v5_medical_dashboard.py <YYYY-MM-DD> < ai_analysis.json')
-        print('       支持多成员报告生成（最多3人）')
+        print('用法: python3 scripts/generate_v5_medical_dashboard.py <YYYY-MM-DD> [--shard K/N] < ai_analysis.json')
+        print('       支持多成员报告生成')
         print('')
         print('多成员模式：')
-        print('  1. 成员数量与路径全部从 config.json 读取（最多3人）')
+        print('  1. 成员数量与路径全部从 config.json（或 members_file / members_dir 注册表）读取')
         print('  2. AI 输入支持单对象 / members数组 / 成员名映射字典')
+        print('  3. --shard K/N 只生成索引 % N == K 的成员，可拆分到多个进程并行')
         print('')
         print('当前配置：')
         print(f'  MEMBER_COUNT = {MEMBER_COUNT}')
-        for i in range(min(MEMBER_COUNT, MAX_MEMBERS)):
+        for i in range(MEMBER_COUNT):
             cfg = get_member_config(i)
             print(f'  成员{i+1}: {cfg["name"]} -> {cfg["health_dir"]}')
         sys.exit(1)
 
-    date_str = sys.argv[1]
+    try:
+        shard, cli_args = pop_shard_arg(sys.argv[1:])
+    except ValueError as e:
+        print(f"❌ 错误: {e}")
+        sys.exit(1)
+    date_str = cli_args[0]
 
     # V5.8.1: 预检查模板文件
     from utils import validate_templates_exist
@@ -1825,17 +1719,17 @@ if __name__ == '__main__':
         sys.exit(1)
     print(get_error_msg("template_check_pass"))
 
-    # 限制成员数量在1-3之间（控制token消耗）
     if MEMBER_COUNT == 0:
         print("❌ 错误: config.json 未配置 members，无法生成报告")
         sys.exit(1)
 
-    member_count = min(MEMBER_COUNT, MAX_MEMBERS)
+    selected_members = MemberRegistry(MEMBERS).select(shard)
+    member_count = len(selected_members)
 
     # ============================================
     # 检查多成员名称冲突
     # ============================================
-    member_names = [get_member_config(i)['name'] for i in range(member_count)]
+    member_names = [get_member_config(i)['name'] for i in range(MEMBER_COUNT)]
     safe_names = [safe_member_name(name) for name in member_names]
     
     if len(set(safe_names)) != len(safe_names):
@@ -1848,7 +1742,7 @@ if __name__ == '__main__':
 
     print(f"📊 多成员报告生成模式")
     print(f"   日期: {date_str}")
-    print(f"   成员数: {member_count} (上限3人，控制token消耗)")
+    print(f"   成员数: {member_count}" + (f" (分片 {shard[0]}/{shard[1]}，共 {MEMBER_COUNT})" if shard else ""))
     print("")
 
     # 读取所有成员的AI分析（支持单对象或字典或列表）
@@ -1869,7 +1763,7 @@ if __name__ == '__main__':
 
     processor = MultiMemberProcessor()
 
-    for idx in range(member_count):
+    for idx, _ in selected_members:
         member_cfg = get_member_config(idx)
         member_name = member_cfg['name']
 
@@ -1901,7 +1795,7 @@ if __name__ == '__main__':
 
             # 检查数据文件
             data_file = member_health_dir / f'HealthAutoExport-{date_str}.json'
-            if not data_file.exists():
+            if find_existing_file([data_file]) is None:
                 raise DataError(f"数据文件不存在: {data_file}")
 
             # 读取模板 - V5.8.1: 使用灵活的模板选择
@@ -1928,8 +1822,10 @@ if __name__ == '__main__':
 
             # 保存HTML
             safe_name = safe_member_name(member_name)
-            html_path = OUTPUT_DIR / f'{date_str}-daily-v5-medical-{safe_name}.html'
-            pdf_path = OUTPUT_DIR / f'{date_str}-daily-v5-medical-{safe_name}.pdf'
+            output_dir = member_cfg['output_dir']
+            output_dir.mkdir(parents=True, exist_ok=True)
+            html_path = output_dir / f'{date_str}-daily-v5-medical-{safe_name}.html'
+            pdf_path = output_dir / f'{date_str}-daily-v5-medical-{safe_name}.pdf'
 
             html_path.write_text(html, encoding='utf-8')
 
@@ -1981,6 +1877,9 @@ if __name__ == '__main__':
 
     # 打印摘要
     all_success = processor.print_summary()
+    # V6.1.0: 每日缓存在评分、风险信号之间的复用情况（cache_reader.py）
+    stats = cache_reader_stats()
+    print(f"📦 每日缓存读取: 命中 {stats['hits']}, 解码 {stats['misses']}（缓存 {stats['entries']} 条）")
 
     if not all_success:
         print("⚠️  部分成员处理失败，请检查上述错误信息")
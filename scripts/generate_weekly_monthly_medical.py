@@ -17,8 +17,11 @@ from playwright.sync_api import sync_playwright
 
 # V6.0.5: 使用共用工具函数
 sys.path.insert(0, str(Path(__file__).parent))
-from utils import load_config, safe_member_name, pick_member_ai_analysis, detect_language_mismatch, MAX_MEMBERS, count_text_units
+from utils import load_config, safe_member_name, pick_member_ai_analysis, detect_language_mismatch, count_text_units
 from health_score import calculate_body_age, calculate_pace_of_aging
+from member_registry import MemberRegistry, member_cache_dir, member_output_dir, pop_shard_arg
+from history_store import open_history_store
+from cache_reader import cache_reader_stats
 
 HOME = Path.home()
 TEMPLATE_DIR = Path(__file__).parent.parent / 'templates'
@@ -269,11 +272,7 @@ def load_previous_week_data(current_dates, member_name="默认用户"):
     print(f"   对比上周 {previous_dates[0]} 至 {previous_dates[-1]}")
 
     # 加载上周数据
-    previous_data = []
-    for date in previous_dates:
-        data = load_cache(date, member_name)
-        if data:
-            previous_data.append(data)
+    previous_data = load_cache_range(previous_dates, member_name)
 
     return previous_data
 
@@ -379,25 +378,40 @@ def safe_html_paragraph(value) -> str:
     return safe_html_text(value).replace('\n', '<br>')
 
 
+def member_history_store(member_name="默认用户"):
+    """成员的每日缓存存储（V6.1.0: json 文件或 SQLite，见 history_store.py）"""
+    # V6.1.0: 缓存目录按成员解析（member_dirs / 成员级 cache_dir）
+    return open_history_store(CONFIG, member_cache_dir(CONFIG, find_member(member_name)))
+
+
 def load_cache(date_str, member_name="默认用户"):
     """加载单日缓存数据 - V6.0.5: 统一使用 safe_name 命名规则
     
     重要: 只读取 safe_name 格式，移除旧格式回退以避免混淆
     """
-    from utils import safe_member_name
-    safe_name = safe_member_name(member_name)
-
-    # V6.0.5: 只使用标准 safe_name 路径
-    cache_path = CACHE_DIR / f'{date_str}_{safe_name}.json'
-
-    if cache_path.exists():
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    store = member_history_store(member_name)
+    data = store.get(date_str, member_name)
+    if data is not None:
+        return data
     
     # 调试输出帮助排查
-    print(f"   ℹ️ 缓存未找到: {cache_path}")
+    print(f"   ℹ️ 缓存未找到: {store.location(date_str, member_name)}")
     return None
 
+
+def load_cache_range(dates, member_name="默认用户"):
+    """按日期顺序加载多天缓存，跳过缺失日期（SQLite 存储为一次范围查询）"""
+    store = member_history_store(member_name)
+    found = store.get_many(dates, member_name)
+    result = []
+    for date_str in dates:
+        data = found.get(date_str)
+        if data is not None:
+            result.append(data)
+        else:
+            print(f"   ℹ️ 缓存未找到: {store.location(date_str, member_name)}")
+    return result
+
 def _sleep_total(sleep_obj: dict) -> float:
     """兼容新旧睡眠字段：total_hours / total"""
     if not isinstance(sleep_obj, dict):
@@ -655,11 +669,7 @@ def generate_weekly_report(start_date, end_date, ai_analysis, template, member_n
         current += timedelta(days=1)
 
     # 加载每日数据
-    weekly_data = []
-    for date in week_dates:
-        data = load_cache(date, member_name)
-        if data:
-            weekly_data.append(data)
+    weekly_data = load_cache_range(week_dates, member_name)
 
     if not weekly_data:
         print(f"⚠️ 警告: 未找到 {start_date} 至 {end_date} 的缓存数据")
@@ -693,10 +703,11 @@ def generate_weekly_report(start_date, end_date, ai_analysis, template, member_n
     avg_steps = sum(steps_values) / len(steps_values) if steps_values else 0
     avg_sleep = sum(sleep_values) / len(sleep_values) if sleep_values else 0
 
-    # 生成每日明细行
+    # 生成每日明细行（复用上面已加载的缓存）
+    weekly_by_date = {d.get('date'): d for d in weekly_data}
     daily_rows = []
     for date in week_dates:
-        data = load_cache(date, member_name)
+        data = weekly_by_date.get(date)
         if data:
             workout_mark = '✓' if data.get('has_workout') else '-'
 
@@ -744,12 +755,7 @@ def generate_weekly_report(start_date, end_date, ai_analysis, template, member_n
     # V6.0.5 FIX: 计算周报 Body Age，确保只使用当前成员的数据
     
     # 获取成员配置
-    members = CONFIG.get('members', [])
-    member_cfg = None
-    for m in members:
-        if m.get('name') == member_name or safe_member_name(m.get('name', '')) == safe_member_name(member_name):
-            member_cfg = m
-            break
+    member_cfg = REGISTRY.find(member_name)
     
     # V6.0.5 FIX: 计算周报 Body Age，确保只使用当前成员的数据
     if member_cfg and weekly_data:
@@ -993,11 +999,7 @@ def generate_monthly_report(year, month, ai_analysis, template, member_name="默
 
     # 加载整月数据
     month_dates = [f"{year}-{month:02d}-{day:02d}" for day in range(1, last_day + 1)]
-    monthly_data = []
-    for date in month_dates:
-        data = load_cache(date, member_name)
-        if data:
-            monthly_data.append(data)
+    monthly_data = load_cache_range(month_dates, member_name)
 
     if not monthly_data:
         print(f"⚠️ 警告: 未找到 {year}-{month:02d} 的缓存数据")
@@ -1107,12 +1109,7 @@ def generate_monthly_report(year, month, ai_analysis, template, member_name="默
     # V6.0.5 FIX: 计算月报Body Age，确保只使用当前成员的数据
     
     # 获取成员配置
-    members = CONFIG.get("members", [])
-    member_cfg = None
-    for m in members:
-        if safe_member_name(m.get("name", "")) == safe_member_name(member_name):
-            member_cfg = m
-            break
+    member_cfg = REGISTRY.find(member_name)
     
     # V6.0.5 FIX: 计算月报 Body Age，确保只使用当前成员的数据
     if member_cfg and monthly_data:
@@ -1177,11 +1174,7 @@ def generate_monthly_report(year, month, ai_analysis, template, member_name="默
     ]
 
     # 加载上月所有可用数据
-    previous_data = []
-    for date in prev_month_dates:
-        data = load_cache(date, member_name)
-        if data:
-            previous_data.append(data)
+    previous_data = load_cache_range(prev_month_dates, member_name)
 
     if previous_data:
         print(f"   上月数据: {len(previous_data)}/{len(prev_month_dates)} 天")
@@ -1324,9 +1317,15 @@ def generate_recommendations_html(recommendations):
 
     return '\n'.join(html_parts)
 
-# 成员数量（最多3人）
+# 成员数量
 MEMBERS = CONFIG.get("members", [])
-MEMBER_COUNT = min(len(MEMBERS), MAX_MEMBERS)
+MEMBER_COUNT = len(MEMBERS)
+REGISTRY = MemberRegistry(MEMBERS)
+
+
+def find_member(member_name):
+    """按成员名查找成员配置（找不到时返回仅含名称的条目，目录按全局配置解析）"""
+    return REGISTRY.find(member_name) or {"name": member_name}
 
 def get_member_config(index: int):
     """获取指定成员的配置"""
@@ -1336,13 +1335,15 @@ def get_member_config(index: int):
             "name": member.get("name", f"成员{index+1}"),
             "health_dir": Path(member.get("health_dir", "~/Health Auto Export/Health Data")).expanduser(),
             "workout_dir": Path(member.get("workout_dir", "~/Health Auto Export/Workout Data")).expanduser(),
-            "email": member.get("email", "")
+            "email": member.get("email", ""),
+            "output_dir": member_output_dir(CONFIG, member),
         }
     return {
         "name": f"成员{index+1}",
         "health_dir": Path('~/Health Auto Export/Health Data').expanduser(),
         "workout_dir": Path('~/Health Auto Export/Workout Data').expanduser(),
-        "email": ""
+        "email": "",
+        "output_dir": OUTPUT_DIR,
     }
 
 def main():
@@ -1358,10 +1359,18 @@ def main():
         except Exception as e:
             print(f"⚠️  无法删除旧的 AI 分析文件: {e}", file=sys.stderr)
 
+    # V6.1.0: --shard K/N 只生成索引 % N == K 的成员；取出后其余参数位置不变
+    try:
+        shard, cli_args = pop_shard_arg(sys.argv[1:])
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    sys.argv[1:] = cli_args
+
     if len(sys.argv) < 2:
         print('用法:')
-        print('  周报: python3 scripts/generate_weekly_monthly_medical.py weekly <start_date> <end_date> < ai_analysis.json')
-        print('  月报: python3 scripts/generate_weekly_monthly_medical.py monthly <year> <month> < ai_analysis.json')
+        print('  周报: python3 scripts/generate_weekly_monthly_medical.py weekly <start_date> <end_date> [--shard K/N] < ai_analysis.json')
+        print('  月报: python3 scripts/generate_weekly_monthly_medical.py monthly <year> <month> [--shard K/N] < ai_analysis.json')
         sys.exit(1)
 
     report_type = sys.argv[1]
@@ -1379,7 +1388,8 @@ def main():
         print(_err('no_members'))
         sys.exit(1)
 
-    member_count = min(MEMBER_COUNT, MAX_MEMBERS)
+    selected_members = REGISTRY.select(shard)
+    member_count = len(selected_members)
 
     if isinstance(raw_ai_analyses, dict) and "members" in raw_ai_analyses:
         raw_ai_analyses = raw_ai_analyses["members"]
@@ -1405,9 +1415,11 @@ def main():
         with open(template_path, 'r', encoding='utf-8') as f:
             template = f.read()
 
-        for idx in range(member_count):
+        for pos, (idx, _) in enumerate(selected_members, 1):
             member_cfg = get_member_config(idx)
             member_name = member_cfg['name']
+            output_dir = member_cfg['output_dir']
+            output_dir.mkdir(parents=True, exist_ok=True)
 
             try:
                 # 健壮的成员匹配逻辑 - V5.8.1: 使用 pick_member_ai_analysis
@@ -1418,7 +1430,7 @@ def main():
                     continue
 
                 print(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-                print(f"🧑 正在为成员 {idx+1}/{member_count} 生成周报: {member_name}")
+                print(f"🧑 正在为成员 {pos}/{member_count} 生成周报: {member_name}")
 
                 # 生成报告
                 html = generate_weekly_report(start_date, end_date, ai_analysis, template, member_name)
@@ -1429,11 +1441,11 @@ def main():
                 safe_name = safe_member_name(member_name)
 
                 # 保存HTML
-                html_path = OUTPUT_DIR / f'{start_date}_to_{end_date}-weekly-medical-{safe_name}.html'
+                html_path = output_dir / f'{start_date}_to_{end_date}-weekly-medical-{safe_name}.html'
                 html_path.write_text(html, encoding='utf-8')
 
                 # 生成PDF
-                pdf_path = OUTPUT_DIR / f'{start_date}_to_{end_date}-weekly-medical-{safe_name}.pdf'
+                pdf_path = output_dir / f'{start_date}_to_{end_date}-weekly-medical-{safe_name}.pdf'
                 browser = None
                 try:
                     with sync_playwright() as p:
@@ -1499,9 +1511,11 @@ def main():
         with open(template_path, 'r', encoding='utf-8') as f:
             template = f.read()
 
-        for idx in range(member_count):
+        for pos, (idx, _) in enumerate(selected_members, 1):
             member_cfg = get_member_config(idx)
             member_name = member_cfg['name']
+            output_dir = member_cfg['output_dir']
+            output_dir.mkdir(parents=True, exist_ok=True)
 
             try:
                 # 健壮的成员匹配逻辑 - V5.8.1: 使用 pick_member_ai_analysis
@@ -1512,7 +1526,7 @@ def main():
                     continue
 
                 print(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-                print(f"🧑 正在为成员 {idx+1}/{member_count} 生成月报: {member_name}")
+                print(f"🧑 正在为成员 {pos}/{member_count} 生成月报: {member_name}")
 
                 # 生成报告
                 html = generate_monthly_report(year, month, ai_analysis, template, member_name)
@@ -1523,11 +1537,11 @@ def main():
                 safe_name = safe_member_name(member_name)
 
                 # 保存HTML
-                html_path = OUTPUT_DIR / f'{year}-{month:02d}-monthly-medical-{safe_name}.html'
+                html_path = output_dir / f'{year}-{month:02d}-monthly-medical-{safe_name}.html'
                 html_path.write_text(html, encoding='utf-8')
 
                 # 生成PDF
-                pdf_path = OUTPUT_DIR / f'{year}-{month:02d}-monthly-medical-{safe_name}.pdf'
+                pdf_path = output_dir / f'{year}-{month:02d}-monthly-medical-{safe_name}.pdf'
                 browser = None
                 try:
                     with sync_playwright() as p:
@@ -1572,6 +1586,9 @@ def main():
     # 打印摘要并确定退出码
     print(f"\n{'='*60}")
     print(f"📊 生成摘要: 成功={success_count}, 失败={fail_count}, 跳过={skip_count}")
+    # V6.1.0: 每日缓存读取复用情况（cache_reader.py）
+    stats = cache_reader_stats()
+    print(f"📦 每日缓存读取: 命中 {stats['hits']}, 解码 {stats['misses']}（缓存 {stats['entries']} 条）")
     print(f"{'='*60}")
 
     if success_count == 0 or fail_count > 0:
@@ -30,10 +30,15 @@ class HealthAlert:
 class HealthAlertDetector:
     """健康风险信号检测器"""
     
-    def __init__(self, cache_dir: Path, language: str = "CN"):
+    def __init__(self, cache_dir: Path, language: str = "CN", store=None, timeline=None):
+        from history_store import JsonHistoryStore
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.language = language
+        # V6.1.0: 历史缓存经由存储后端读取（json 文件或 SQLite）
+        self.store = store if store is not None else JsonHistoryStore(self.cache_dir)
+        # V6.1.0: 日报已一次读入的成员时间线（member_timeline.py），回看窗口以报告日期为"今天"
+        self.timeline = timeline
         
         self.texts = {
             "CN": {
@@ -72,23 +77,28 @@ class HealthAlertDetector:
         return text
     
     def _get_cache(self, date_str: str, member_name: str) -> Optional[Dict]:
-        from utils import safe_member_name
-        safe_name = safe_member_name(member_name)
-        cache_file = self.cache_dir / f"{date_str}_{safe_name}.json"
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return None
-        return None
+        try:
+            return self.store.get(date_str, member_name)
+        except Exception:
+            return None
+
+    def _get_recent_caches(self, member_name: str, days: int) -> List[Tuple[str, Optional[Dict]]]:
+        """最近 days 天（含今天，从近到远）的缓存，一次范围读取"""
+        if self.timeline is not None and days <= self.timeline.days:
+            return self.timeline.recent(days)
+        today = datetime.now()
+        dates = [(today - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+        try:
+            found = self.store.get_many(dates, member_name)
+        except Exception:
+            found = {}
+        return [(date, found.get(date)) for date in dates]
     
     def _get_hrv_history(self, member_name: str, days: int = 14) -> List[Tuple[str, float]]:
+        if self.timeline is not None and days <= self.timeline.days:
+            return self.timeline.hrv_series(days)
         results = []
-        today = datetime.now()
-        for i in range(days):
-            date = (today - timedelta(days=i)).strftime('%Y-%m-%d')
-            cache = self._get_cache(date, member_name)
+        for date, cache in self._get_recent_caches(member_name, days):
             if cache:
                 hrv = cache.get('hrv', {}).get('value')
                 if isinstance(hrv, (int, float)) and hrv > 0:
@@ -96,11 +106,10 @@ class HealthAlertDetector:
         return results
     
     def _get_rhr_history(self, member_name: str, days: int = 7) -> List[Tuple[str, float]]:
+        if self.timeline is not None and days <= self.timeline.days:
+            return self.timeline.rhr_series(days)
         results = []
-        today = datetime.now()
-        for i in range(days):
-            date = (today - timedelta(days=i)).strftime('%Y-%m-%d')
-            cache = self._get_cache(date, member_name)
+        for date, cache in self._get_recent_caches(member_name, days):
             if cache:
                 rhr = cache.get('resting_hr', {}).get('value')
                 if isinstance(rhr, (int, float)) and rhr > 0:
@@ -307,7 +316,8 @@ class HealthAlertDetector:
         return '\n'.join(html_parts)
 
 
-def check_health_alerts(data: Dict, cache_dir: Path, member_name: str, language: str = "CN") -> str:
-    detector = HealthAlertDetector(cache_dir, language)
+def check_health_alerts(data: Dict, cache_dir: Path, member_name: str, language: str = "CN", store=None,
+                        timeline=None) -> str:
+    detector = HealthAlertDetector(cache_dir, language, store, timeline)
     alerts = detector.detect_all(data, member_name)
     return detector.generate_html(alerts)
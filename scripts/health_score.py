@@ -14,14 +14,32 @@ import json
 import re
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
+from functools import lru_cache
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from timestamp_decoder import TimestampDecoder
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 # ============ V6.0.5 配置常量 ============
 BASELINE_DAYS = 14              # HRV/RHR/呼吸率基线天数
 BODY_AGE_DAYS = 30              # Body Age 计算用天数
 PACE_SHORT_TERM_DAYS = 14       # Pace of Aging 短期窗口 (从7天增加到14天)
 PACE_LONG_TERM_DAYS = 30        # Pace of Aging 长期窗口 (从14天增加到30天)
+HISTORY_WINDOW_DAYS = 30        # V6.1.0: 评分前一次性预载的历史缓存天数（覆盖各子计算的最大回看窗口）
+# V6.1.0: calculate_all_scores 读取的历史窗口（含当天的窗口按天数计）
+SLEEP_CONSISTENCY_DAYS = 7      # 睡眠规律性：前 7 天入睡/起床时间
+METRIC_BASELINE_DAYS = 21       # 恢复基线：前 21 天 HRV/RHR/呼吸率
+BODY_AGE_RECENT_DAYS = 7        # Body Age：含当天最近 7 天
+PACE_RECENT_DAYS = 14           # Pace of Aging：含当天最近 14 天
+# 某天缓存变化后，其后最多这么多天的评分会随之变化（前一天评分/睡眠债为 1 天）
+SCORE_LOOKBACK_DAYS = max(1, SLEEP_CONSISTENCY_DAYS, METRIC_BASELINE_DAYS,
+                          BODY_AGE_RECENT_DAYS - 1, PACE_RECENT_DAYS - 1)
 RECOVERY_WEIGHTS = {
     'hrv': 0.45,               # HRV 权重 45% (略微降低)
     'rhr': 0.28,               # RHR 权重 28% (略微降低)
@@ -29,6 +47,17 @@ RECOVERY_WEIGHTS = {
     'sleep_consistency': 0.07, # 睡眠规律性权重 7% (新增，接近WHOOP)
     'respiratory': 0.03        # 呼吸率权重 3% (保持不变)
 }
+# 没有当日呼吸率数据时，呼吸率权重 3% 平均分配给 HRV 和 RHR
+RECOVERY_WEIGHTS_NO_RESPIRATORY = {
+    'hrv': 0.465,               # 45% + 1.5%
+    'rhr': 0.295,               # 28% + 1.5%
+    'sleep': 0.17,
+    'sleep_consistency': 0.07,
+    'respiratory': 0.0          # 无数据时呼吸率不贡献分数
+}
+BODY_AGE_METRICS = ('sleep_hours', 'steps', 'rhr', 'hrv', 'respiratory_rate')
+HR_ZONE_TABLE_MAX = 250         # V6.1.0: 心率区间查找表覆盖 0~250 bpm，超出范围逐点计算
+HR_ZONE_NUMPY_MIN_POINTS = 64   # V6.1.0: 样本数达到此值时区间累计改用 numpy.bincount
 
 # 数据合理性检查阈值
 HRV_MIN_VALID = 10.0      # ms, 低于此值视为异常
@@ -97,6 +126,58 @@ def get_hr_zone(hr: int, max_hr: int, rhr: int = None) -> int:
         else: return 5              # Zone 5: >= 90%
 
 
+class HRZoneClassifier:
+    """V6.1.0: 心率 -> 区间查找表
+
+    同一天的年龄、性别、静息心率固定，按 (age, gender, rhr) 一次算出 0~HR_ZONE_TABLE_MAX bpm
+    每个整数心率的区间（逐项调用 get_hr_zone，结果与逐点计算一致），区间累计为查表 + 累加。
+    通过 hr_zone_classifier() 获取，相同参数复用同一张表。
+    """
+
+    __slots__ = ('max_hr', 'rhr', 'table', '_table_np')
+
+    def __init__(self, age: int, gender: str = 'male', rhr: int = None):
+        self.max_hr = calculate_max_hr(age, gender)
+        self.rhr = rhr
+        self.table = bytes(get_hr_zone(hr, self.max_hr, rhr) for hr in range(HR_ZONE_TABLE_MAX + 1))
+        self._table_np = None
+
+    def zone(self, hr: int) -> int:
+        """整数心率的区间 0-5"""
+        if 0 <= hr <= HR_ZONE_TABLE_MAX:
+            return self.table[hr]
+        return get_hr_zone(hr, self.max_hr, self.rhr)
+
+    def accumulate(self, hrs, durations, start=0) -> List:
+        """按心率（整数）与时长累计各区间，返回下标 0-5 的总时长
+
+        累加顺序与逐点相加一致（numpy.bincount 同样按样本顺序累加），没有样本的区间保持 start。
+        """
+        if NUMPY_AVAILABLE and len(hrs) >= HR_ZONE_NUMPY_MIN_POINTS:
+            try:
+                hr_idx = np.asarray(hrs, dtype=np.int64)
+            except OverflowError:
+                hr_idx = np.asarray([-1])
+            if hr_idx.size and 0 <= hr_idx.min() and hr_idx.max() <= HR_ZONE_TABLE_MAX:
+                if self._table_np is None:
+                    self._table_np = np.frombuffer(self.table, dtype=np.uint8)
+                zones = self._table_np[hr_idx]
+                sums = np.bincount(zones, weights=np.asarray(durations, dtype=np.float64), minlength=6).tolist()
+                counts = np.bincount(zones, minlength=6).tolist()
+                return [sums[z] if counts[z] else start for z in range(6)]
+        totals = [start] * 6
+        table = self.table
+        for hr, duration in zip(hrs, durations):
+            totals[table[hr] if 0 <= hr <= HR_ZONE_TABLE_MAX else self.zone(hr)] += duration
+        return totals
+
+
+@lru_cache(maxsize=256)
+def hr_zone_classifier(age: int, gender: str = 'male', rhr: int = None) -> HRZoneClassifier:
+    """V6.1.0: 按 (age, gender, rhr) 复用心率区间查找表"""
+    return HRZoneClassifier(age, gender, rhr)
+
+
 def _parse_timestamp(value):
     if value in (None, '', '--'):
         return None
@@ -212,7 +293,8 @@ def calculate_strain_simple(active_energy: float, steps: int,
                            hr_data: List[Dict] = None, 
                            weight_kg: float = 70.0,
                            gender: str = 'male',
-                           rhr: int = None) -> Tuple[float, Dict]:
+                           rhr: int = None,
+                           hr_zone_times: Dict = None) -> Tuple[float, Dict]:
     """
     简化版Strain计算 V6.0.5（没有全天HR数据时使用）
     基于活动能量、步数、运动记录和心率数据估算
@@ -294,7 +376,10 @@ def calculate_strain_simple(active_energy: float, steps: int,
         strain = max(strain, daily_activity_strain)
     
     # V6.0.5: 如果有心率数据，从心率数据计算真实zone_times
-    if hr_data and len(hr_data) > 0:
+    # V6.1.0: hr_zone_times 为调用方已算好的心率区间（每日缓存不保存全天心率样本）
+    if hr_zone_times is not None:
+        zone_times = hr_zone_times
+    elif hr_data and len(hr_data) > 0:
         zone_times = calculate_zone_times_from_hr_data(hr_data, age, rhr)
     else:
         # 没有心率数据时，基于运动估算zone分布
@@ -444,6 +529,30 @@ def _sum_zone_minutes(zone_times: Dict) -> float:
     return total
 
 
+def _timeline_seconds(hr_timeline: List[Dict]) -> List[Optional[float]]:
+    """V6.1.0: 心率时间线每个点只解析一次时间
+
+    完整时间戳走 TimestampDecoder（首点嗅探格式后按固定位置切片）；
+    HH:MM 等仅时间格式解码器不支持，回退 _parse_timestamp_seconds 后整条时间线都用它。
+    """
+    decoder = TimestampDecoder()
+    use_decoder = True
+    seconds: List[Optional[float]] = []
+    for point in hr_timeline:
+        ts = point.get('timestamp') or point.get('date') or point.get('time')
+        value = None
+        if use_decoder:
+            decoded = decoder.decode(ts)
+            if decoded is not None:
+                value = decoded[0]
+        if value is None:
+            value = _parse_timestamp_seconds(ts)
+            if value is not None and value < 100000:
+                use_decoder = False
+        seconds.append(value)
+    return seconds
+
+
 def calculate_zone_times_from_workouts(workouts: List[Dict], age: int, rhr: int = None) -> Dict:
     """从 workout 列表尽可能恢复真实的心率区间时间。
 
@@ -452,14 +561,17 @@ def calculate_zone_times_from_workouts(workouts: List[Dict], age: int, rhr: int
         age: 年龄
         rhr: 静息心率(可选)，用于HRR计算
     """
-    max_hr = calculate_max_hr(age)
-    zone_times = {'zone_1': 0.0, 'zone_2': 0.0, 'zone_3': 0.0, 'zone_4': 0.0, 'zone_5': 0.0}
+    classifier = hr_zone_classifier(age, rhr=rhr)
+    # V6.1.0: 先按顺序收集 (心率, 分钟)，最后一次查表累计
+    hrs: List[int] = []
+    durations: List[float] = []
 
     for workout in workouts or []:
         duration_min = float(workout.get('duration_min') or 0)
         hr_timeline = workout.get('hr_timeline') or []
 
         if hr_timeline:
+            timeline_seconds = _timeline_seconds(hr_timeline)
             for i in range(len(hr_timeline)):
                 point = hr_timeline[i]
                 hr = point.get('hr')
@@ -472,10 +584,8 @@ def calculate_zone_times_from_workouts(workouts: List[Dict], age: int, rhr: int
 
                 duration = 1.0
                 if i < len(hr_timeline) - 1:
-                    current_ts = point.get('timestamp') or point.get('date') or point.get('time')
-                    next_ts = hr_timeline[i + 1].get('timestamp') or hr_timeline[i + 1].get('date') or hr_timeline[i + 1].get('time')
-                    ts1 = _parse_timestamp_seconds(current_ts)
-                    ts2 = _parse_timestamp_seconds(next_ts)
+                    ts1 = timeline_seconds[i]
+                    ts2 = timeline_seconds[i + 1]
                     if ts1 is not None and ts2 is not None:
                         # 处理跨天情况：如果时间差为负（比如23:59到00:01）
                         raw_gap = ts2 - ts1
@@ -502,64 +612,101 @@ def calculate_zone_times_from_workouts(workouts: List[Dict], age: int, rhr: int
                     else:
                         duration = 1.0
 
-                zone = get_hr_zone(int(hr), max_hr, rhr)
-                if zone >= 1:
-                    zone_times[f'zone_{zone}'] += duration
-                # V6.0.5: Zone 0 不再计入任何zone，避免strain计算偏差
+                hrs.append(int(hr))
+                durations.append(duration)
             continue
 
         avg_hr = workout.get('avg_hr')
         if isinstance(avg_hr, (int, float)) and duration_min > 0:
-            zone = get_hr_zone(int(avg_hr), max_hr, rhr)  # 传入 rhr
-            if zone >= 1:
-                zone_times[f'zone_{zone}'] += duration_min
+            hrs.append(int(avg_hr))
+            durations.append(duration_min)
 
-    return {k: round(v, 1) for k, v in zone_times.items()}
+    # V6.0.5: Zone 0 不再计入任何zone，避免strain计算偏差
+    totals = classifier.accumulate(hrs, durations, start=0.0)
+    return {f'zone_{z}': round(totals[z], 1) for z in range(1, 6)}
 
 
 
-def calculate_zone_times_from_hr_data(hr_data: List[Dict], age: int, rhr: int = None) -> Dict:
-    """从心率数据计算心率区间分布时间，兼容字符串/秒/毫秒时间戳。"""
-    max_hr = calculate_max_hr(age)
-    zone_times = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+def calculate_zone_times_from_hr_data(hr_data, age: int, rhr: int = None) -> Dict:
+    """从心率数据计算心率区间分布时间，兼容字符串/秒/毫秒时间戳。
 
+    V6.1.0: hr_data 也可以是已按时间排序的 MetricColumns（heart_rate 列），
+    此时直接读取 epoch/qty 列，跳过逐点时间解析与排序。
+    """
+    empty = {'zone_1': 0, 'zone_2': 0, 'zone_3': 0, 'zone_4': 0, 'zone_5': 0}
     if not hr_data or len(hr_data) < 2:
-        return {'zone_1': 0, 'zone_2': 0, 'zone_3': 0, 'zone_4': 0, 'zone_5': 0}
-
-    parsed = []
-    for point in hr_data:
-        dt = _parse_timestamp(point.get('timestamp'))
-        hr = point.get('hr', 60)
-        if dt is not None and isinstance(hr, (int, float)) and hr > 0:
-            parsed.append((dt, float(hr)))
-
-    parsed.sort(key=lambda x: x[0])
-    if len(parsed) < 2:
-        return {'zone_1': 0, 'zone_2': 0, 'zone_3': 0, 'zone_4': 0, 'zone_5': 0}
-
-    for i in range(len(parsed) - 1):
-        dt1, hr = parsed[i]
-        dt2, _ = parsed[i + 1]
-        duration_min = (dt2 - dt1).total_seconds() / 60.0
+        return empty
+
+    if hasattr(hr_data, 'points'):
+        arrays = hr_data.to_numpy() if NUMPY_AVAILABLE and len(hr_data) >= HR_ZONE_NUMPY_MIN_POINTS else None
+        if arrays is not None:
+            # V6.1.0: 列数据已按时间排序，直接按数组计算
+            epoch, qty = arrays
+            valid = qty > 0
+            if int(valid.sum()) < 2:
+                return empty
+            if _hr_array_in_table(qty[valid]):
+                return _zone_times_from_arrays(epoch[valid], qty[valid], age, rhr)
+        points = [(ts, hr) for ts, hr in hr_data.points() if hr > 0]
+    else:
+        # V6.1.0: 同一心率序列的时间格式固定，由解码器嗅探一次后走快速路径
+        decoder = TimestampDecoder()
+        points = []
+        for point in hr_data:
+            hr = point.get('hr', 60)
+            if not isinstance(hr, (int, float)) or hr <= 0:
+                continue
+            ts = point.get('timestamp')
+            decoded = decoder.decode(ts)
+            if decoded is not None:
+                points.append((decoded[0], float(hr)))
+                continue
+            dt = _parse_timestamp(ts)
+            if dt is not None:
+                points.append((dt.timestamp(), float(hr)))
+        points.sort(key=lambda x: x[0])
+
+    if len(points) < 2:
+        return empty
+    return _zone_times_from_sorted_points(points, age, rhr)
+
+
+def _zone_times_from_sorted_points(points: List[Tuple[float, float]], age: int, rhr: int = None) -> Dict:
+    """按时间排序的 (epoch 秒, 心率) 序列 -> 各区间分钟数"""
+    if NUMPY_AVAILABLE and len(points) >= HR_ZONE_NUMPY_MIN_POINTS:
+        ts, hr = np.asarray(points, dtype=np.float64).T
+        if _hr_array_in_table(hr):
+            return _zone_times_from_arrays(ts, hr, age, rhr)
+
+    hrs: List[int] = []
+    durations: List[float] = []
+    for i in range(len(points) - 1):
+        ts1, hr = points[i]
+        ts2 = points[i + 1][0]
+        duration_min = (ts2 - ts1) / 60.0
         if duration_min <= 0:
             continue
         # 防止导出粒度稀疏时，单点心率被放大成超长区间
-        duration_min = min(duration_min, 5.0)
-        zone = get_hr_zone(int(hr), max_hr, rhr)
-        if zone >= 1:
-            zone_times[zone] += duration_min
-        elif zone == 0:
-            # V6.0.5修复: Zone 0 (恢复区) 不计入任何zone，避免strain低估
-            # 这部分时间代表完全休息，对strain无贡献
-            pass
+        hrs.append(int(hr))
+        durations.append(min(duration_min, 5.0))
 
-    return {
-        'zone_1': round(zone_times[1], 1),
-        'zone_2': round(zone_times[2], 1),
-        'zone_3': round(zone_times[3], 1),
-        'zone_4': round(zone_times[4], 1),
-        'zone_5': round(zone_times[5], 1)
-    }
+    # V6.0.5修复: Zone 0 (恢复区) 不计入任何zone，避免strain低估
+    totals = hr_zone_classifier(age, rhr=rhr).accumulate(hrs, durations)
+    return {f'zone_{z}': round(totals[z], 1) for z in range(1, 6)}
+
+
+def _hr_array_in_table(hr) -> bool:
+    """心率数组是否全部为查找表范围内的有限值（否则走逐点路径，保持原有的取整与异常行为）"""
+    return bool(np.isfinite(hr).all()) and float(hr.min()) >= 0 and float(hr.max()) < HR_ZONE_TABLE_MAX + 1
+
+
+def _zone_times_from_arrays(ts, hr, age: int, rhr: int = None) -> Dict:
+    """V6.1.0: _zone_times_from_sorted_points 的数组版本（按时间排序的 NumPy 数组）"""
+    duration_min = np.diff(ts) / 60.0
+    keep = duration_min > 0
+    totals = hr_zone_classifier(age, rhr=rhr).accumulate(hr[:-1][keep].astype(np.int64),
+                                                         np.minimum(duration_min[keep], 5.0))
+    return {f'zone_{z}': round(totals[z], 1) for z in range(1, 6)}
 
 # ============ 2. Recovery 评分 (0-100%) ============
 
@@ -679,14 +826,7 @@ def calculate_recovery(hrv_rmssd: float, rhr: float,
 
     # 动态调整权重：如果没有当日呼吸率数据，将呼吸率权重分配给 HRV 和 RHR
     if not has_respiratory_data:
-        # 呼吸率权重 3% 平均分配给 HRV 和 RHR
-        weights = {
-            'hrv': 0.465,               # 45% + 1.5%
-            'rhr': 0.295,               # 28% + 1.5%
-            'sleep': 0.17,
-            'sleep_consistency': 0.07,
-            'respiratory': 0.0          # 无数据时呼吸率不贡献分数
-        }
+        weights = RECOVERY_WEIGHTS_NO_RESPIRATORY
     else:
         weights = RECOVERY_WEIGHTS
 
@@ -937,9 +1077,7 @@ def calculate_body_age(
     
     # 计算各指标平均值
     metrics = {}
-    metric_names = ['sleep_hours', 'steps', 'rhr', 'hrv', 'respiratory_rate']
-    
-    for metric in metric_names:
+    for metric in BODY_AGE_METRICS:
         values = []
         for d in recent_data:
             val = _extract_metric_value(d, metric)
@@ -949,6 +1087,12 @@ def calculate_body_age(
         if values:
             metrics[metric] = sum(values) / len(values)
     
+    return _body_age_result(metrics, len(recent_data), chronological_age, gender)
+
+
+def _body_age_result(metrics: Dict[str, float], days_used: int, chronological_age: int,
+                     gender: str = 'male') -> BodyAgeResult:
+    """由各指标窗口均值计算 Body Age（metrics 按 BODY_AGE_METRICS 顺序）"""
     # 计算各指标对年龄的影响
     impacts = {}
     for metric, value in metrics.items():
@@ -962,7 +1106,7 @@ def calculate_body_age(
     
     breakdown_detail = {k: round(v, 2) for k, v in impacts.items()}
     breakdown_detail['_config'] = {
-        'days_used': len(recent_data),
+        'days_used': days_used,
         'metrics_available': list(metrics.keys())
     }
     
@@ -1024,6 +1168,12 @@ def calculate_pace_of_aging(
         if isinstance(strain, (int, float)) and strain >= 0:
             strain_values.append(float(strain))
     
+    return _pace_from_values(hrv_values, rhr_values, recovery_values, sleep_perf_values)
+
+
+def _pace_from_values(hrv_values: List[float], rhr_values: List[float],
+                      recovery_values: List[float], sleep_perf_values: List[float]) -> Optional[float]:
+    """由已提取的指标序列（与 daily_data 同序）计算 Pace of Aging，批量评分直接传入各天的取值"""
     # 检查是否有足够的数据 (V6.0.6: 降低门槛，HRV必须14天，recovery不足时用默认值)
     if len(hrv_values) < 14:
         return None
@@ -1163,22 +1313,107 @@ def calculate_pace_of_aging(
 # ============ 6. 历史数据管理 ============
 
 class HealthScoreHistory:
-    """管理健康评分历史数据"""
+    """管理健康评分历史数据
+
+    V6.1.0: 历史缓存按 (成员, 日期) 保存在内存中，每个文件在实例生命周期内只读取一次。
+    calculate_all_scores 开始时 preload() 一次读入整个回看窗口，之后基线、睡眠规律、
+    Body Age、Pace of Aging、睡眠债等查询都直接读内存；窗口之前的旧条目随窗口滑动丢弃。
+    store 为 history_store 中的存储后端，默认按每天一个 JSON 文件读取 cache_dir。
+    21 天指标基线与 7 天睡眠规律由 rolling_baselines.RollingBaselines 逐日推进，
+    顺序评分时每天只把前一天加入窗口，不再重扫整个窗口。
+    """
     
-    def __init__(self, cache_dir: Path):
+    def __init__(self, cache_dir: Path, window_days: int = HISTORY_WINDOW_DAYS, store=None):
+        from history_store import JsonHistoryStore
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.window_days = window_days
+        self.store = store if store is not None else JsonHistoryStore(self.cache_dir)
+        # (安全名, 日期) -> 缓存内容；None 表示该日无缓存文件
+        self._days: Dict[Tuple[str, str], Optional[Dict]] = {}
+        # 安全名 -> 滚动基线状态（首次使用时按窗口构建）
+        self._rolling: Dict[str, 'RollingBaselines'] = {}
+
+    def _load(self, date_str: str, safe_name: str) -> Optional[Dict]:
+        key = (safe_name, date_str)
+        if key not in self._days:
+            self._days[key] = self.store.get(date_str, safe_name)
+        return self._days[key]
+
+    def preload(self, end_date: str, member_name: str, days: Optional[int] = None) -> None:
+        """读入 end_date 及之前 days 天（默认 window_days）的缓存，并丢弃更早的条目"""
+        from utils import safe_member_name
+        safe_name = safe_member_name(member_name)
+        days = self.window_days if days is None else days
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+        start_str = (end - timedelta(days=days)).strftime('%Y-%m-%d')
+        for key in [k for k in self._days if k[0] == safe_name and k[1] < start_str]:
+            del self._days[key]
+        dates = [(end - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days + 1)]
+        missing = [d for d in dates if (safe_name, d) not in self._days]
+        if missing:
+            # 窗口内未读过的日期一次取回（SQLite 后端为一次范围查询）
+            found = self.store.get_many(missing, safe_name)
+            for date_str in missing:
+                self._days[(safe_name, date_str)] = found.get(date_str)
+
+    def attach_timeline(self, timeline) -> None:
+        """使用已一次读入的成员时间线（member_timeline.MemberTimeline），其覆盖的日期不再读取存储"""
+        from utils import safe_member_name
+        safe_name = safe_member_name(timeline.member_name)
+        for date_str in timeline.dates:
+            self._days[(safe_name, date_str)] = timeline.get(date_str)
+
+    def remember(self, date_str: str, member_name: str, cache_data: Optional[Dict]) -> None:
+        """写入缓存文件后同步内存中的副本（顺序回填时后一天直接读到前一天的结果）
+
+        与 store.get() 一致，内存中只保留摘要（不含运动心率时间线、睡眠 records 明细）。
+        """
+        from history_store import split_detail
+        from utils import safe_member_name
+        safe_name = safe_member_name(member_name)
+        self._days[(safe_name, date_str)] = split_detail(cache_data)[0] if cache_data else cache_data
+        state = self._rolling.get(safe_name)
+        if state is not None and state.last_date is not None and date_str <= state.last_date:
+            # 已计入滚动窗口的日期被改写，下次查询时按窗口重建
+            state.reset()
+
+    @staticmethod
+    def _baseline_inputs(raw: Optional[Dict]) -> Optional[Dict[str, Optional[float]]]:
+        """从单日缓存中取出滚动基线需要的取值（与 get_metric_baselines / get_sleep_consistency 口径一致）"""
+        if not raw:
+            return None
+        hrv = raw.get('hrv', {}).get('value') if isinstance(raw.get('hrv'), dict) else None
+        rhr = raw.get('resting_hr', {}).get('value') if isinstance(raw.get('resting_hr'), dict) else None
+        resp = raw.get('respiratory_rate')
+        return {
+            'hrv': float(hrv) if isinstance(hrv, (int, float)) and hrv > 0 else None,
+            'rhr': float(rhr) if isinstance(rhr, (int, float)) and rhr > 0 else None,
+            'respiratory': float(resp) if isinstance(resp, (int, float)) and resp > 0 else None,
+            'bedtime': _time_to_minutes(raw.get('bedtime', '--'), assume_bedtime=True),
+            'waketime': _time_to_minutes(raw.get('waketime', '--'), assume_bedtime=False),
+        }
+
+    def rolling_baselines(self, end_date: str, member_name: str) -> 'RollingBaselines':
+        """推进到 end_date 前一天的滚动基线状态"""
+        from rolling_baselines import RollingBaselines
+        from utils import safe_member_name
+        safe_name = safe_member_name(member_name)
+
+        def load(date_str):
+            return self._baseline_inputs(self._load(date_str, safe_name))
+
+        state = self._rolling.get(safe_name)
+        if state is None:
+            state = self._rolling[safe_name] = RollingBaselines()
+        state.sync(end_date, load)
+        return state
     
     def get_scores(self, date_str: str, member_name: str) -> Optional[Dict]:
         """获取某天的评分"""
-        from utils import safe_member_name
-        safe_name = safe_member_name(member_name)
-        cache_file = self.cache_dir / f"{date_str}_{safe_name}.json"
-        
-        if cache_file.exists():
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('health_scores')
+        raw = self.get_raw_cache(date_str, member_name)
+        if raw:
+            return raw.get('health_scores')
         return None
 
     def get_average_range(self, end_date: str, member_name: str, days: int = 7, skip_days: int = 0) -> Dict:
@@ -1246,13 +1481,7 @@ class HealthScoreHistory:
     def get_raw_cache(self, date_str: str, member_name: str) -> Optional[Dict]:
         """获取完整缓存数据"""
         from utils import safe_member_name
-        safe_name = safe_member_name(member_name)
-        cache_file = self.cache_dir / f"{date_str}_{safe_name}.json"
-
-        if cache_file.exists():
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return None
+        return self._load(date_str, safe_member_name(member_name))
 
     def get_period_average(self, end_date: str, member_name: str, days: int = 7, offset_days: int = 0) -> Dict:
         """获取某个时间窗口的评分均值。offset_days=7 表示往前错开 7 天。"""
@@ -1277,47 +1506,43 @@ class HealthScoreHistory:
         """获取 HRV / RHR / 呼吸率的个人 baseline，默认看前 21 天，不含当天。
         
         V6.0.5修复: 数据不足7天时返回None，让调用方使用人群默认值而非当日值
+        V6.1.0: 默认 21 天窗口读取滚动基线状态（逐日增量维护）
         """
-        end = datetime.strptime(end_date, '%Y-%m-%d')
-        hrv_values = []
-        rhr_values = []
-        resp_values = []
-
-        for i in range(1, days + 1):
-            date = (end - timedelta(days=i)).strftime('%Y-%m-%d')
-            raw = self.get_raw_cache(date, member_name)
-            if not raw:
-                continue
-
-            hrv = raw.get('hrv', {}).get('value') if isinstance(raw.get('hrv'), dict) else None
-            rhr = raw.get('resting_hr', {}).get('value') if isinstance(raw.get('resting_hr'), dict) else None
-            resp = raw.get('respiratory_rate')
-
-            if isinstance(hrv, (int, float)) and hrv > 0:
-                hrv_values.append(float(hrv))
-            if isinstance(rhr, (int, float)) and rhr > 0:
-                rhr_values.append(float(rhr))
-            if isinstance(resp, (int, float)) and resp > 0:
-                resp_values.append(float(resp))
-
+        from rolling_baselines import METRIC_WINDOW_DAYS
         # V6.0.5修复: 数据不足7天返回None，避免用当日值做baseline
         min_days_required = 7
-        baseline_hrv = _safe_mean(hrv_values, None) if len(hrv_values) >= min_days_required else None
-        baseline_rhr = _safe_mean(rhr_values, None) if len(rhr_values) >= min_days_required else None
-        baseline_resp = _safe_mean(resp_values, None) if len(resp_values) >= min_days_required else None
+
+        if days == METRIC_WINDOW_DAYS:
+            state = self.rolling_baselines(end_date, member_name)
+            counts = {key: state.count(key) for key in ('hrv', 'rhr', 'respiratory')}
+            means = {key: state.mean(key, min_days_required) for key in counts}
+        else:
+            end = datetime.strptime(end_date, '%Y-%m-%d')
+            values = {'hrv': [], 'rhr': [], 'respiratory': []}
+            for i in range(1, days + 1):
+                date = (end - timedelta(days=i)).strftime('%Y-%m-%d')
+                inputs = self._baseline_inputs(self.get_raw_cache(date, member_name))
+                if not inputs:
+                    continue
+                for key in values:
+                    if inputs[key] is not None:
+                        values[key].append(inputs[key])
+            counts = {key: len(vals) for key, vals in values.items()}
+            means = {key: _safe_mean(vals, None) if len(vals) >= min_days_required else None
+                     for key, vals in values.items()}
 
         return {
-            'baseline_hrv': baseline_hrv,
-            'baseline_rhr': baseline_rhr,
-            'baseline_respiratory': baseline_resp,
+            'baseline_hrv': means['hrv'],
+            'baseline_rhr': means['rhr'],
+            'baseline_respiratory': means['respiratory'],
             'data_sufficient': {
-                'hrv': len(hrv_values) >= min_days_required,
-                'rhr': len(rhr_values) >= min_days_required,
-                'respiratory': len(resp_values) >= min_days_required,
+                'hrv': counts['hrv'] >= min_days_required,
+                'rhr': counts['rhr'] >= min_days_required,
+                'respiratory': counts['respiratory'] >= min_days_required,
                 'days_available': {
-                    'hrv': len(hrv_values),
-                    'rhr': len(rhr_values),
-                    'respiratory': len(resp_values)
+                    'hrv': counts['hrv'],
+                    'rhr': counts['rhr'],
+                    'respiratory': counts['respiratory']
                 }
             }
         }
@@ -1327,66 +1552,84 @@ class HealthScoreHistory:
         用最近几天的 bedtime / waketime 近似睡眠规律性。
         返回 0-100。
         """
-        bed_values = []
-        wake_values = []
-        end = datetime.strptime(end_date, '%Y-%m-%d')
-
-        for i in range(1, days + 1):
-            date = (end - timedelta(days=i)).strftime('%Y-%m-%d')
-            bedtime, waketime = self.get_bedtime_waketime(date, member_name)
-            bed_min = _time_to_minutes(bedtime, assume_bedtime=True)
-            wake_min = _time_to_minutes(waketime, assume_bedtime=False)
-            if bed_min is not None:
-                bed_values.append(bed_min)
-            if wake_min is not None:
-                wake_values.append(wake_min)
-
+        from rolling_baselines import CONSISTENCY_WINDOW_DAYS
         current_bed_min = _time_to_minutes(current_bedtime, assume_bedtime=True)
         current_wake_min = _time_to_minutes(current_waketime, assume_bedtime=False)
 
         if current_bed_min is None or current_wake_min is None:
             return 75.0
-        if len(bed_values) < 3 or len(wake_values) < 3:
-            return 75.0
 
-        avg_bed = sum(bed_values) / len(bed_values)
-        avg_wake = sum(wake_values) / len(wake_values)
-        bed_diff = abs(current_bed_min - avg_bed)
-        wake_diff = abs(current_wake_min - avg_wake)
-        weighted_diff = 0.6 * bed_diff + 0.4 * wake_diff
-
-        if weighted_diff <= 30:
-            return 95.0
-        elif weighted_diff <= 60:
-            return 85.0
-        elif weighted_diff <= 90:
-            return 75.0
-        elif weighted_diff <= 120:
-            return 60.0
+        if days == CONSISTENCY_WINDOW_DAYS:
+            # V6.1.0: 默认 7 天窗口读取滚动基线状态
+            state = self.rolling_baselines(end_date, member_name)
+            if state.count('bedtime') < 3 or state.count('waketime') < 3:
+                return 75.0
+            avg_bed = state.mean('bedtime')
+            avg_wake = state.mean('waketime')
         else:
-            return 40.0
+            bed_values = []
+            wake_values = []
+            end = datetime.strptime(end_date, '%Y-%m-%d')
+
+            for i in range(1, days + 1):
+                date = (end - timedelta(days=i)).strftime('%Y-%m-%d')
+                bedtime, waketime = self.get_bedtime_waketime(date, member_name)
+                bed_min = _time_to_minutes(bedtime, assume_bedtime=True)
+                wake_min = _time_to_minutes(waketime, assume_bedtime=False)
+                if bed_min is not None:
+                    bed_values.append(bed_min)
+                if wake_min is not None:
+                    wake_values.append(wake_min)
+
+            if len(bed_values) < 3 or len(wake_values) < 3:
+                return 75.0
+
+            avg_bed = sum(bed_values) / len(bed_values)
+            avg_wake = sum(wake_values) / len(wake_values)
+        return _sleep_consistency_from_means(current_bed_min, current_wake_min, avg_bed, avg_wake)
+
+
+def _sleep_consistency_from_means(current_bed_min: float, current_wake_min: float,
+                                  avg_bed: float, avg_wake: float) -> float:
+    """当天入睡/起床时间与窗口均值的加权偏差 -> 睡眠规律性分数"""
+    bed_diff = abs(current_bed_min - avg_bed)
+    wake_diff = abs(current_wake_min - avg_wake)
+    weighted_diff = 0.6 * bed_diff + 0.4 * wake_diff
+
+    if weighted_diff <= 30:
+        return 95.0
+    elif weighted_diff <= 60:
+        return 85.0
+    elif weighted_diff <= 90:
+        return 75.0
+    elif weighted_diff <= 120:
+        return 60.0
+    else:
+        return 40.0
 
 
 # ============ 7. 一键计算 ============
 
-def calculate_all_scores(data: Dict, profile: Dict, history: 'HealthScoreHistory',
-                         zone_times: Dict = None) -> Dict:
+def day_hr_zone_times(data: Dict, age: int) -> Optional[Dict]:
+    """V6.1.0: 当天全天心率的区间分钟数，无心率数据为 None
+
+    每日缓存不保存全天心率样本（heart_rate_data），改为保存本结果（hr_zone_times），重算评分时直接读取。
     """
-    一键计算所有健康评分。
+    if 'heart_rate_data' not in data and 'hr_zone_times' in data:
+        return data['hr_zone_times']
+    hr_data = data.get('heart_rate_data', [])
+    if not hr_data:
+        return None
+    return calculate_zone_times_from_hr_data(hr_data, age)
 
-    改动重点：
-    1. Strain 优先使用真实/近似 zone_times，不再模拟全天 HR。
-    2. Recovery 使用真实个人 baseline（HRV / RHR / 呼吸率）。
-    3. Sleep consistency 使用历史 bedtime / waketime 近似。
-    4. Pace of Aging 使用"当前 7 天 vs 前 7 天"，不再用硬编码 previous_7day。
+
+def calculate_day_strain(data: Dict, age: int, zone_times: Dict = None) -> Tuple[float, Dict, Optional[Dict]]:
+    """单日 Strain：优先使用 zone_times，其次心率数据，最后按活动能量/步数/运动估算
+
+    返回 (strain, zone_times, hr_zone_times)；hr_zone_times 为用到的心率区间（未用到或无心率数据为 None），
+    写入每日缓存供重算使用。只依赖当天数据，calculate_all_scores 与批量评分共用。
     """
-    age = profile.get('age', 30) or 30
-    gender = profile.get('gender', 'male') or 'male'
-    date_str = data.get('date', datetime.now().strftime('%Y-%m-%d'))
-    member_name = profile.get('name', '默认用户') or '默认用户'
     workouts = data.get('workouts', []) or []
-
-    # 1) Strain
     strength_time = sum(
         w.get('duration_min', 0) for w in workouts
         if any(k in w.get('name', '').lower() for k in ['strength', '力量', '举重', 'weight'])
@@ -1398,13 +1641,15 @@ def calculate_all_scores(data: Dict, profile: Dict, history: 'HealthScoreHistory
         for z in range(1, 6)
     )
 
+    hr_zone_times = None
     if has_zone_data:
         strain_result = calculate_strain_from_zone_times(candidate_zone_times, strength_time)
         strain = strain_result['strain']
         final_zone_times = strain_result['zone_times']
     else:
-        hr_zone_times = calculate_zone_times_from_hr_data(data.get('heart_rate_data', []), age)
-        has_hr_zone_data = any(hr_zone_times.get(f'zone_{z}', 0) > 0 for z in range(1, 6))
+        hr_zone_times = day_hr_zone_times(data, age)
+        has_hr_zone_data = hr_zone_times is not None and any(
+            hr_zone_times.get(f'zone_{z}', 0) > 0 for z in range(1, 6))
         if has_hr_zone_data:
             strain_result = calculate_strain_from_zone_times(hr_zone_times, strength_time)
             strain = strain_result['strain']
@@ -1415,9 +1660,34 @@ def calculate_all_scores(data: Dict, profile: Dict, history: 'HealthScoreHistory
                 data.get('steps', 0),
                 workouts,
                 age,
-                data.get('heart_rate_data', [])
+                data.get('heart_rate_data', []),
+                hr_zone_times=hr_zone_times
             )
 
+    return strain, final_zone_times, hr_zone_times
+
+
+def calculate_all_scores(data: Dict, profile: Dict, history: 'HealthScoreHistory',
+                         zone_times: Dict = None) -> Dict:
+    """
+    一键计算所有健康评分。
+
+    改动重点：
+    1. Strain 优先使用真实/近似 zone_times，不再模拟全天 HR。
+    2. Recovery 使用真实个人 baseline（HRV / RHR / 呼吸率）。
+    3. Sleep consistency 使用历史 bedtime / waketime 近似。
+    4. Pace of Aging 使用"当前 7 天 vs 前 7 天"，不再用硬编码 previous_7day。
+    """
+    age = profile.get('age', 30) or 30
+    gender = profile.get('gender', 'male') or 'male'
+    date_str = data.get('date', datetime.now().strftime('%Y-%m-%d'))
+    member_name = profile.get('name', '默认用户') or '默认用户'
+    # V6.1.0: 一次读入回看窗口内的历史缓存，以下各项查询不再重复打开文件
+    history.preload(date_str, member_name)
+
+    # 1) Strain
+    strain, final_zone_times, hr_zone_times = calculate_day_strain(data, age, zone_times)
+
     # 2) Sleep Performance
     sleep = data.get('sleep', {}) or {}
     prev_date = (datetime.strptime(date_str, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
@@ -1426,7 +1696,8 @@ def calculate_all_scores(data: Dict, profile: Dict, history: 'HealthScoreHistory
 
     current_bedtime = data.get('bedtime') or sleep.get('bedtime')
     current_waketime = data.get('waketime') or sleep.get('waketime')
-    sleep_consistency = history.get_sleep_consistency(date_str, member_name, current_bedtime, current_waketime, days=7)
+    sleep_consistency = history.get_sleep_consistency(date_str, member_name, current_bedtime, current_waketime,
+                                                     days=SLEEP_CONSISTENCY_DAYS)
     sleep_latency_min = data.get('sleep_latency_min') or sleep.get('sleep_latency_min') or 20
 
     sleep_result = calculate_sleep_performance(
@@ -1443,7 +1714,7 @@ def calculate_all_scores(data: Dict, profile: Dict, history: 'HealthScoreHistory
     rhr = data.get('resting_hr', {}).get('value', 70)
     respiratory = data.get('respiratory_rate')  # 不设置默认值，用于判断是否有数据
 
-    baselines = history.get_metric_baselines(date_str, member_name, days=21)
+    baselines = history.get_metric_baselines(date_str, member_name, days=METRIC_BASELINE_DAYS)
     
     # 判断呼吸率数据是否可用
     has_respiratory_data = respiratory is not None and isinstance(respiratory, (int, float)) and respiratory > 0
@@ -1466,7 +1737,7 @@ def calculate_all_scores(data: Dict, profile: Dict, history: 'HealthScoreHistory
 
     # 4) Body Age - 使用最近7天历史数据计算
     recent_daily_data = []
-    for i in range(7):
+    for i in range(BODY_AGE_RECENT_DAYS):
         d = (datetime.strptime(date_str, '%Y-%m-%d') - timedelta(days=i)).strftime('%Y-%m-%d')
         raw = history.get_raw_cache(d, member_name)
         if raw:
@@ -1490,24 +1761,26 @@ def calculate_all_scores(data: Dict, profile: Dict, history: 'HealthScoreHistory
     # 5) Pace of Aging：优先使用完整版，数据不足时回退到 simple
     # 获取最近14天的详细数据用于趋势计算
     recent_daily_data = []
-    for i in range(14):
+    for i in range(PACE_RECENT_DAYS):
         d = (datetime.strptime(date_str, '%Y-%m-%d') - timedelta(days=i)).strftime('%Y-%m-%d')
         raw = history.get_raw_cache(d, member_name)
         if raw:
             recent_daily_data.append(raw)
 
-    # 尝试使用完整版（需要至少14天数据）
-    pace_full = calculate_pace_of_aging(recent_daily_data, age, gender)
-    
-    if pace_full is not None:
-        pace = pace_full
-        pace_data_sufficient = True
-        pace_note = ""
-    else:
-        # 数据不足：返回 None 并标记，不使用简化版避免误导
-        pace = None
-        pace_data_sufficient = False
-        pace_note = "数据不足（需要至少14天）"
+    # 尝试使用完整版（需要至少14天数据）；数据不足时为 None 并标记，不使用简化版避免误导
+    pace = calculate_pace_of_aging(recent_daily_data, age, gender)
+
+    return _score_result(strain, final_zone_times, sleep_result, recovery_result, body_age_result, pace,
+                         sleep_consistency, sleep_latency_min, baselines, has_respiratory_data, hr_zone_times)
+
+
+def _score_result(strain: float, final_zone_times: Dict, sleep_result: SleepPerformanceResult,
+                  recovery_result: Dict, body_age_result: BodyAgeResult, pace: Optional[float],
+                  sleep_consistency: float, sleep_latency_min: float, baselines: Dict,
+                  has_respiratory_data: bool, hr_zone_times: Optional[Dict] = None) -> Dict:
+    """组装 calculate_all_scores 的返回结构（批量评分共用）"""
+    pace_data_sufficient = pace is not None
+    pace_note = "" if pace_data_sufficient else "数据不足（需要至少14天）"
 
     # 将数据充足标记加入breakdown
     recovery_result['pace_data_sufficient'] = pace_data_sufficient
@@ -1525,6 +1798,7 @@ def calculate_all_scores(data: Dict, profile: Dict, history: 'HealthScoreHistory
         'pace_of_aging': pace,
         'pace_data_sufficient': pace_data_sufficient,  # FIX: 新增字段
         'zone_times': final_zone_times,
+        'hr_zone_times': hr_zone_times,  # V6.1.0: Strain 用到的全天心率区间，写入每日缓存供重算
         'breakdown': {
             'recovery_detail': recovery_result,
             'sleep_detail': asdict(sleep_result),
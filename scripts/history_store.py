@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""每日缓存历史存储后端 - V6.1.0
+
+每日缓存（提取数据 + 健康评分 + 睡眠债）由 HistoryStore 统一读写，调用方不再直接拼接文件路径：
+- json（默认）：每天一个文件，路径由 cache_file_path() 统一解析（cache_layout）：
+  flat（默认）为 cache_dir/{日期}_{成员}.json；sharded 为 cache_dir/{成员}/{YYYY}/{MM}/{日期}.json，
+  单个目录最多一个月的文件；已有缓存用 migrate_cache_layout.py 迁移
+- sqlite：单个 SQLite 数据库（history_db，默认 cache_dir/history.sqlite3），
+  表 daily_cache 以 (member, date) 为主键，常用标量（HRV、静息心率、呼吸率、步数、睡眠、
+  评分、睡眠债）存为独立列，完整缓存文档（含运动、睡眠记录）压缩后存为 BLOB；
+  日期范围查询为一次索引 SELECT，回填写入按事务批量提交
+
+缓存文档分为两部分写入（V6.1.0）：
+- 摘要：标量指标、评分、运动概要等，紧凑 JSON（无缩进），基线/趋势/周报/风险信号只读这一份
+- 明细：每次运动的 hr_timeline 与睡眠 records 列表，json 后端写入 cache_dir/detail/，
+  sqlite 后端写入 daily_detail 表；只有 get(..., detail=True) / get_detail() 时才读取
+
+config.json:
+    "history_backend": "sqlite",
+    "history_db": "~/health-cache/history.sqlite3",    # 可选
+    "cache_layout": "sharded"                          # 可选，仅 json 后端
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cache_reader import get_or_load, invalidate, lookup, read_cache_json, remember
+from utils import atomic_write_json, safe_member_name
+
+HISTORY_BACKENDS = ('json', 'sqlite')
+CACHE_LAYOUTS = ('flat', 'sharded')
+DEFAULT_DB_NAME = 'history.sqlite3'
+DEFAULT_BATCH_SIZE = 64
+DETAIL_DIRNAME = 'detail'
+# 摘要中标记存在明细的字段
+DETAIL_MARKER = '_detail'
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _nested(doc: Dict[str, Any], key: str, field: str) -> Any:
+    value = doc.get(key)
+    return value.get(field) if isinstance(value, dict) else None
+
+
+# 标量列：列名 -> 从缓存文档取值的函数
+SCALAR_COLUMNS = {
+    'hrv': lambda d: _nested(d, 'hrv', 'value'),
+    'rhr': lambda d: _nested(d, 'resting_hr', 'value'),
+    'respiratory_rate': lambda d: d.get('respiratory_rate'),
+    'steps': lambda d: d.get('steps'),
+    'active_energy': lambda d: d.get('active_energy'),
+    'spo2': lambda d: d.get('spo2'),
+    'sleep_hours': lambda d: _nested(d, 'sleep', 'total_hours'),
+    'deep_hours': lambda d: _nested(d, 'sleep', 'deep_hours'),
+    'rem_hours': lambda d: _nested(d, 'sleep', 'rem_hours'),
+    'strain': lambda d: _nested(d, 'health_scores', 'strain'),
+    'recovery': lambda d: _nested(d, 'health_scores', 'recovery'),
+    'sleep_performance': lambda d: _nested(d, 'health_scores', 'sleep_performance'),
+    'body_age': lambda d: _nested(d, 'health_scores', 'body_age'),
+    'sleep_debt_accumulated': lambda d: d.get('sleep_debt_accumulated'),
+}
+
+
+def split_detail(doc: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """拆分为 (摘要, 明细)；没有大体积字段时明细为 None（不修改传入的文档）"""
+    summary = dict(doc)
+    timelines = []
+    workouts = doc.get('workouts')
+    if isinstance(workouts, list):
+        slim = []
+        for workout in workouts:
+            if isinstance(workout, dict) and 'hr_timeline' in workout:
+                workout = dict(workout)
+                timelines.append(workout.pop('hr_timeline'))
+            else:
+                timelines.append(None)
+            slim.append(workout)
+        summary['workouts'] = slim
+    records = None
+    sleep = doc.get('sleep')
+    if isinstance(sleep, dict) and isinstance(sleep.get('records'), list):
+        records = sleep['records']
+        summary['sleep'] = dict(sleep, records=len(records))
+    if not any(t is not None for t in timelines) and records is None:
+        return dict(doc), None
+    summary[DETAIL_MARKER] = True
+    return summary, {'hr_timeline': timelines, 'sleep_records': records}
+
+
+def merge_detail(summary: Dict[str, Any], detail: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """把明细合并回摘要，得到与写入时相同的完整文档"""
+    doc = dict(summary)
+    doc.pop(DETAIL_MARKER, None)
+    if not detail:
+        return doc
+    timelines = detail.get('hr_timeline') or []
+    workouts = doc.get('workouts')
+    if isinstance(workouts, list) and timelines:
+        doc['workouts'] = [dict(w, hr_timeline=t) if t is not None and isinstance(w, dict) else w
+                           for w, t in zip(workouts, timelines)] + workouts[len(timelines):]
+    if detail.get('sleep_records') is not None and isinstance(doc.get('sleep'), dict):
+        doc['sleep'] = dict(doc['sleep'], records=detail['sleep_records'])
+    return doc
+
+
+class HistoryStore:
+    """每日缓存存储接口
+
+    get() 默认只返回摘要（运动 hr_timeline、睡眠 records 在明细中），detail=True 时合并明细。
+    """
+
+    backend = ''
+
+    def get(self, date_str: str, member_name: str, detail: bool = False) -> Optional[Dict[str, Any]]:
+        summary = self._get_summary(date_str, member_name)
+        if summary is None or not detail:
+            return summary
+        return merge_detail(summary, self.get_detail(date_str, member_name) if summary.get(DETAIL_MARKER) else None)
+
+    def _get_summary(self, date_str: str, member_name: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_detail(self, date_str: str, member_name: str) -> Optional[Dict[str, Any]]:
+        """单日明细 {'hr_timeline': [...每次运动...], 'sleep_records': [...]}，没有时为 None"""
+        raise NotImplementedError
+
+    def put(self, date_str: str, member_name: str, doc: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def range(self, member_name: str, start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+        """[start_date, end_date] 内存在的缓存，{日期: 文档}"""
+        raise NotImplementedError
+
+    def get_many(self, dates: Iterable[str], member_name: str) -> Dict[str, Dict[str, Any]]:
+        """指定日期中存在的缓存，{日期: 文档}"""
+        dates = sorted(set(dates))
+        if not dates:
+            return {}
+        found = self.range(member_name, dates[0], dates[-1])
+        return {d: found[d] for d in dates if d in found}
+
+    def digest(self, date_str: str, member_name: str) -> Optional[str]:
+        """缓存内容哈希（不存在时为 None），供增量回填清单比对"""
+        raise NotImplementedError
+
+    def location(self, date_str: str, member_name: str) -> str:
+        """用于日志输出的位置描述"""
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self, size: int = DEFAULT_BATCH_SIZE) -> Iterator['HistoryStore']:
+        """批量写入（json 后端逐文件写入，无需事务）"""
+        yield self
+
+    def close(self) -> None:
+        pass
+
+
+def cache_file_path(cache_dir: Path, date_str: str, member_name: str, layout: str = 'flat',
+                    detail: bool = False) -> Path:
+    """每日缓存文件路径（json 后端的唯一路径解析入口）
+
+    flat:    cache_dir/{日期}_{成员}.json，明细 cache_dir/detail/{日期}_{成员}.json
+    sharded: cache_dir/{成员}/{YYYY}/{MM}/{日期}.json，明细为同目录的 {日期}.detail.json
+    """
+    safe_name = safe_member_name(member_name)
+    if layout == 'sharded':
+        month_dir = Path(cache_dir) / safe_name / date_str[:4] / date_str[5:7]
+        return month_dir / (f"{date_str}.detail.json" if detail else f"{date_str}.json")
+    if detail:
+        return Path(cache_dir) / DETAIL_DIRNAME / f"{date_str}_{safe_name}.json"
+    return Path(cache_dir) / f"{date_str}_{safe_name}.json"
+
+
+def cache_layout(config: Dict[str, Any]) -> str:
+    layout = str(config.get('cache_layout') or 'flat').lower()
+    return layout if layout in CACHE_LAYOUTS else 'flat'
+
+
+class JsonHistoryStore(HistoryStore):
+    """每天一个 JSON 文件（布局见 cache_file_path）
+
+    sharded 布局下未找到的日期再按 flat 路径读取一次，迁移完成前旧缓存仍然可读。
+    """
+
+    backend = 'json'
+
+    def __init__(self, cache_dir: Path, layout: str = 'flat'):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.layout = layout if layout in CACHE_LAYOUTS else 'flat'
+
+    def path(self, date_str: str, member_name: str) -> Path:
+        return cache_file_path(self.cache_dir, date_str, member_name, self.layout)
+
+    def detail_path(self, date_str: str, member_name: str) -> Path:
+        return cache_file_path(self.cache_dir, date_str, member_name, self.layout, detail=True)
+
+    @staticmethod
+    def _read(path: Path) -> Optional[Dict[str, Any]]:
+        # V6.1.0: 经由进程级 LRU（cache_reader.py），同一文件未变时不重复解码
+        return read_cache_json(path)
+
+    def _get_summary(self, date_str: str, member_name: str) -> Optional[Dict[str, Any]]:
+        # 旧版（缩进、内嵌明细）的缓存文件同样可读，视为不含明细标记的摘要
+        doc = self._read(self.path(date_str, member_name))
+        if doc is None and self.layout != 'flat':
+            doc = self._read(cache_file_path(self.cache_dir, date_str, member_name))
+        return doc
+
+    def get_detail(self, date_str: str, member_name: str) -> Optional[Dict[str, Any]]:
+        detail = self._read(self.detail_path(date_str, member_name))
+        if detail is None and self.layout != 'flat':
+            detail = self._read(cache_file_path(self.cache_dir, date_str, member_name, detail=True))
+        return detail
+
+    def put(self, date_str: str, member_name: str, doc: Dict[str, Any]) -> None:
+        summary, detail = split_detail(doc)
+        detail_path = self.detail_path(date_str, member_name)
+        # V6.1.0: 原子写入（临时文件 + fsync + rename），并发读者不会读到半个文件
+        if detail is not None:
+            # 先写明细，读者看到摘要中的明细标记时明细已经就绪
+            atomic_write_json(detail_path, detail, separators=(',', ':'))
+        atomic_write_json(self.path(date_str, member_name), summary, separators=(',', ':'))
+        invalidate(self.path(date_str, member_name))
+        invalidate(detail_path)
+        if detail is None:
+            try:
+                detail_path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def range(self, member_name: str, start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+        from datetime import datetime, timedelta
+        result = {}
+        current = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+        while current <= end:
+            date_str = current.strftime('%Y-%m-%d')
+            doc = self.get(date_str, member_name)
+            if doc is not None:
+                result[date_str] = doc
+            current += timedelta(days=1)
+        return result
+
+    def get_many(self, dates: Iterable[str], member_name: str) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for date_str in dates:
+            doc = self.get(date_str, member_name)
+            if doc is not None:
+                result[date_str] = doc
+        return result
+
+    def digest(self, date_str: str, member_name: str) -> Optional[str]:
+        from export_snapshot import file_digest
+        try:
+            return file_digest(self.path(date_str, member_name))
+        except FileNotFoundError:
+            return None
+
+    def location(self, date_str: str, member_name: str) -> str:
+        return str(self.path(date_str, member_name))
+
+
+class SqliteHistoryStore(HistoryStore):
+    """SQLite 后端：(member, date) 主键 + 标量列 + 压缩 JSON 文档"""
+
+    backend = 'sqlite'
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None：由 batch() 显式管理事务，批外的单次写入立即提交
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._batch_size = DEFAULT_BATCH_SIZE
+        self._pending = 0
+        columns = ''.join(f', {name} REAL' for name in SCALAR_COLUMNS)
+        with self._lock:
+            self.conn.execute(
+                f'CREATE TABLE IF NOT EXISTS daily_cache ('
+                f'member TEXT NOT NULL, date TEXT NOT NULL{columns}, '
+                f'digest TEXT NOT NULL, doc BLOB NOT NULL, '
+                f'PRIMARY KEY (member, date)) WITHOUT ROWID'
+            )
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS daily_detail ('
+                'member TEXT NOT NULL, date TEXT NOT NULL, doc BLOB NOT NULL, '
+                'PRIMARY KEY (member, date)) WITHOUT ROWID'
+            )
+
+    @staticmethod
+    def _decode(blob: bytes) -> Dict[str, Any]:
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+    def _fetch_doc(self, table: str, member: str, date_str: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(f'SELECT doc FROM {table} WHERE member = ? AND date = ?',
+                                    (member, date_str)).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def _cached(self, table: str, date_str: str, member_name: str) -> Optional[Dict[str, Any]]:
+        """按文档哈希校验的进程级缓存读取（cache_reader.py），哈希未变时不再解压/解码"""
+        member = safe_member_name(member_name)
+        digest = self.digest(date_str, member)
+        if digest is None:
+            return None
+        return get_or_load((str(self.db_path), table, member, date_str), digest,
+                           lambda: self._fetch_doc(table, member, date_str))
+
+    def _get_summary(self, date_str: str, member_name: str) -> Optional[Dict[str, Any]]:
+        return self._cached('daily_cache', date_str, member_name)
+
+    def get_detail(self, date_str: str, member_name: str) -> Optional[Dict[str, Any]]:
+        return self._cached('daily_detail', date_str, member_name)
+
+    def put(self, date_str: str, member_name: str, doc: Dict[str, Any]) -> None:
+        summary, detail = split_detail(doc)
+        raw = json.dumps(summary, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        detail_raw = json.dumps(detail, ensure_ascii=False, sort_keys=True).encode('utf-8') if detail else b''
+        digest = hashlib.blake2b(raw + detail_raw, digest_size=16).hexdigest()
+        scalars = [_number(extract(doc)) for extract in SCALAR_COLUMNS.values()]
+        names = ', '.join(SCALAR_COLUMNS)
+        marks = ', '.join('?' * (len(SCALAR_COLUMNS) + 4))
+        key = (safe_member_name(member_name), date_str)
+        with self._lock:
+            # 摘要与明细在同一事务中写入（批量模式下由 batch() 的事务覆盖）
+            own_transaction = not self._batch_depth
+            if own_transaction:
+                self.conn.execute('BEGIN')
+            try:
+                self.conn.execute(
+                    f'INSERT OR REPLACE INTO daily_cache (member, date, {names}, digest, doc) VALUES ({marks})',
+                    [*key, *scalars, digest, zlib.compress(raw, 6)]
+                )
+                if detail is not None:
+                    self.conn.execute('INSERT OR REPLACE INTO daily_detail (member, date, doc) VALUES (?, ?, ?)',
+                                      [*key, zlib.compress(detail_raw, 6)])
+                else:
+                    self.conn.execute('DELETE FROM daily_detail WHERE member = ? AND date = ?', key)
+            except BaseException:
+                if own_transaction:
+                    self.conn.execute('ROLLBACK')
+                raise
+            if own_transaction:
+                self.conn.execute('COMMIT')
+            else:
+                self._pending += 1
+                if self._pending >= self._batch_size:
+                    self.conn.execute('COMMIT')
+                    self.conn.execute('BEGIN')
+                    self._pending = 0
+
+    def range(self, member_name: str, start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+        member = safe_member_name(member_name)
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT date, digest FROM daily_cache WHERE member = ? AND date BETWEEN ? AND ? ORDER BY date',
+                (member, start_date, end_date)
+            ).fetchall()
+        result: Dict[str, Dict[str, Any]] = {}
+        missing: Dict[str, str] = {}
+        for date_str, digest in rows:
+            hit, doc = lookup((str(self.db_path), 'daily_cache', member, date_str), digest)
+            if hit:
+                result[date_str] = doc
+            else:
+                missing[date_str] = digest
+        if missing:
+            # 未命中的日期一次取回
+            with self._lock:
+                fetched = self.conn.execute(
+                    'SELECT date, digest, doc FROM daily_cache WHERE member = ? AND date BETWEEN ? AND ?',
+                    (member, min(missing), max(missing))
+                ).fetchall()
+            for date_str, digest, blob in fetched:
+                if date_str in missing:
+                    doc = result[date_str] = self._decode(blob)
+                    remember((str(self.db_path), 'daily_cache', member, date_str), digest, doc)
+        return dict(sorted(result.items()))
+
+    def series(self, member_name: str, start_date: str, end_date: str,
+               columns: Iterable[str]) -> List[Tuple[Any, ...]]:
+        """只读标量列，不解码文档：[(date, col1, col2, ...)]"""
+        columns = list(columns)
+        unknown = [c for c in columns if c not in SCALAR_COLUMNS]
+        if unknown:
+            raise ValueError(f"未知的标量列: {', '.join(unknown)}")
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT date{''.join(', ' + c for c in columns)} FROM daily_cache "
+                f"WHERE member = ? AND date BETWEEN ? AND ? ORDER BY date",
+                (safe_member_name(member_name), start_date, end_date)
+            ).fetchall()
+
+    def digest(self, date_str: str, member_name: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute('SELECT digest FROM daily_cache WHERE member = ? AND date = ?',
+                                    (safe_member_name(member_name), date_str)).fetchone()
+        return row[0] if row else None
+
+    def location(self, date_str: str, member_name: str) -> str:
+        return f"{self.db_path} ({safe_member_name(member_name)}, {date_str})"
+
+    @contextmanager
+    def batch(self, size: int = DEFAULT_BATCH_SIZE) -> Iterator['SqliteHistoryStore']:
+        """在事务中批量写入，每 size 条提交一次；异常时回滚未提交部分"""
+        with self._lock:
+            if self._batch_depth == 0:
+                self._batch_size = max(1, size)
+                self._pending = 0
+                self.conn.execute('BEGIN')
+            self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.conn.execute('ROLLBACK')
+            raise
+        else:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.conn.execute('COMMIT')
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+# 进程内按 (pid, 路径) 复用 SQLite 连接（fork 出的子进程不能沿用父进程的连接）
+_stores: Dict[Tuple[int, str], SqliteHistoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def history_backend(config: Dict[str, Any]) -> str:
+    backend = str(config.get('history_backend') or 'json').lower()
+    return backend if backend in HISTORY_BACKENDS else 'json'
+
+
+def open_history_store(config: Dict[str, Any], cache_dir: Path) -> HistoryStore:
+    """按配置打开成员缓存目录对应的历史存储
+
+    history_db 未配置时数据库放在成员缓存目录下（member_dirs=true 时每个成员一个数据库）。
+    """
+    cache_dir = Path(cache_dir).expanduser()
+    if history_backend(config) != 'sqlite':
+        return JsonHistoryStore(cache_dir, cache_layout(config))
+    db_path = Path(config.get('history_db') or cache_dir / DEFAULT_DB_NAME).expanduser()
+    key = (os.getpid(), str(db_path.resolve()))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = SqliteHistoryStore(db_path)
+        return store
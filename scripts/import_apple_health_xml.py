@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""Apple Health export.xml 流式导入 - V6.1.0
+
+把 iPhone「健康」App 导出的 export.xml（常见 1~5 GB）转换为按天的
+HealthAutoExport-YYYY-MM-DD.json，数据提取、日报与缓存回填无需任何改动即可读取。
+
+用法：
+  python3 scripts/import_apple_health_xml.py export.xml --member 0            # 写入成员 health_dir
+  python3 scripts/import_apple_health_xml.py export.xml --out ./imported      # 写入指定目录
+  python3 scripts/import_apple_health_xml.py export.xml --member 0 --since 2023-01-01 --backfill
+      # 导入后对导入的日期范围执行增量缓存回填（见 generate_cache_only.py --incremental）
+
+处理流程（内存占用与导出文件大小无关）：
+1. iterparse 逐个读取顶层 Record / Workout 元素，处理完立即 clear()；
+   样本按日期追加到临时目录下的分区文件（JSON Lines，打开的句柄数有上限）
+2. 睡眠分段按"睡眠夜"（入睡时间前移 12 小时所在日期）分区，逐夜合并为会话，
+   写入醒来当天的分区（与 Health Auto Export 一致，次日文件包含前一晚睡眠）
+3. 逐个分区生成当天的导出文件（临时文件 + 原子替换），运动的心率时间线从当天心率样本按分钟汇总
+
+口径对齐 Health Auto Export：
+- 时间字符串原样保留（"YYYY-MM-DD HH:MM:SS +0800"），按字面日期归日
+- 能量换算为 kJ（数据提取按 kJ 处理），百分比换算为 0~100，距离换算为 km
+- 同一晚有多个来源（手表 + 手机/第三方 App）时只取分期最完整的一个来源，避免重复累计
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict, defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, IO, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from timestamp_decoder import SECONDS_PER_DAY, TimestampDecoder
+from utils import KJ_TO_KCAL
+
+# HealthKit 数量类型 -> Health Auto Export 指标名
+QUANTITY_METRICS = {
+    'HKQuantityTypeIdentifierHeartRate': 'heart_rate',
+    'HKQuantityTypeIdentifierHeartRateVariabilitySDNN': 'heart_rate_variability',
+    'HKQuantityTypeIdentifierRestingHeartRate': 'resting_heart_rate',
+    'HKQuantityTypeIdentifierWalkingHeartRateAverage': 'walking_heart_rate_average',
+    'HKQuantityTypeIdentifierStepCount': 'step_count',
+    'HKQuantityTypeIdentifierDistanceWalkingRunning': 'walking_running_distance',
+    'HKQuantityTypeIdentifierActiveEnergyBurned': 'active_energy',
+    'HKQuantityTypeIdentifierBasalEnergyBurned': 'basal_energy_burned',
+    'HKQuantityTypeIdentifierOxygenSaturation': 'blood_oxygen_saturation',
+    'HKQuantityTypeIdentifierRespiratoryRate': 'respiratory_rate',
+    'HKQuantityTypeIdentifierAppleStandTime': 'apple_stand_time',
+    'HKQuantityTypeIdentifierAppleExerciseTime': 'apple_exercise_time',
+    'HKQuantityTypeIdentifierFlightsClimbed': 'flights_climbed',
+    'HKQuantityTypeIdentifierVO2Max': 'vo2_max',
+    'HKQuantityTypeIdentifierPhysicalEffort': 'physical_effort',
+    'HKQuantityTypeIdentifierAppleSleepingBreathingDisturbances': 'breathing_disturbances',
+    'HKQuantityTypeIdentifierStairAscentSpeed': 'stair_speed_up',
+    'HKQuantityTypeIdentifierWalkingSpeed': 'walking_speed',
+    'HKQuantityTypeIdentifierWalkingStepLength': 'walking_step_length',
+    'HKQuantityTypeIdentifierWalkingAsymmetryPercentage': 'walking_asymmetry_percentage',
+    'HKQuantityTypeIdentifierWalkingDoubleSupportPercentage': 'walking_double_support_percentage',
+    'HKQuantityTypeIdentifierRunningSpeed': 'running_speed',
+    'HKQuantityTypeIdentifierRunningPower': 'running_power',
+    'HKQuantityTypeIdentifierRunningStrideLength': 'running_stride_length',
+    'HKQuantityTypeIdentifierRunningGroundContactTime': 'running_ground_contact_time',
+    'HKQuantityTypeIdentifierRunningVerticalOscillation': 'running_vertical_oscillation',
+    'HKQuantityTypeIdentifierHeadphoneAudioExposure': 'headphone_audio_exposure',
+    'HKQuantityTypeIdentifierEnvironmentalAudioExposure': 'environmental_audio_exposure',
+}
+
+SLEEP_TYPE = 'HKCategoryTypeIdentifierSleepAnalysis'
+STAND_HOUR_TYPE = 'HKCategoryTypeIdentifierAppleStandHour'
+STAND_HOUR_STOOD = 'HKCategoryValueAppleStandHourStood'
+
+# 睡眠分段值 -> 会话字段
+SLEEP_STAGES = {
+    'HKCategoryValueSleepAnalysisAsleepDeep': 'deep',
+    'HKCategoryValueSleepAnalysisAsleepCore': 'core',
+    'HKCategoryValueSleepAnalysisAsleepREM': 'rem',
+    'HKCategoryValueSleepAnalysisAwake': 'awake',
+    'HKCategoryValueSleepAnalysisAsleepUnspecified': 'asleep',
+    'HKCategoryValueSleepAnalysisAsleep': 'asleep',
+    'HKCategoryValueSleepAnalysisInBed': 'inBed',
+}
+_STAGED = ('deep', 'core', 'rem')
+
+SLEEP_SESSION_GAP = 3600          # 分段间隔超过 1 小时视为新的会话
+SLEEP_NIGHT_SHIFT = 12 * 3600     # 睡眠夜 = 入睡时间前移 12 小时所在日期
+MAX_OPEN_PARTITIONS = 64
+
+_ENERGY_UNITS = {'kcal': KJ_TO_KCAL, 'Cal': KJ_TO_KCAL, 'kJ': 1.0}
+_DISTANCE_UNITS = {'km': 1.0, 'm': 0.001, 'mi': 1.609344}
+_CAMEL = re.compile(r'(?<=[a-z])(?=[A-Z])')
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def normalize_quantity(metric: str, value: float, unit: str) -> Tuple[float, str]:
+    """换算为 Health Auto Export 的单位口径"""
+    if metric in ('active_energy', 'basal_energy_burned') and unit in _ENERGY_UNITS:
+        return value * _ENERGY_UNITS[unit], 'kJ'
+    if metric == 'walking_running_distance' and unit in _DISTANCE_UNITS:
+        return value * _DISTANCE_UNITS[unit], 'km'
+    if unit == '%':
+        return value * 100.0, '%'
+    return value, unit
+
+
+def workout_name(activity_type: str) -> str:
+    """HKWorkoutActivityTypeTraditionalStrengthTraining -> Traditional Strength Training"""
+    name = activity_type.replace('HKWorkoutActivityType', '', 1) or activity_type
+    return _CAMEL.sub(' ', name)
+
+
+class PartitionWriter:
+    """按键（日期）追加 JSON Lines 分区文件，最多同时打开 MAX_OPEN_PARTITIONS 个句柄"""
+
+    def __init__(self, root: Path, suffix: str):
+        self.root = root
+        self.suffix = suffix
+        self.keys = set()
+        self._handles: 'OrderedDict[str, IO[str]]' = OrderedDict()
+
+    def path(self, key: str) -> Path:
+        return self.root / f'{key}{self.suffix}'
+
+    def append(self, key: str, item: Any) -> None:
+        handle = self._handles.get(key)
+        if handle is None:
+            if len(self._handles) >= MAX_OPEN_PARTITIONS:
+                self._handles.popitem(last=False)[1].close()
+            handle = self._handles[key] = open(self.path(key), 'a', encoding='utf-8')
+            self.keys.add(key)
+        else:
+            self._handles.move_to_end(key)
+        handle.write(json.dumps(item, ensure_ascii=False, separators=(',', ':')))
+        handle.write('\n')
+
+    def close(self) -> None:
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+
+    def read(self, key: str) -> Iterable[Any]:
+        with open(self.path(key), 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+
+class AppleHealthImporter:
+    """export.xml -> 按天分区 -> HealthAutoExport-YYYY-MM-DD.json"""
+
+    def __init__(self, work_dir: Path, since: Optional[str] = None, until: Optional[str] = None):
+        self.days = PartitionWriter(work_dir, '.day.jsonl')
+        self.nights = PartitionWriter(work_dir, '.sleep.jsonl')
+        self.since = since
+        self.until = until
+        self._decoder = TimestampDecoder()
+        self.counts = defaultdict(int)
+
+    def _in_range(self, day: str) -> bool:
+        return (self.since is None or day >= self.since) and (self.until is None or day <= self.until)
+
+    # ---------- 第 1 步：流式读取 ----------
+
+    def stream(self, xml_path: Path) -> None:
+        """iterparse 读取顶层元素；Correlation 内嵌的 Record 在顶层另有一份，不重复处理"""
+        depth = 0
+        root = None
+        for event, elem in ET.iterparse(str(xml_path), events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            tag = elem.tag
+            if tag == 'Record':
+                self._record(elem.attrib)
+            elif tag == 'Workout':
+                self._workout(elem)
+            elem.clear()
+            root.clear()
+        self.days.close()
+        self.nights.close()
+
+    def _record(self, attrib: Dict[str, str]) -> None:
+        start = attrib.get('startDate')
+        if not start or not self._in_range(start[:10]):
+            return
+        rtype = attrib.get('type', '')
+        metric = QUANTITY_METRICS.get(rtype)
+        if metric is not None:
+            value = _number(attrib.get('value'))
+            if value is None:
+                return
+            qty, unit = normalize_quantity(metric, value, attrib.get('unit', ''))
+            self.days.append(start[:10], ['m', metric, unit, start, qty, attrib.get('sourceName', '')])
+            self.counts['records'] += 1
+        elif rtype == SLEEP_TYPE:
+            self._sleep_segment(attrib)
+        elif rtype == STAND_HOUR_TYPE and attrib.get('value') == STAND_HOUR_STOOD:
+            self.days.append(start[:10], ['m', 'apple_stand_hour', 'count', start, 1, attrib.get('sourceName', '')])
+            self.counts['records'] += 1
+
+    def _sleep_segment(self, attrib: Dict[str, str]) -> None:
+        stage = SLEEP_STAGES.get(attrib.get('value', ''))
+        start = self._decoder.decode(attrib.get('startDate'))
+        end = self._decoder.decode(attrib.get('endDate'))
+        if stage is None or start is None or end is None or end[0] <= start[0]:
+            return
+        night = (date(1970, 1, 1) + timedelta(days=(start[1] - SLEEP_NIGHT_SHIFT) // SECONDS_PER_DAY)).isoformat()
+        self.nights.append(night, [start[0], end[0], attrib['startDate'], attrib['endDate'], stage,
+                                   attrib.get('sourceName', '')])
+        self.counts['sleep_segments'] += 1
+
+    def _workout(self, elem: ET.Element) -> None:
+        attrib = elem.attrib
+        start = attrib.get('startDate')
+        if not start or not self._in_range(start[:10]):
+            return
+        workout: Dict[str, Any] = {
+            'name': workout_name(attrib.get('workoutActivityType', 'Unknown')),
+            'start': start,
+            'end': attrib.get('endDate'),
+            'source': attrib.get('sourceName', ''),
+        }
+        duration = _number(attrib.get('duration'))
+        if duration is not None:
+            workout['duration'] = duration
+            workout['durationUnit'] = attrib.get('durationUnit', 'min')
+
+        energy = _number(attrib.get('totalEnergyBurned'))
+        energy_unit = attrib.get('totalEnergyBurnedUnit', 'kcal')
+        # 新版导出把统计值放在 WorkoutStatistics 子元素中
+        for stat in elem.iter('WorkoutStatistics'):
+            stype = stat.get('type')
+            if stype == 'HKQuantityTypeIdentifierActiveEnergyBurned':
+                energy = _number(stat.get('sum'))
+                energy_unit = stat.get('unit', 'kcal')
+            elif stype == 'HKQuantityTypeIdentifierHeartRate':
+                for key, field in (('average', 'avgHeartRate'), ('maximum', 'maxHeartRate')):
+                    value = _number(stat.get(key))
+                    if value is not None:
+                        workout[field] = {'qty': value, 'units': stat.get('unit', 'count/min')}
+        if energy is not None and energy_unit in _ENERGY_UNITS:
+            workout['activeEnergyBurned'] = {'qty': round(energy * _ENERGY_UNITS[energy_unit], 3), 'units': 'kJ'}
+
+        self.days.append(start[:10], ['w', workout])
+        self.counts['workouts'] += 1
+
+    # ---------- 第 2 步：睡眠分段 -> 会话 ----------
+
+    def build_sleep_sessions(self) -> None:
+        for night in sorted(self.nights.keys):
+            for session in sleep_sessions(list(self.nights.read(night))):
+                day = session['sleepEnd'][:10]
+                if self._in_range(day):
+                    self.days.append(day, ['S', session])
+                    self.counts['sleep_sessions'] += 1
+        self.days.close()
+
+    # ---------- 第 3 步：写出按天文件 ----------
+
+    def write_days(self, out_dir: Path, overwrite: bool = False) -> List[str]:
+        """返回写出的日期列表；已存在的文件默认保留（Health Auto Export 原始导出优先）"""
+        out_dir.mkdir(parents=True, exist_ok=True)
+        written = []
+        for day in sorted(self.days.keys):
+            target = out_dir / f'HealthAutoExport-{day}.json'
+            if target.exists() and not overwrite:
+                self.counts['skipped_days'] += 1
+                continue
+            doc = day_document(self.days.read(day))
+            tmp = target.with_name(f'.{target.name}.{os.getpid()}.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(doc, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp, target)
+            written.append(day)
+        return written
+
+
+def sleep_sessions(segments: List[list]) -> List[Dict[str, Any]]:
+    """一个睡眠夜的分段 -> 会话记录（时长单位：小时）
+
+    segments: [start_epoch, end_epoch, startDate, endDate, stage, source]
+    多来源时只保留分期睡眠（deep/core/rem）最多的来源，其次按总睡眠时长。
+    """
+    by_source: Dict[str, List[list]] = defaultdict(list)
+    for seg in segments:
+        by_source[seg[5]].append(seg)
+
+    def rank(segs):
+        staged = sum(s[1] - s[0] for s in segs if s[4] in _STAGED)
+        asleep = sum(s[1] - s[0] for s in segs if s[4] != 'inBed')
+        return staged, asleep
+
+    chosen = sorted(max(by_source.values(), key=rank), key=lambda s: (s[0], s[1]))
+    sessions: List[Dict[str, Any]] = []
+    current: List[list] = []
+    current_end = None
+    for seg in chosen:
+        if current and seg[0] > current_end + SLEEP_SESSION_GAP:
+            sessions.append(_session_record(current))
+            current = []
+        current_end = max(current_end, seg[1]) if current else seg[1]
+        current.append(seg)
+    if current:
+        sessions.append(_session_record(current))
+    return [s for s in sessions if s is not None]
+
+
+def _session_record(segs: List[list]) -> Optional[Dict[str, Any]]:
+    seconds = defaultdict(int)
+    seen = set()
+    for seg in segs:
+        key = (seg[0], seg[1], seg[4])
+        if key in seen:
+            continue
+        seen.add(key)
+        seconds[seg[4]] += seg[1] - seg[0]
+    sleep_segs = [s for s in segs if s[4] != 'inBed'] or segs
+    if not any(seconds[k] for k in ('deep', 'core', 'rem', 'asleep')):
+        return None
+    first = min(sleep_segs, key=lambda s: s[0])
+    last = max(sleep_segs, key=lambda s: s[1])
+    hours = {k: round(v / 3600.0, 3) for k, v in seconds.items()}
+    if not any(seconds[k] for k in _STAGED):
+        # 旧设备只有"睡眠中"未分期：计入 core，数据提取按 deep+core+rem 统计总睡眠
+        hours['core'] = hours.get('asleep', 0.0)
+    record = {
+        'sleepStart': first[2],
+        'sleepEnd': last[3],
+        'deep': hours.get('deep', 0.0),
+        'core': hours.get('core', 0.0),
+        'rem': hours.get('rem', 0.0),
+        'awake': hours.get('awake', 0.0),
+        'asleep': hours.get('asleep', 0.0),
+        'totalSleep': round(hours.get('deep', 0.0) + hours.get('core', 0.0) + hours.get('rem', 0.0), 3),
+        'source': first[5],
+    }
+    if seconds['inBed']:
+        record['inBed'] = hours['inBed']
+    return record
+
+
+def day_document(items: Iterable[list]) -> Dict[str, Any]:
+    """一天的分区内容 -> Health Auto Export 结构"""
+    metrics: Dict[str, Dict[str, Any]] = {}
+    workouts: List[Dict[str, Any]] = []
+    sessions: List[Dict[str, Any]] = []
+    for item in items:
+        kind = item[0]
+        if kind == 'm':
+            _, name, unit, ts, qty, source = item
+            metric = metrics.get(name)
+            if metric is None:
+                metric = metrics[name] = {'name': name, 'units': unit, 'data': []}
+            metric['data'].append({'date': ts, 'qty': qty, 'source': source})
+        elif kind == 'w':
+            workouts.append(item[1])
+        elif kind == 'S':
+            sessions.append(item[1])
+
+    heart_rate = metrics.get('heart_rate', {}).get('data', [])
+    for workout in workouts:
+        timeline = workout_heart_rate(workout, heart_rate)
+        if timeline:
+            workout['heartRateData'] = timeline
+
+    metric_list = list(metrics.values())
+    if sessions:
+        metric_list.append({'name': 'sleep_analysis', 'units': 'hr', 'data': sessions})
+    return {'data': {'metrics': metric_list, 'workouts': workouts}}
+
+
+def workout_heart_rate(workout: Dict[str, Any], heart_rate: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """运动时段内的心率样本按分钟汇总为 heartRateData（min/avg/max）"""
+    decoder = TimestampDecoder()
+    start = decoder.decode(workout.get('start'))
+    end = decoder.decode(workout.get('end'))
+    if start is None or end is None:
+        return []
+    minutes: Dict[int, List[float]] = {}
+    labels: Dict[int, str] = {}
+    for sample in heart_rate:
+        decoded = decoder.decode(sample['date'])
+        if decoded is None or not start[0] <= decoded[0] <= end[0]:
+            continue
+        minute = decoded[0] // 60
+        minutes.setdefault(minute, []).append(sample['qty'])
+        labels.setdefault(minute, sample['date'][:16] + ':00' + sample['date'][19:])
+    return [
+        {'date': labels[m], 'min': min(v), 'avg': round(sum(v) / len(v), 1), 'max': max(v), 'units': 'count/min'}
+        for m, v in sorted(minutes.items())
+    ]
+
+
+def _member_health_dir(config: Dict[str, Any], index: int) -> Path:
+    members = config.get('members', [])
+    if index < 0 or index >= len(members):
+        raise SystemExit(f"❌ 成员索引超出范围: {index}（共 {len(members)} 个成员）")
+    health_dir = members[index].get('health_dir')
+    if not health_dir:
+        raise SystemExit(f"❌ 成员 {index} 未配置 health_dir")
+    return Path(health_dir).expanduser()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="把 Apple Health export.xml 导入为按天的 Health Auto Export 文件")
+    parser.add_argument('xml', type=Path, help="export.xml 路径")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--member', type=int, help="写入 config.json 中该成员（索引）的 health_dir")
+    target.add_argument('--out', type=Path, help="写入指定目录")
+    parser.add_argument('--since', help="只导入该日期（含）之后的数据，YYYY-MM-DD")
+    parser.add_argument('--until', help="只导入该日期（含）之前的数据，YYYY-MM-DD")
+    parser.add_argument('--overwrite', action='store_true', help="覆盖已存在的按天文件（默认保留）")
+    parser.add_argument('--work-dir', type=Path, help="分区临时目录（默认系统临时目录，需要与导出数据相当的磁盘空间）")
+    parser.add_argument('--backfill', action='store_true', help="导入后增量回填该成员的缓存（需配合 --member）")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    if not args.xml.exists():
+        raise SystemExit(f"❌ 文件不存在: {args.xml}")
+    if args.backfill and args.member is None:
+        raise SystemExit("❌ --backfill 需要配合 --member 使用")
+
+    config = {}
+    if args.member is not None:
+        from utils import load_config
+        config = load_config()
+        out_dir = _member_health_dir(config, args.member)
+    else:
+        out_dir = args.out.expanduser()
+
+    work_root = tempfile.mkdtemp(prefix='hae-import-', dir=str(args.work_dir) if args.work_dir else None)
+    try:
+        importer = AppleHealthImporter(Path(work_root), since=args.since, until=args.until)
+        print(f"📥 读取 {args.xml} ...")
+        importer.stream(args.xml)
+        importer.build_sleep_sessions()
+        written = importer.write_days(out_dir, overwrite=args.overwrite)
+    finally:
+        shutil.rmtree(work_root, ignore_errors=True)
+
+    counts = importer.counts
+    print(f"✅ 导入完成: {counts['records']} 条样本, {counts['workouts']} 次运动, "
+          f"{counts['sleep_sessions']} 段睡眠 -> {len(written)} 天写入 {out_dir}")
+    if counts['skipped_days']:
+        print(f"   ℹ️ {counts['skipped_days']} 天已有导出文件，未覆盖（使用 --overwrite 覆盖）")
+
+    if args.backfill and written:
+        from generate_cache_only import generate_date_range, generate_member_caches
+        member_name = config['members'][args.member].get('name', f'成员{args.member + 1}')
+        dates = generate_date_range(written[0], written[-1])
+        print(f"\n🗂️  回填缓存 {dates[0]} ~ {dates[-1]}（{len(dates)} 天）")
+        success, failed, skipped = generate_member_caches(dates, args.member, member_name, config, incremental=True)
+        print(f"   完成: {success} 成功, {failed} 失败, {skipped} 未变化跳过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""成员注册表与分片处理 - V6.1.0
+
+成员可以写在 config.json 的 members 中，也可以放到独立的注册表（成员较多时便于维护）：
+- members_file: JSON 数组、{"members": [...]} 或 JSON Lines（每行一个成员对象）
+- members_dir: 每个成员一个 *.json 文件，按文件名排序
+三处来源按 members -> members_file -> members_dir 的顺序合并，相对路径相对 config.json 所在目录。
+load_config() 合并后写回 config['members']，读取 members 的现有代码无需改动。
+
+成员目录：member_dirs=true 时每个成员的缓存与报告分别写入 cache_dir/<安全名>/ 与
+output_dir/<安全名>/，单个目录的文件数不随成员数增长；成员条目中的 cache_dir / output_dir 优先。
+
+批量处理：成员按 member_shard_size 分片提交，最多 member_workers 个成员同时处理；
+命令行 --shard K/N 只处理 索引 % N == K 的成员，可拆分到多个进程或多台机器执行。
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / 'cache' / 'daily'
+DEFAULT_OUTPUT_DIR = Path.home() / '.openclaw' / 'workspace' / 'shared' / 'health-reports' / 'upload'
+DEFAULT_SHARD_SIZE = 32
+
+MemberItem = Tuple[int, Dict[str, Any]]
+
+
+# ==================== 注册表加载 ====================
+
+def _registry_path(value: Any, base_dir: Path) -> Optional[Path]:
+    if not isinstance(value, str) or not value.strip():
+        return None
+    path = Path(value).expanduser()
+    return path if path.is_absolute() else base_dir / path
+
+
+def _read_members_file(path: Path) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        # JSON Lines
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = data.get('members', [])
+    if not isinstance(data, list):
+        raise ValueError("成员注册表必须是数组或包含 members 数组的对象")
+    return data
+
+
+def load_registry_members(config: Dict[str, Any], base_dir: Path) -> List[Dict[str, Any]]:
+    """合并 config.members、members_file、members_dir 中的成员"""
+    members = list(config.get('members') or [])
+
+    members_file = _registry_path(config.get('members_file'), base_dir)
+    if members_file is not None:
+        try:
+            members.extend(_read_members_file(members_file))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 读取成员注册表失败 {members_file}: {e}", file=sys.stderr)
+
+    members_dir = _registry_path(config.get('members_dir'), base_dir)
+    if members_dir is not None:
+        try:
+            names = sorted(entry.name for entry in os.scandir(members_dir)
+                           if entry.name.endswith('.json') and entry.is_file())
+        except OSError as e:
+            print(f"⚠️ 读取成员目录失败 {members_dir}: {e}", file=sys.stderr)
+            names = []
+        for name in names:
+            try:
+                with open(members_dir / name, 'r', encoding='utf-8') as f:
+                    members.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 读取成员文件失败 {members_dir / name}: {e}", file=sys.stderr)
+    return members
+
+
+def apply_member_registry(config: Dict[str, Any], base_dir: Path) -> Dict[str, Any]:
+    """配置了 members_file / members_dir 时把合并后的成员写回 config['members']"""
+    if config.get('members_file') or config.get('members_dir'):
+        config['members'] = load_registry_members(config, base_dir)
+    return config
+
+
+def registry_signature(config: Dict[str, Any], base_dir: Path) -> Tuple:
+    """注册表文件/目录的修改时间，用于配置缓存失效判断"""
+    signature = []
+    for key in ('members_file', 'members_dir'):
+        path = _registry_path(config.get(key), base_dir)
+        if path is None:
+            continue
+        try:
+            signature.append((key, os.stat(path).st_mtime_ns))
+        except OSError:
+            signature.append((key, None))
+    return tuple(signature)
+
+
+# ==================== 注册表 ====================
+
+class MemberRegistry:
+    """成员列表 + 按名称/安全名的字典索引（按名称查找不随成员数线性增长）"""
+
+    def __init__(self, members: Sequence[Dict[str, Any]]):
+        from utils import safe_member_name
+        self.members: List[Dict[str, Any]] = [m for m in members if isinstance(m, dict)]
+        self._by_name: Dict[str, int] = {}
+        self._by_safe_name: Dict[str, int] = {}
+        for idx, member in enumerate(self.members):
+            name = member.get('name', f'成员{idx+1}')
+            self._by_name.setdefault(name, idx)
+            self._by_safe_name.setdefault(safe_member_name(name), idx)
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> 'MemberRegistry':
+        if config is None:
+            from utils import load_config
+            config = load_config()
+        return cls(config.get('members') or [])
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __iter__(self) -> Iterator[MemberItem]:
+        return iter(enumerate(self.members))
+
+    def get(self, idx: int) -> Optional[Dict[str, Any]]:
+        return self.members[idx] if 0 <= idx < len(self.members) else None
+
+    def name(self, idx: int) -> str:
+        member = self.get(idx) or {}
+        return member.get('name', f'成员{idx+1}')
+
+    def find(self, name: str) -> Optional[Dict[str, Any]]:
+        """按成员名（或安全名）查找成员"""
+        from utils import safe_member_name
+        idx = self._by_name.get(name)
+        if idx is None:
+            idx = self._by_safe_name.get(safe_member_name(name))
+        return self.members[idx] if idx is not None else None
+
+    def select(self, shard: Optional[Tuple[int, int]] = None) -> List[MemberItem]:
+        """本次运行处理的成员 (全局索引, 成员)；shard=(K, N) 时只取 索引 % N == K"""
+        if shard is None:
+            return list(enumerate(self.members))
+        k, n = shard
+        return [(idx, member) for idx, member in enumerate(self.members) if idx % n == k]
+
+
+# ==================== 成员目录 ====================
+
+def _member_dir(config: Dict[str, Any], member: Optional[Dict[str, Any]], key: str, default: Path) -> Path:
+    from utils import safe_member_name
+    member = member or {}
+    override = member.get(key)
+    if isinstance(override, (str, Path)) and str(override).strip():
+        return Path(override).expanduser()
+    base = Path(config.get(key) or default).expanduser()
+    if config.get('member_dirs') is True:
+        return base / safe_member_name(member.get('name', '默认用户'))
+    return base
+
+
+def member_cache_dir(config: Dict[str, Any], member: Optional[Dict[str, Any]]) -> Path:
+    """成员的每日缓存目录"""
+    return _member_dir(config, member, 'cache_dir', DEFAULT_CACHE_DIR)
+
+
+def member_output_dir(config: Dict[str, Any], member: Optional[Dict[str, Any]]) -> Path:
+    """成员的报告输出目录"""
+    return _member_dir(config, member, 'output_dir', DEFAULT_OUTPUT_DIR)
+
+
+# ==================== 分片 / 并发 ====================
+
+def parse_shard(spec: Optional[str]) -> Optional[Tuple[int, int]]:
+    """"K/N" -> (K, N)；格式错误抛出 ValueError"""
+    if not spec:
+        return None
+    try:
+        k, n = (int(part) for part in spec.split('/', 1))
+    except ValueError:
+        raise ValueError(f"分片格式应为 K/N（如 0/4），当前: {spec}")
+    if n <= 0 or not 0 <= k < n:
+        raise ValueError(f"分片 {spec} 无效，要求 0 <= K < N")
+    return k, n
+
+
+def pop_shard_arg(argv: List[str]) -> Tuple[Optional[Tuple[int, int]], List[str]]:
+    """从参数列表中取出 --shard K/N（或 --shard=K/N），返回 (分片, 其余参数)"""
+    rest: List[str] = []
+    spec = None
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == '--shard' and i + 1 < len(argv):
+            spec = argv[i + 1]
+            i += 2
+            continue
+        if arg.startswith('--shard='):
+            spec = arg.split('=', 1)[1]
+        else:
+            rest.append(arg)
+        i += 1
+    return parse_shard(spec), rest
+
+
+def _positive_int(value: Any, default: int) -> int:
+    if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+        return value
+    return default
+
+
+def member_workers(config: Dict[str, Any]) -> int:
+    """同时处理的成员数（config.json: member_workers，默认 1 = 顺序处理）"""
+    return _positive_int(config.get('member_workers'), 1)
+
+
+def member_shard_size(config: Dict[str, Any]) -> int:
+    """每批提交的成员数（config.json: member_shard_size）"""
+    return _positive_int(config.get('member_shard_size'), DEFAULT_SHARD_SIZE)
+
+
+def iter_shards(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def map_members(func: Callable[..., Any], items: Iterable[Tuple[Any, ...]], workers: int = 1,
+                shard_size: int = DEFAULT_SHARD_SIZE, processes: bool = True
+                ) -> Iterator[Tuple[Tuple[Any, ...], Any, Optional[str]]]:
+    """按分片并发执行 func(*args)，按输入顺序产出 (args, 结果, 错误信息)
+
+    每个分片最多 workers 个任务同时执行，分片完成后再提交下一片，
+    未完成的任务与结果数量受分片大小约束，与成员总数无关。
+    processes=True 使用进程池（CPU 密集，func 与参数需可 pickle），否则使用线程池（I/O 密集）。
+    单个任务的异常只影响该任务；进程池无法启动时退回顺序执行。
+    工作进程异常退出（段错误、OOM、os._exit）会使整个进程池失效：该分片未完成的任务
+    逐个在独立进程中重跑，只有再次异常退出的任务报告失败，后续分片使用新的进程池。
+    """
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        for args in items:
+            yield _call(func, args)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    executor_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    try:
+        executor = executor_cls(max_workers=workers)
+    except (OSError, NotImplementedError) as e:
+        print(f"⚠️ 无法启动并发执行器（{e}），改为顺序处理", file=sys.stderr)
+        for args in items:
+            yield _call(func, args)
+        return
+
+    try:
+        for shard in iter_shards(items, shard_size):
+            futures = []
+            for args in shard:
+                try:
+                    futures.append((args, executor.submit(func, *args)))
+                except BrokenProcessPool:
+                    futures.append((args, None))
+            broken = False
+            for args, future in futures:
+                if future is not None:
+                    try:
+                        result = (args, future.result(), None)
+                    except BrokenProcessPool:
+                        result = None
+                    except Exception as e:
+                        result = (args, None, f"{type(e).__name__}: {e}")
+                    if result is not None:
+                        yield result
+                        continue
+                if not broken:
+                    broken = True
+                    print("⚠️ 工作进程异常退出，未完成的成员改为逐个在独立进程中重跑", file=sys.stderr)
+                yield _call_isolated(func, args)
+            if broken:
+                executor.shutdown()
+                executor = executor_cls(max_workers=workers)
+    finally:
+        executor.shutdown()
+
+
+def _call_isolated(func: Callable[..., Any], args: Tuple[Any, ...]) -> Tuple[Tuple[Any, ...], Any, Optional[str]]:
+    """在单独的工作进程中执行一个任务，进程异常退出只记为该任务失败"""
+    from concurrent.futures import ProcessPoolExecutor
+    try:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            return args, executor.submit(func, *args).result(), None
+    except Exception as e:
+        return args, None, f"{type(e).__name__}: {e}"
+
+
+def _call(func: Callable[..., Any], args: Tuple[Any, ...]) -> Tuple[Tuple[Any, ...], Any, Optional[str]]:
+    try:
+        return args, func(*args), None
+    except Exception as e:
+        return args, None, f"{type(e).__name__}: {e}"
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""成员时间线 - V6.1.0
+
+日报一次运行中，评分（HealthScoreHistory）、睡眠债与健康风险信号（HealthAlertDetector）都要回看
+同一成员最近若干天的缓存。MemberTimeline 在报告开始时按日期范围一次读取（SQLite 为一次查询），
+之后各环节只读内存：
+- get(date) / recent(days): 单日缓存摘要 / 最近 days 天（从近到远）
+- hrv_series / rhr_series / respiratory_series: [(日期, 数值)]，只含有效值（> 0）
+- bedtimes / waketimes: [(日期, "HH:MM")]
+- scores(date) / sleep_debt(date): 当日评分 / 累计睡眠债
+- put(date, doc): 写入缓存后同步时间线
+
+HealthScoreHistory.attach_timeline() 把时间线中的日期（含无缓存的日期）放入评分历史，
+HealthAlertDetector(timeline=...) 的回看窗口以时间线的结束日期（报告日期）为"今天"。
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from health_score import HISTORY_WINDOW_DAYS
+
+# 健康风险信号的最长回看窗口（HRV 长期趋势 90 天），同时覆盖评分预载窗口
+TIMELINE_DAYS = max(90, HISTORY_WINDOW_DAYS + 1)
+
+# 指标 -> (缓存字段, 嵌套字段)
+_METRIC_FIELDS = {
+    'hrv': ('hrv', 'value'),
+    'rhr': ('resting_hr', 'value'),
+    'respiratory': ('respiratory_rate', None),
+}
+
+
+class MemberTimeline:
+    """单个成员截至 end_date（含）最近 days 天的缓存摘要"""
+
+    def __init__(self, store, member_name: str, end_date: str, days: int = TIMELINE_DAYS):
+        self.store = store
+        self.member_name = member_name
+        self.end_date = end_date
+        self.days = days
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+        # 从近到远
+        self.dates: List[str] = [(end - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+        self.start_date = self.dates[-1]
+        try:
+            self._docs: Dict[str, Dict[str, Any]] = store.range(member_name, self.start_date, end_date)
+        except Exception:
+            self._docs = {}
+
+    def covers(self, date_str: str) -> bool:
+        return self.start_date <= date_str <= self.end_date
+
+    def get(self, date_str: str) -> Optional[Dict[str, Any]]:
+        return self._docs.get(date_str)
+
+    def put(self, date_str: str, doc: Optional[Dict[str, Any]]) -> None:
+        """写入缓存后同步内存中的摘要（与 store.get() 一致，不含明细）"""
+        from history_store import split_detail
+        if not self.covers(date_str):
+            return
+        if doc:
+            self._docs[date_str] = split_detail(doc)[0]
+        else:
+            self._docs.pop(date_str, None)
+
+    def recent(self, days: int) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+        """最近 days 天（含 end_date，从近到远）的 (日期, 缓存)，无缓存的日期为 None"""
+        return [(date_str, self._docs.get(date_str)) for date_str in self.dates[:days]]
+
+    # ---------- 类型化读取 ----------
+
+    def metric_series(self, metric: str, days: int) -> List[Tuple[str, float]]:
+        """最近 days 天某指标的有效值 [(日期, 数值)]，从近到远"""
+        field, nested = _METRIC_FIELDS[metric]
+        results = []
+        for date_str, doc in self.recent(days):
+            if not doc:
+                continue
+            value = doc.get(field)
+            if nested is not None:
+                value = value.get(nested) if isinstance(value, dict) else None
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+                results.append((date_str, float(value)))
+        return results
+
+    def hrv_series(self, days: int) -> List[Tuple[str, float]]:
+        return self.metric_series('hrv', days)
+
+    def rhr_series(self, days: int) -> List[Tuple[str, float]]:
+        return self.metric_series('rhr', days)
+
+    def respiratory_series(self, days: int) -> List[Tuple[str, float]]:
+        return self.metric_series('respiratory', days)
+
+    def _times(self, key: str, days: int) -> List[Tuple[str, str]]:
+        results = []
+        for date_str, doc in self.recent(days):
+            value = doc.get(key) if doc else None
+            if isinstance(value, str) and value not in ('', '--'):
+                results.append((date_str, value))
+        return results
+
+    def bedtimes(self, days: int) -> List[Tuple[str, str]]:
+        return self._times('bedtime', days)
+
+    def waketimes(self, days: int) -> List[Tuple[str, str]]:
+        return self._times('waketime', days)
+
+    def scores(self, date_str: str) -> Optional[Dict[str, Any]]:
+        doc = self._docs.get(date_str)
+        return doc.get('health_scores') if doc else None
+
+    def sleep_debt(self, date_str: str) -> float:
+        """某天的累计睡眠债（缓存顶层 sleep_debt_accumulated，无缓存时为 0）"""
+        doc = self._docs.get(date_str)
+        if doc:
+            return doc.get('sleep_debt_accumulated', 0)
+        return 0
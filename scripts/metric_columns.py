@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""指标列式存储 - V6.1.0
+
+每个指标在解析时一次性转换为并行的数组列：
+- wall:  array('q') 本地墙钟秒（带时区的字符串按字面时间，数字时间戳按本机时区），用于按天切片
+- epoch: array('q') 真实 UTC 秒，用于计算相邻样本间隔（心率区间）
+- qty:   array('d') 数值
+
+V6.1.0: 时间由每列一个 TimestampDecoder 解码（首条样本嗅探格式），按天切片只比较整数。
+V6.1.0: 每列维护 日期键 -> [lo, hi) 下标索引（导出文件常含相邻日期的样本），
+"指标 M 在 D 日的样本" 是一次字典查找；睡眠会话另建 SleepIndex，跨日睡眠窗口直接切片。
+
+列按 wall 排序，"某指标某一天的样本" 是一次二分查找得到的切片，
+不再为每个样本保留 dict，也不再逐条解析日期字符串。
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from timestamp_decoder import SECONDS_PER_DAY, TimestampDecoder, day_key, wall_to_datetime
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class MetricColumns:
+    """单个指标的列式样本
+
+    构建: append() 逐条追加，finalize() 后按墙钟时间排序并冻结。
+    查询: values/sum/mean/count/points 均可按日期切片（date_str=None 表示整个文件，
+    含无法解析时间的样本）。
+    """
+
+    __slots__ = ('name', 'unit', 'wall', 'epoch', 'qty', 'undated', '_sorted', '_decoder', '_days')
+
+    def __init__(self, name: str, unit: str = ''):
+        self.name = name
+        self.unit = unit or ''
+        self.wall = array('q')
+        self.epoch = array('q')
+        self.qty = array('d')
+        # 时间缺失或无法解析的样本，只参与整文件统计
+        self.undated = array('d')
+        self._sorted = True
+        self._decoder = TimestampDecoder()
+        self._days: Optional[Dict[int, Tuple[int, int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.qty) + len(self.undated)
+
+    def append(self, timestamp: Any, qty: Any) -> None:
+        if isinstance(qty, bool) or not isinstance(qty, (int, float)):
+            return
+        decoded = self._decoder.decode(timestamp)
+        if decoded is None:
+            self.undated.append(qty)
+            return
+        epoch, wall = decoded
+        if self._sorted and self.wall and wall < self.wall[-1]:
+            self._sorted = False
+        self.wall.append(wall)
+        self.epoch.append(epoch)
+        self.qty.append(qty)
+
+    def finalize(self) -> 'MetricColumns':
+        if not self._sorted:
+            order = sorted(range(len(self.wall)), key=self.wall.__getitem__)
+            self.wall = array('q', (self.wall[i] for i in order))
+            self.epoch = array('q', (self.epoch[i] for i in order))
+            self.qty = array('d', (self.qty[i] for i in order))
+            self._sorted = True
+        # 日期键 -> [lo, hi) 下标范围；每个出现的日期一次二分查找，O(天数 · log n)
+        days = {}
+        wall = self.wall
+        lo, n = 0, len(wall)
+        while lo < n:
+            day = wall[lo] // SECONDS_PER_DAY
+            hi = bisect_left(wall, (day + 1) * SECONDS_PER_DAY, lo)
+            days[day] = (lo, hi)
+            lo = hi
+        self._days = days
+        # 构建完成后解码器（含日期/时区缓存）不再需要
+        self._decoder = None
+        return self
+
+    def _day_index(self) -> Dict[int, Tuple[int, int]]:
+        if self._days is None:
+            self.finalize()
+        return self._days
+
+    def days(self) -> List[str]:
+        """列中出现的日期（YYYY-MM-DD，升序）"""
+        return [wall_to_datetime(day * SECONDS_PER_DAY).strftime('%Y-%m-%d') for day in self._day_index()]
+
+    def day_bounds(self, date_str: str) -> Tuple[int, int]:
+        """目标日期样本的 [lo, hi) 下标范围"""
+        return self._day_index().get(day_key(date_str), (0, 0))
+
+    def window_bounds(self, start_wall: int, end_wall: int) -> Tuple[int, int]:
+        """任意墙钟时间窗口 [start_wall, end_wall) 的下标范围（可跨日）"""
+        lo = bisect_left(self.wall, start_wall)
+        return lo, bisect_left(self.wall, end_wall, lo)
+
+    def values(self, date_str: str = None) -> array:
+        if date_str is None:
+            return self.qty + self.undated
+        lo, hi = self.day_bounds(date_str)
+        return self.qty[lo:hi]
+
+    def count(self, date_str: str = None) -> int:
+        if date_str is None:
+            return len(self)
+        lo, hi = self.day_bounds(date_str)
+        return hi - lo
+
+    def sum(self, date_str: str = None) -> float:
+        return sum(self.values(date_str))
+
+    def mean(self, date_str: str = None) -> Optional[float]:
+        vals = self.values(date_str)
+        return (sum(vals) / len(vals)) if vals else None
+
+    def points(self, date_str: str = None) -> Iterator[Tuple[int, float]]:
+        """按时间顺序产出 (epoch 秒, qty)；不含无法解析时间的样本"""
+        lo, hi = self.day_bounds(date_str) if date_str else (0, len(self.qty))
+        return zip(self.epoch[lo:hi], self.qty[lo:hi])
+
+    def to_numpy(self):
+        """返回 (epoch, qty) 的 NumPy 视图（零拷贝）；NumPy 不可用时返回 None"""
+        if not NUMPY_AVAILABLE:
+            return None
+        return (np.frombuffer(self.epoch, dtype=np.int64),
+                np.frombuffer(self.qty, dtype=np.float64))
+
+
+def build_columns(metrics: Iterable[Dict[str, Any]]) -> Dict[str, MetricColumns]:
+    """从导出文档的 data.metrics 数组构建 {指标名: MetricColumns}
+
+    sleep_analysis 的记录是会话结构而不是 qty 样本，不进入列存储。
+    """
+    columns: Dict[str, MetricColumns] = {}
+    for metric in metrics or []:
+        if not isinstance(metric, dict):
+            continue
+        name = metric.get('name')
+        if not name or name == 'sleep_analysis':
+            continue
+        col = columns.get(name)
+        if col is None:
+            col = columns[name] = MetricColumns(name, metric.get('units', ''))
+        for sample in metric.get('data') or []:
+            if isinstance(sample, dict):
+                col.append(sample.get('startDate') or sample.get('date'), sample.get('qty'))
+    for col in columns.values():
+        col.finalize()
+    return columns
+
+
+# ==================== 睡眠会话索引 ====================
+
+# 数字睡眠时间戳的有效范围：1970-01-01 ~ 2038-01-19（32位系统上限）
+_SLEEP_TS_MIN = 0
+_SLEEP_TS_MAX = 2147483647
+
+
+def sleep_wall_seconds(decoder: TimestampDecoder, ts: Any) -> Optional[int]:
+    """睡眠起止时间 -> 墙钟秒（兼容秒/毫秒时间戳与 "YYYY-MM-DD HH:MM:SS[ ±HHMM]" 字符串）
+
+    字符串按字面墙钟时间（忽略时区后缀），数字时间戳按本机时区且需在 32 位范围内。
+    """
+    decoded = decoder.decode(ts)
+    if decoded is None:
+        return None
+    epoch, wall = decoded
+    numeric = isinstance(ts, (int, float))
+    if not numeric:
+        try:
+            float(str(ts).strip())
+            numeric = True
+        except ValueError:
+            pass
+    if numeric and not (_SLEEP_TS_MIN <= epoch <= _SLEEP_TS_MAX):
+        return None
+    return wall
+
+
+SleepSession = Tuple[int, int, Dict[str, Any]]
+
+
+class SleepIndex:
+    """单个导出文件的睡眠会话索引
+
+    会话按入睡墙钟时间排序，[start, end) 时间窗口（如 20:00 ~ 次日 12:00）是一次二分查找；
+    起止时间缺失或无法解析的记录在建索引时剔除。
+    """
+
+    __slots__ = ('start', 'end', 'records', 'order')
+
+    def __init__(self, records: Iterable[Any] = ()):
+        decoder = TimestampDecoder()
+        sessions = []
+        for pos, record in enumerate(records or []):
+            if not isinstance(record, dict):
+                continue
+            start_ts = record.get('sleepStart')
+            end_ts = record.get('sleepEnd')
+            if not start_ts or not end_ts:
+                continue
+            start_wall = sleep_wall_seconds(decoder, start_ts)
+            end_wall = sleep_wall_seconds(decoder, end_ts)
+            if start_wall is None or end_wall is None:
+                continue
+            sessions.append((start_wall, pos, end_wall, record))
+        sessions.sort(key=lambda s: (s[0], s[1]))
+        self.start = array('q', (s[0] for s in sessions))
+        self.order = array('q', (s[1] for s in sessions))
+        self.end = array('q', (s[2] for s in sessions))
+        self.records = [s[3] for s in sessions]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def window(self, start_wall: int, end_wall: int) -> List[SleepSession]:
+        """入睡时间落在 [start_wall, end_wall) 的会话 (入睡墙钟秒, 醒来墙钟秒, 原始记录)，按文件原顺序"""
+        lo = bisect_left(self.start, start_wall)
+        hi = bisect_left(self.start, end_wall, lo)
+        hits = sorted(range(lo, hi), key=self.order.__getitem__)
+        return [(self.start[i], self.end[i], self.records[i]) for i in hits]
+
+
+def sleep_sessions_in_window(indexes: Sequence[Optional[SleepIndex]],
+                             start_wall: int, end_wall: int) -> List[SleepSession]:
+    """跨一个或多个导出文件取同一睡眠窗口的会话（parse_sleep_data_unified 内部使用）
+
+    各文件依次切片，同一会话（入睡/醒来时间相同）在多个文件中重复出现时只保留首个。
+    """
+    sessions: List[SleepSession] = []
+    seen = set()
+    for index in indexes:
+        if not index:
+            continue
+        for session in index.window(start_wall, end_wall):
+            if session[:2] in seen:
+                continue
+            seen.add(session[:2])
+            sessions.append(session)
+    return sessions
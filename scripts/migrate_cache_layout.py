@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""每日缓存目录布局迁移 - V6.1.0
+
+在 flat（cache_dir/{日期}_{成员}.json）与 sharded（cache_dir/{成员}/{YYYY}/{MM}/{日期}.json）
+两种布局之间移动 json 后端的每日缓存及其明细（路径规则见 history_store.cache_file_path）：
+- 同一文件系统内 rename，文件内容与 mtime 不变，增量清单中的缓存记录改写为新路径后仍然有效
+- 每个成员迁移时持有成员锁，与缓存回填、日报写入互斥
+- 目标位置已有文件（切换布局后新生成的缓存）时保留较新的一份
+- 可重复执行；迁移完成前 sharded 布局的读取会回退到 flat 路径
+
+用法：
+  python3 scripts/migrate_cache_layout.py                   # 迁移到 sharded
+  python3 scripts/migrate_cache_layout.py --to flat         # 迁回 flat
+  python3 scripts/migrate_cache_layout.py --dry-run         # 只统计，不移动
+  python3 scripts/migrate_cache_layout.py --shard 0/4       # 只处理索引 % 4 == 0 的成员
+
+迁移到 sharded 后在 config.json 中设置 "cache_layout": "sharded"。
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cache_manifest import CacheManifest, cache_relpath
+from history_store import CACHE_LAYOUTS, DETAIL_DIRNAME, cache_file_path, cache_layout, history_backend
+from member_registry import MemberRegistry, member_cache_dir, parse_shard
+from utils import load_config, member_lock, safe_member_name
+
+# (日期, 是否明细, 源路径)
+CacheFile = Tuple[str, bool, Path]
+
+
+def _is_date(text: str) -> bool:
+    return len(text) == 10 and text[4] == '-' and text[7] == '-' and text.replace('-', '').isdigit()
+
+
+def _list_dir(path: Path) -> List[str]:
+    try:
+        with os.scandir(path) as it:
+            return [entry.name for entry in it if entry.is_file()]
+    except OSError:
+        return []
+
+
+def _flat_files(cache_dir: Path, safe_name: str, listings: Dict[Path, List[str]]) -> Iterator[CacheFile]:
+    """flat 布局下该成员的缓存与明细（目录列表按目录缓存，多个成员共用一个目录时只扫描一次）"""
+    suffix = f'_{safe_name}.json'
+    for folder, detail in ((cache_dir, False), (cache_dir / DETAIL_DIRNAME, True)):
+        if folder not in listings:
+            listings[folder] = _list_dir(folder)
+        for name in listings[folder]:
+            if name.endswith(suffix) and name[10:11] == '_' and _is_date(name[:10]) and len(name) == 10 + len(suffix):
+                yield name[:10], detail, folder / name
+
+
+def _sharded_files(cache_dir: Path, safe_name: str) -> Iterator[CacheFile]:
+    member_root = cache_dir / safe_name
+    for year in sorted(_subdirs(member_root)):
+        for month in sorted(_subdirs(member_root / year)):
+            folder = member_root / year / month
+            for name in sorted(_list_dir(folder)):
+                if name.endswith('.detail.json') and _is_date(name[:-12]):
+                    yield name[:-12], True, folder / name
+                elif name.endswith('.json') and _is_date(name[:-5]):
+                    yield name[:-5], False, folder / name
+
+
+def _subdirs(path: Path) -> List[str]:
+    try:
+        with os.scandir(path) as it:
+            return [entry.name for entry in it if entry.is_dir()]
+    except OSError:
+        return []
+
+
+def _prune_empty_dirs(cache_dir: Path, folders: List[Path]) -> None:
+    """删除迁移后留下的空目录（不含 cache_dir 本身）"""
+    for folder in sorted(set(folders), key=lambda p: len(p.parts), reverse=True):
+        while folder != cache_dir and cache_dir in folder.parents:
+            try:
+                folder.rmdir()
+            except OSError:
+                break
+            folder = folder.parent
+
+
+def migrate_member(cache_dir: Path, member_name: str, target: str, listings: Dict[Path, List[str]],
+                   dry_run: bool = False) -> Dict[str, int]:
+    """迁移单个成员的缓存文件，返回 {'moved': 移动数, 'replaced': 保留目标较新文件数}"""
+    safe_name = safe_member_name(member_name)
+    source = 'flat' if target == 'sharded' else 'sharded'
+    files = list(_flat_files(cache_dir, safe_name, listings) if source == 'flat'
+                 else _sharded_files(cache_dir, safe_name))
+    stats = {'moved': 0, 'replaced': 0}
+    if not files or dry_run:
+        stats['moved'] = len(files)
+        return stats
+
+    manifest = CacheManifest(cache_dir, member_name)
+    renamed: Dict[str, str] = {}
+    for date_str, detail, src in files:
+        dst = cache_file_path(cache_dir, date_str, member_name, target, detail=detail)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if dst.exists() and dst.stat().st_mtime_ns >= src.stat().st_mtime_ns:
+            # 切换布局后已按新路径重新生成过，旧文件作废
+            src.unlink()
+            stats['replaced'] += 1
+            continue
+        os.replace(src, dst)
+        stats['moved'] += 1
+        if not detail:
+            renamed[cache_relpath(cache_dir, src)] = cache_relpath(cache_dir, dst)
+
+    # 清单中的缓存记录指向新路径（size/mtime 随 rename 保留）
+    changed = False
+    for entry in manifest.entries.values():
+        cache = entry.get('cache') if isinstance(entry, dict) else None
+        if cache and cache.get('file') in renamed:
+            cache['file'] = renamed[cache['file']]
+            changed = True
+    if changed:
+        manifest.save()
+    _prune_empty_dirs(cache_dir, [src.parent for _, _, src in files])
+    return stats
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="在 flat 与 sharded 布局之间迁移每日缓存文件")
+    parser.add_argument('--to', choices=CACHE_LAYOUTS, default='sharded', help="目标布局（默认 sharded）")
+    parser.add_argument('--shard', help="只处理第 K/N 片成员（索引 % N == K）")
+    parser.add_argument('--dry-run', action='store_true', help="只统计需要移动的文件，不做修改")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    try:
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    config = load_config()
+    if history_backend(config) == 'sqlite':
+        print("ℹ️ history_backend 为 sqlite，缓存保存在数据库中，无需迁移目录布局")
+        return
+
+    registry = MemberRegistry.from_config(config)
+    listings: Dict[Path, List[str]] = {}
+    total_moved, total_replaced = 0, 0
+    for idx, member_cfg in registry.select(shard):
+        member_name = registry.name(idx)
+        cache_dir = member_cache_dir(config, member_cfg)
+        with member_lock(cache_dir, member_name):
+            stats = migrate_member(cache_dir, member_name, args.to, listings, dry_run=args.dry_run)
+        total_moved += stats['moved']
+        total_replaced += stats['replaced']
+        if stats['moved'] or stats['replaced']:
+            print(f"   {member_name}: {stats['moved']} 个文件{'待移动' if args.dry_run else '已移动'}"
+                  + (f"，{stats['replaced']} 个旧文件已被新布局取代" if stats['replaced'] else ""))
+
+    action = '需要移动' if args.dry_run else '已迁移'
+    print(f"✅ {action} {total_moved} 个缓存文件到 {args.to} 布局")
+    if not args.dry_run and cache_layout(config) != args.to:
+        print(f"💡 请在 config.json 中设置 \"cache_layout\": \"{args.to}\"")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""依赖感知的重算计划 - V6.1.0
+
+某天的缓存会被其后若干天的评分读取：前一天的评分与累计睡眠债（1 天）、睡眠规律性（7 天）、
+恢复基线（21 天）、Body Age（7 天）、Pace of Aging（14 天），窗口长度见 health_score.py。
+因此修改一天的导出文件后，只有该天及其后 SCORE_LOOKBACK_DAYS 天需要重算：
+- affected_dates(): 静态计划，各变化日期向后展开回看窗口后的并集
+- AffectedFrontier: 执行时的动态边界 —— 每当重算出的缓存与原来不同，边界延伸到该天 + 回看窗口；
+  睡眠债链因此可以一直向后传递，而重算结果不变的日期不会再扩大范围
+- cache_dates_for_exports(): 导出文件日期 -> 读取它的缓存日期（next_day 睡眠模式下前一天也读取）
+
+用法见 generate_cache_only.py --changed。
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from health_score import SCORE_LOOKBACK_DAYS
+
+
+def _shift(date_str: str, days: int) -> str:
+    return (datetime.strptime(date_str, '%Y-%m-%d') + timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+def affected_dates(changed_dates: Iterable[str], until: Optional[str] = None,
+                   lookback: int = SCORE_LOOKBACK_DAYS) -> List[str]:
+    """变化日期及其后 lookback 天（不超过 until）的有序并集"""
+    affected: Set[str] = set()
+    for date_str in changed_dates:
+        for offset in range(lookback + 1):
+            current = _shift(date_str, offset)
+            if until is not None and current > until:
+                break
+            affected.add(current)
+    return sorted(affected)
+
+
+class AffectedFrontier:
+    """按日期顺序重算时的受影响边界
+
+    mark(date) 表示 date 的缓存发生了变化，其后 lookback 天都需要重算；
+    covers(date) 判断 date 是否仍在边界内。
+    """
+
+    def __init__(self, lookback: int = SCORE_LOOKBACK_DAYS):
+        self.lookback = lookback
+        self.until: Optional[str] = None
+
+    def mark(self, date_str: str) -> None:
+        end = _shift(date_str, self.lookback)
+        if self.until is None or end > self.until:
+            self.until = end
+
+    def covers(self, date_str: str) -> bool:
+        return self.until is not None and date_str <= self.until
+
+
+def cache_dates_for_exports(export_dates: Iterable[str], member_cfg: Optional[Dict[str, Any]] = None,
+                            sleep_config: Optional[Dict[str, Any]] = None) -> List[str]:
+    """读取这些日期的导出文件（HealthAutoExport-日期.json / 日期.json）的缓存日期"""
+    from extract_data_v5 import export_source_files
+    member_cfg = member_cfg or {}
+    cache_dates: Set[str] = set()
+    for export_date in export_dates:
+        names = {f'HealthAutoExport-{export_date}.json', f'{export_date}.json'}
+        for offset in (-1, 0, 1):
+            candidate = _shift(export_date, offset)
+            sources = export_source_files(candidate, member_cfg.get('health_dir'), member_cfg.get('workout_dir'),
+                                          sleep_config)
+            if any(path.name in names for path in sources):
+                cache_dates.add(candidate)
+    return sorted(cache_dates)
+
+
+def parse_changed_dates(spec: str) -> List[str]:
+    """"2026-03-01,2026-03-03" -> 有序去重的日期列表；格式错误抛出 ValueError"""
+    dates = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            datetime.strptime(part, '%Y-%m-%d')
+        except ValueError:
+            raise ValueError(f"日期格式错误，应为 YYYY-MM-DD: {part}")
+        dates.add(part)
+    if not dates:
+        raise ValueError("--changed 至少需要一个日期")
+    return sorted(dates)
+
+
+def pop_option_arg(argv: List[str], option: str) -> Tuple[Optional[str], List[str]]:
+    """从参数列表中取出 OPTION VALUE（或 OPTION=VALUE），返回 (取值, 其余参数)"""
+    rest: List[str] = []
+    value = None
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == option and i + 1 < len(argv):
+            value = argv[i + 1]
+            i += 2
+            continue
+        if arg.startswith(option + '='):
+            value = arg.split('=', 1)[1]
+        else:
+            rest.append(arg)
+        i += 1
+    return value, rest
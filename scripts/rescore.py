@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""按已有缓存重算评分 - V6.1.0
+
+health_score.py 的评分参数或算法（RECOVERY_WEIGHTS、基线窗口、Pace of Aging 等）调整后，
+已有缓存中的 health_scores 与睡眠债仍是旧算法的结果。本脚本只根据缓存中的原始字段
+（HRV、静息心率、呼吸率、睡眠、入睡/起床时间、zone_times、hr_zone_times、运动）重算这些字段，不重新解析导出文件：
+- 评分由 score_batch.calculate_all_scores_batch 按日期顺序一次算完（批量评分失败时改为逐天调用
+  calculate_all_scores，单日失败写入默认评分，与缓存回填一致）
+- 睡眠债（当天 / 累计）随新的 sleep_need 重新按日期链式累计
+- 只改写内容变化的缓存，持有成员锁；增量清单中这些日期的输出记录同步更新，--incremental 不会因此重算
+- 成员之间按 member_workers 并行，结束时输出各评分字段的变化汇总
+
+相同的缓存与算法重复执行得到相同的结果；范围之前的日期只读不写。
+
+用法：
+  python3 scripts/rescore.py 2026-01-01 2026-03-31              # 重算并写回
+  python3 scripts/rescore.py 2026-01-01 2026-03-31 --dry-run    # 只输出变化汇总
+  python3 scripts/rescore.py 2026-03-01 --member 张三            # 单个成员、单日
+  python3 scripts/rescore.py 2026-01-01 2026-03-31 --shard 0/4  # 只处理索引 % 4 == 0 的成员
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cache_manifest import CacheManifest
+from generate_cache_only import fallback_health_scores, score_cache_fields
+from health_score import HealthScoreHistory, calculate_all_scores
+from history_store import open_history_store
+from member_registry import (MemberRegistry, map_members, member_cache_dir, member_shard_size, member_workers,
+                             parse_shard)
+from score_batch import ZERO_ZONE_TIMES, calculate_all_scores_batch, load_score_columns, stored_legacy_strain
+from utils import load_config, member_lock
+
+# 汇总中统计变化幅度的字段（health_scores 内的评分与顶层累计睡眠债）
+DIFF_FIELDS = ('strain', 'recovery', 'sleep_performance', 'sleep_need', 'body_age', 'pace_of_aging',
+               'sleep_debt_accumulated')
+
+
+def _date_range(start_date: str, end_date: str) -> List[str]:
+    current = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    dates = []
+    while current <= end:
+        dates.append(current.strftime('%Y-%m-%d'))
+        current += timedelta(days=1)
+    return dates
+
+
+def _field(doc: Optional[Dict[str, Any]], field: str) -> Any:
+    if not doc:
+        return None
+    if field == 'sleep_debt_accumulated':
+        return doc.get(field)
+    return (doc.get('health_scores') or {}).get(field)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _new_diff() -> Dict[str, Any]:
+    return {'days': 0, 'changed': 0, 'written': 0,
+            'fields': {field: {'changed': 0, 'sum_abs': 0.0, 'max_abs': 0.0, 'appeared': 0, 'vanished': 0}
+                       for field in DIFF_FIELDS}}
+
+
+def _record_diff(diff: Dict[str, Any], old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    for field in DIFF_FIELDS:
+        before, after = _field(old, field), _field(new, field)
+        if before == after:
+            continue
+        stats = diff['fields'][field]
+        stats['changed'] += 1
+        if _is_number(before) and _is_number(after):
+            delta = abs(after - before)
+            stats['sum_abs'] += delta
+            stats['max_abs'] = max(stats['max_abs'], delta)
+        elif after is None:
+            stats['vanished'] += 1
+        else:
+            stats['appeared'] += 1
+
+
+def rescore_member(member_cfg: Dict[str, Any], member_name: str, config: Dict[str, Any], start_date: str,
+                   end_date: str, dry_run: bool = False) -> Dict[str, Any]:
+    """重算单个成员 [start_date, end_date] 的评分与睡眠债，返回变化汇总"""
+    cache_dir = member_cache_dir(config, member_cfg)
+    dates = _date_range(start_date, end_date)
+    diff = _new_diff()
+
+    with member_lock(cache_dir, member_name):
+        store = open_history_store(config, cache_dir)
+        columns = load_score_columns(store, member_name, start_date, end_date)
+        history = None
+        try:
+            batch = calculate_all_scores_batch(member_cfg, dates, columns)
+        except Exception as e:
+            print(f"   ⚠️ {member_name}: 批量评分失败（{e}），改为逐天评分")
+            batch = None
+            history = HealthScoreHistory(cache_dir, store=store)
+
+        # 按日期顺序重算，后一天的睡眠债读取前一天的新值
+        rescored: Dict[str, Dict[str, Any]] = {}
+        changed: List[str] = []
+        for date_str in dates:
+            i = columns.index[date_str]
+            doc = columns.docs[i]
+            if doc is None:
+                continue
+            diff['days'] += 1
+            if batch is not None:
+                health_scores = batch[date_str]
+            else:
+                # 与首次回填一致：评分当天时该天的缓存尚未写入
+                history.remember(date_str, member_name, None)
+                try:
+                    health_scores = calculate_all_scores(doc, member_cfg, history,
+                                                         doc.get('zone_times', ZERO_ZONE_TIMES))
+                    legacy = stored_legacy_strain(doc)
+                    if legacy is not None:
+                        health_scores['strain'], health_scores['zone_times'] = legacy
+                except Exception as e:
+                    print(f"   ⚠️ {member_name} {date_str} - 评分计算失败: {e}，使用默认值")
+                    health_scores = fallback_health_scores(doc, member_cfg)
+
+            prev_date = columns.dates[i - 1] if i > 0 else None
+            prev_doc = rescored.get(prev_date) or (columns.docs[i - 1] if i > 0 else None)
+            prev_debt = prev_doc.get('sleep_debt_accumulated', 0) if prev_doc else 0
+            new_doc = dict(doc, **score_cache_fields(doc, health_scores, prev_debt))
+            rescored[date_str] = new_doc
+            if history is not None:
+                history.remember(date_str, member_name, new_doc)
+            if new_doc != doc:
+                changed.append(date_str)
+                _record_diff(diff, doc, new_doc)
+
+        diff['changed'] = len(changed)
+        if dry_run or not changed:
+            return diff
+
+        manifest = CacheManifest(cache_dir, member_name)
+        try:
+            with store.batch():
+                for date_str in changed:
+                    # 改写前记录仍有效的日期，改写后更新输出记录
+                    current = manifest.cache_current(date_str, store)
+                    full = store.get(date_str, member_name, detail=True)
+                    if not full:
+                        continue
+                    new_doc = rescored[date_str]
+                    for key in ('sleep_debt_daily', 'sleep_debt_accumulated', 'health_scores'):
+                        full[key] = new_doc[key]
+                    store.put(date_str, member_name, full)
+                    diff['written'] += 1
+                    if current:
+                        if store.backend == 'json':
+                            manifest.update_cache(date_str, store.path(date_str, member_name))
+                        else:
+                            manifest.update_cache(date_str, cache_digest=store.digest(date_str, member_name))
+        finally:
+            manifest.save()
+    return diff
+
+
+def _merge_diff(total: Dict[str, Any], diff: Dict[str, Any]) -> None:
+    for key in ('days', 'changed', 'written'):
+        total[key] += diff[key]
+    for field, stats in diff['fields'].items():
+        merged = total['fields'][field]
+        for key in ('changed', 'sum_abs', 'appeared', 'vanished'):
+            merged[key] += stats[key]
+        merged['max_abs'] = max(merged['max_abs'], stats['max_abs'])
+
+
+def print_diff_summary(total: Dict[str, Any], dry_run: bool = False) -> None:
+    """各评分字段的变化天数、平均/最大变化幅度"""
+    print(f"\n{'='*50}")
+    action = '将改写' if dry_run else '已改写'
+    print(f"📊 评分变化汇总: {total['days']} 天缓存，{total['changed']} 天有变化"
+          + ("" if dry_run else f"，{action} {total['written']} 个缓存"))
+    if not total['changed']:
+        return
+    print(f"   {'字段':<24}{'变化天数':>8}{'平均变化':>10}{'最大变化':>10}")
+    for field, stats in total['fields'].items():
+        if not stats['changed']:
+            continue
+        numeric = stats['changed'] - stats['appeared'] - stats['vanished']
+        mean = stats['sum_abs'] / numeric if numeric else 0.0
+        line = f"   {field:<24}{stats['changed']:>8}{mean:>10.2f}{stats['max_abs']:>10.2f}"
+        if stats['appeared'] or stats['vanished']:
+            line += f"（新增 {stats['appeared']}，变为空 {stats['vanished']}）"
+        print(line)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="根据已有缓存的原始字段重算评分与睡眠债（不重新解析导出文件）")
+    parser.add_argument('start_date', help="起始日期 YYYY-MM-DD")
+    parser.add_argument('end_date', nargs='?', help="结束日期 YYYY-MM-DD（默认同起始日期）")
+    parser.add_argument('--member', help="只处理指定成员")
+    parser.add_argument('--shard', help="只处理第 K/N 片成员（索引 % N == K）")
+    parser.add_argument('--dry-run', action='store_true', help="只输出变化汇总，不写回缓存")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    start_date, end_date = args.start_date, args.end_date or args.start_date
+    try:
+        datetime.strptime(start_date, '%Y-%m-%d')
+        datetime.strptime(end_date, '%Y-%m-%d')
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    if end_date < start_date:
+        raise SystemExit("❌ 结束日期早于起始日期")
+
+    config = load_config()
+    registry = MemberRegistry.from_config(config)
+    selected = registry.select(shard)
+    if args.member:
+        selected = [(idx, member_cfg) for idx, member_cfg in selected if registry.name(idx) == args.member]
+        if not selected:
+            raise SystemExit(f"❌ 未找到成员: {args.member}")
+
+    workers = member_workers(config)
+    print(f"📅 重算 {start_date} ~ {end_date} 的评分{'（dry-run，不写回）' if args.dry_run else ''}")
+    print(f"👥 成员数: {len(selected)}" + (f"，并发 {workers}" if workers > 1 else ""))
+
+    total = _new_diff()
+    jobs = [(member_cfg, registry.name(idx), config, start_date, end_date, args.dry_run) for idx, member_cfg in selected]
+    for (_, member_name, _, _, _, _), diff, error in map_members(rescore_member, jobs, workers,
+                                                                member_shard_size(config)):
+        if error:
+            print(f"   ❌ {member_name} 重算失败: {error}")
+            continue
+        print(f"   {member_name}: {diff['days']} 天，{diff['changed']} 天评分变化")
+        _merge_diff(total, diff)
+    print_diff_summary(total, dry_run=args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
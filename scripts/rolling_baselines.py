@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""增量滚动基线 - V6.1.0
+
+个人基线（HRV / 静息心率 / 呼吸率 21 天均值）与睡眠规律（7 天入睡/起床时间均值）
+以状态的形式逐日推进，不再每天重新扫描整个窗口：
+- RollingWindow: 按日期滑动的窗口，精确滑动和（Fraction，增删不累积浮点误差）+ 计数
+- RollingBaselines: 单个成员的全部窗口，advance() 每天推进一次，O(1)
+
+状态只保存在 HealthScoreHistory 实例中（每个进程、每个成员一份），首次查询时按窗口构建，
+之后随顺序评分逐日推进；已计入窗口的日期被改写时按窗口重建。
+"""
+
+from collections import deque
+from datetime import datetime, timedelta
+from fractions import Fraction
+from typing import Callable, Dict, Optional
+
+# 窗口长度与 HealthScoreHistory 的默认查询窗口一致
+METRIC_WINDOW_DAYS = 21
+CONSISTENCY_WINDOW_DAYS = 7
+
+METRIC_KEYS = ('hrv', 'rhr', 'respiratory')
+SLEEP_TIME_KEYS = ('bedtime', 'waketime')
+
+
+def _shift(date_str: str, days: int) -> str:
+    return (datetime.strptime(date_str, '%Y-%m-%d') + timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+class RollingWindow:
+    """按日期滑动的数值窗口"""
+
+    def __init__(self, days: int):
+        self.days = days
+        self.entries: deque = deque()          # (date, value)，按日期递增
+        self.total = Fraction(0)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def push(self, date_str: str, value: float) -> None:
+        self.entries.append((date_str, value))
+        self.total += Fraction(value)
+
+    def evict_before(self, start_date: str) -> None:
+        """移除早于 start_date 的条目"""
+        while self.entries and self.entries[0][0] < start_date:
+            _, value = self.entries.popleft()
+            self.total -= Fraction(value)
+
+    def mean(self) -> Optional[float]:
+        if not self.entries:
+            return None
+        return float(self.total / len(self.entries))
+
+
+class RollingBaselines:
+    """单个成员的滚动基线状态
+
+    状态覆盖到 last_date（含）为止的数据；查询某天的基线时先 sync() 推进到前一天。
+    """
+
+    def __init__(self, metric_days: int = METRIC_WINDOW_DAYS, consistency_days: int = CONSISTENCY_WINDOW_DAYS):
+        self.metric_days = metric_days
+        self.consistency_days = consistency_days
+        self.reset()
+
+    def reset(self) -> None:
+        self.last_date: Optional[str] = None
+        self.windows: Dict[str, RollingWindow] = {key: RollingWindow(self.metric_days) for key in METRIC_KEYS}
+        self.windows.update({key: RollingWindow(self.consistency_days) for key in SLEEP_TIME_KEYS})
+
+    def advance(self, date_str: str, values: Dict[str, Optional[float]]) -> None:
+        """推进一天（date_str 必须晚于 last_date）；values 中缺失/None 的指标不计入"""
+        if self.last_date is not None and date_str <= self.last_date:
+            raise ValueError(f"滚动基线只能按日期递增推进: {date_str} <= {self.last_date}")
+        for key, window in self.windows.items():
+            value = values.get(key)
+            if value is not None:
+                window.push(date_str, float(value))
+        self.last_date = date_str
+        self._evict(_shift(date_str, 1))
+
+    def _evict(self, end_date: str) -> None:
+        """只保留 end_date 之前各自窗口天数内的条目"""
+        for window in self.windows.values():
+            window.evict_before(_shift(end_date, -window.days))
+
+    def sync(self, end_date: str, load: Callable[[str], Optional[Dict[str, Optional[float]]]]) -> None:
+        """把状态推进到 end_date 的前一天；load(date) 返回该天的取值（无缓存为 None）
+
+        状态已超过 end_date（回头重算较早日期）或间隔超过窗口时，从窗口起点重建。
+        """
+        target = _shift(end_date, -1)
+        start = _shift(end_date, -max(self.metric_days, self.consistency_days))
+        if self.last_date is not None and self.last_date > target:
+            self.reset()
+        if self.last_date is None or self.last_date < start:
+            self.windows = {key: RollingWindow(window.days) for key, window in self.windows.items()}
+            current = start
+        else:
+            current = _shift(self.last_date, 1)
+        while current <= target:
+            self.advance(current, load(current) or {})
+            current = _shift(current, 1)
+        self._evict(end_date)
+
+    def mean(self, key: str, min_count: int = 1) -> Optional[float]:
+        window = self.windows[key]
+        return window.mean() if len(window) >= min_count else None
+
+    def count(self, key: str) -> int:
+        return len(self.windows[key])
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""批量评分 - V6.1.0
+
+calculate_all_scores 逐天评分：每天从 HealthScoreHistory 查询回看窗口、逐项做标量计算。
+重放一段历史（评分算法调整后重算已有缓存）时，calculate_all_scores_batch 按列一次算完整个日期范围：
+- ScoreColumns: 成员连续日期范围内的列式历史（HRV / 静息心率 / 呼吸率、睡眠时长、入睡/起床时间、
+  zone_times 与缓存中已有的评分），load_score_columns() 一次范围读取构建
+- 21 天基线与 7 天睡眠规律：前缀和（Fraction，与 rolling_baselines 同样精确）得到每天的窗口计数与均值
+- Body Age 的 7 天窗口均值：NumPy 可用时按数组累加（求和顺序与 calculate_body_age 相同），
+  再交给 health_score._body_age_result 计算，两条路径结果逐位一致
+- Sleep Performance、Recovery 逐天调用 health_score 的 calculate_sleep_performance / calculate_recovery，
+  公式只有一份，评分算法调整后批量重算自动跟随
+- Strain（按天独立）、睡眠需求链（依赖前一天的 Strain 与 sleep_need）与 Pace of Aging 逐天计算
+
+结果与首次回填一致，即"按日期顺序逐天调用 calculate_all_scores 并写回评分，评分某天时该天的缓存
+尚未写入"：某天之前的日期读到本次重算的评分，当天自身的缓存不进入 Body Age / Pace of Aging 的回看窗口。
+V6.1.0 之前生成的缓存没有 hr_zone_times，没有运动区间的日期沿用缓存中的 Strain（见 stored_legacy_strain）。
+"""
+
+import sys
+from datetime import datetime, timedelta
+from fractions import Fraction
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from health_score import (
+    BODY_AGE_METRICS, BODY_AGE_RECENT_DAYS, PACE_RECENT_DAYS, SCORE_LOOKBACK_DAYS, HealthScoreHistory,
+    _body_age_result, _extract_metric_value, _pace_from_values, _score_result, _sleep_consistency_from_means,
+    _time_to_minutes, calculate_body_age, calculate_day_strain, calculate_recovery, calculate_sleep_performance,
+)
+from rolling_baselines import CONSISTENCY_WINDOW_DAYS, METRIC_KEYS, METRIC_WINDOW_DAYS, SLEEP_TIME_KEYS
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 与 HealthScoreHistory.get_metric_baselines / get_sleep_consistency 的最少天数一致
+BASELINE_MIN_DAYS = 7
+CONSISTENCY_MIN_DAYS = 3
+
+ZERO_ZONE_TIMES = {'zone_1': 0, 'zone_2': 0, 'zone_3': 0, 'zone_4': 0, 'zone_5': 0}
+
+
+def _shift(date_str: str, days: int) -> str:
+    return (datetime.strptime(date_str, '%Y-%m-%d') + timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+class ScoreColumns:
+    """成员 start_date ~ end_date（含）逐日的列式历史，下标 0 为 start_date
+
+    docs 为 {日期: 缓存摘要}（store.range 的返回值），缺失的日期视为无缓存。
+    """
+
+    def __init__(self, start_date: str, end_date: str, docs: Dict[str, Dict[str, Any]]):
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        days = (datetime.strptime(end_date, '%Y-%m-%d') - start).days + 1
+        self.dates: List[str] = [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(max(0, days))]
+        self.index: Dict[str, int] = {date_str: i for i, date_str in enumerate(self.dates)}
+        self.docs: List[Optional[Dict[str, Any]]] = [docs.get(date_str) or None for date_str in self.dates]
+
+        # 基线与睡眠规律的输入（与 HealthScoreHistory._baseline_inputs 口径一致）
+        inputs = [HealthScoreHistory._baseline_inputs(doc) for doc in self.docs]
+        self.baseline_inputs: Dict[str, List[Optional[float]]] = {
+            key: [item[key] if item else None for item in inputs] for key in METRIC_KEYS + SLEEP_TIME_KEYS
+        }
+        # Body Age / Pace of Aging 读取的指标（与 _extract_metric_value 口径一致）
+        self.metrics: Dict[str, List[Optional[float]]] = {
+            metric: [_extract_metric_value(doc, metric) if doc else None for doc in self.docs]
+            for metric in BODY_AGE_METRICS + ('recovery', 'sleep_performance')
+        }
+        self.stored_scores: List[Optional[Dict[str, Any]]] = [
+            doc.get('health_scores') if doc else None for doc in self.docs
+        ]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def present(self, i: int) -> bool:
+        return self.docs[i] is not None
+
+
+def load_score_columns(store, member_name: str, start_date: str, end_date: str,
+                       lookback: int = SCORE_LOOKBACK_DAYS) -> ScoreColumns:
+    """一次范围读取 start_date 前 lookback 天至 end_date 的缓存摘要"""
+    first = _shift(start_date, -lookback)
+    return ScoreColumns(first, end_date, store.range(member_name, first, end_date))
+
+
+def _window_stats(values: Sequence[Optional[float]], width: int) -> Tuple[List[int], List[Optional[Fraction]]]:
+    """每天之前 width 天（不含当天）有效值的个数与精确和（前缀和相减，O(n)）"""
+    prefix_sum = [Fraction(0)]
+    prefix_count = [0]
+    for value in values:
+        if value is None:
+            prefix_sum.append(prefix_sum[-1])
+            prefix_count.append(prefix_count[-1])
+        else:
+            prefix_sum.append(prefix_sum[-1] + Fraction(float(value)))
+            prefix_count.append(prefix_count[-1] + 1)
+    counts, sums = [], []
+    for i in range(len(values)):
+        lo = max(0, i - width)
+        counts.append(prefix_count[i] - prefix_count[lo])
+        sums.append(prefix_sum[i] - prefix_sum[lo])
+    return counts, sums
+
+
+def _window_means(values: Sequence[Optional[float]], width: int,
+                  min_count: int = 1) -> Tuple[List[int], List[Optional[float]]]:
+    counts, sums = _window_stats(values, width)
+    means = [float(total / count) if count >= max(1, min_count) else None for count, total in zip(counts, sums)]
+    return counts, means
+
+
+def stored_legacy_strain(doc: Dict[str, Any]) -> Optional[Tuple[float, Dict[str, Any]]]:
+    """V6.1.0 之前生成的缓存中已有的 (Strain, zone_times)；其他缓存返回 None（按 calculate_day_strain 重算）
+
+    这些缓存不含 hr_zone_times，没有运动区间的日期无法还原当天全天心率得到的 Strain，重算时沿用缓存中的值。
+    """
+    if 'hr_zone_times' in doc or 'heart_rate_data' in doc:
+        return None
+    zone_times = doc.get('zone_times', ZERO_ZONE_TIMES)
+    if isinstance(zone_times, dict) and any(
+            isinstance(zone_times.get(f'zone_{z}', 0), (int, float)) and zone_times.get(f'zone_{z}', 0) > 0
+            for z in range(1, 6)):
+        return None
+    scores = doc.get('health_scores')
+    if not isinstance(scores, dict) or not isinstance(scores.get('strain'), (int, float)):
+        return None
+    return scores['strain'], scores.get('zone_times', ZERO_ZONE_TIMES)
+
+
+class _DayInputs:
+    """单日评分输入（与 calculate_all_scores 对 data 的取值口径一致）"""
+
+    __slots__ = ('strain', 'zone_times', 'hr_zone_times', 'sleep_hours', 'disturbances_min', 'latency_min',
+                 'bed_min', 'wake_min', 'hrv', 'rhr', 'respiratory', 'has_respiratory')
+
+    def __init__(self, data: Dict[str, Any], age: int):
+        legacy = stored_legacy_strain(data)
+        if legacy is not None:
+            (self.strain, self.zone_times), self.hr_zone_times = legacy, None
+        else:
+            self.strain, self.zone_times, self.hr_zone_times = calculate_day_strain(
+                data, age, data.get('zone_times', ZERO_ZONE_TIMES))
+        sleep = data.get('sleep', {}) or {}
+        self.sleep_hours = sleep.get('total_hours', 7)
+        self.disturbances_min = sleep.get('awake_hours', 0) * 60
+        self.latency_min = data.get('sleep_latency_min') or sleep.get('sleep_latency_min') or 20
+        self.bed_min = _time_to_minutes(data.get('bedtime') or sleep.get('bedtime'), assume_bedtime=True)
+        self.wake_min = _time_to_minutes(data.get('waketime') or sleep.get('waketime'), assume_bedtime=False)
+        self.hrv = data.get('hrv', {}).get('value', 50)
+        self.rhr = data.get('resting_hr', {}).get('value', 70)
+        respiratory = data.get('respiratory_rate')
+        self.respiratory = respiratory
+        self.has_respiratory = isinstance(respiratory, (int, float)) and respiratory > 0
+
+
+def calculate_all_scores_batch(profile: Dict[str, Any], dates: Iterable[str], columns: ScoreColumns,
+                               use_numpy: Optional[bool] = None) -> Dict[str, Dict[str, Any]]:
+    """按日期顺序重算 dates 中各天的评分，返回 {日期: calculate_all_scores 同结构的结果}
+
+    dates 必须落在 columns 的日期范围内；columns 中无缓存的日期跳过。
+    use_numpy=None 时 NumPy 可用即按数组计算 Body Age 窗口均值，False 强制使用标量路径。
+    """
+    if use_numpy is None or use_numpy:
+        use_numpy = NUMPY_AVAILABLE
+    age = profile.get('age', 30) or 30
+    gender = profile.get('gender', 'male') or 'male'
+
+    targets = []
+    for date_str in sorted(set(dates)):
+        if date_str not in columns.index:
+            raise ValueError(f"日期不在评分历史范围内: {date_str}")
+        i = columns.index[date_str]
+        if columns.present(i):
+            targets.append(i)
+    if not targets:
+        return {}
+
+    days = [_DayInputs(columns.docs[i], age) for i in targets]
+
+    # 前缀和窗口：前 21 天指标基线、前 7 天入睡/起床时间
+    baselines = {key: _window_means(columns.baseline_inputs[key], METRIC_WINDOW_DAYS, BASELINE_MIN_DAYS)[1]
+                 for key in METRIC_KEYS}
+    sleep_times = {key: _window_means(columns.baseline_inputs[key], CONSISTENCY_WINDOW_DAYS)
+                   for key in SLEEP_TIME_KEYS}
+    consistency = []
+    for i, day in zip(targets, days):
+        (bed_counts, bed_means), (wake_counts, wake_means) = sleep_times['bedtime'], sleep_times['waketime']
+        if day.bed_min is None or day.wake_min is None:
+            consistency.append(75.0)
+        elif bed_counts[i] < CONSISTENCY_MIN_DAYS or wake_counts[i] < CONSISTENCY_MIN_DAYS:
+            consistency.append(75.0)
+        else:
+            consistency.append(_sleep_consistency_from_means(day.bed_min, day.wake_min, bed_means[i], wake_means[i]))
+
+    # 睡眠需求链：前一天是本批日期时读本次结果，否则读缓存中的评分
+    new_scores: Dict[int, Dict[str, Any]] = {}
+
+    def previous_scores(i: int) -> Dict[str, Any]:
+        if i - 1 in new_scores:
+            return new_scores[i - 1]
+        if i - 1 < 0 or not columns.present(i - 1):
+            return {}
+        return columns.stored_scores[i - 1] or {}
+
+    sleep_results = []
+    for i, day, day_consistency in zip(targets, days, consistency):
+        prev = previous_scores(i)
+        result = calculate_sleep_performance(day.sleep_hours, prev.get('strain', 10), day_consistency,
+                                             day.disturbances_min, day.latency_min,
+                                             baseline_need=prev.get('sleep_need', 7.8) or 7.8)
+        new_scores[i] = {'strain': day.strain, 'sleep_need': result.sleep_need}
+        sleep_results.append(result)
+
+    day_baselines = [{'baseline_hrv': baselines['hrv'][i], 'baseline_rhr': baselines['rhr'][i],
+                      'baseline_respiratory': baselines['respiratory'][i]} for i in targets]
+    respiratory_values = [day.respiratory if day.has_respiratory else base['baseline_respiratory']
+                          for day, base in zip(days, day_baselines)]
+    recovery_results = [
+        calculate_recovery(day.hrv, day.rhr, result.performance, resp, day_consistency,
+                           base['baseline_hrv'], base['baseline_rhr'], base['baseline_respiratory'],
+                           gender, has_respiratory_data=day.has_respiratory)
+        for day, result, resp, day_consistency, base
+        in zip(days, sleep_results, respiratory_values, consistency, day_baselines)
+    ]
+
+    body_age_results = _body_age_batch(columns, targets, days, age, gender, use_numpy)
+
+    # Pace of Aging：窗口内之前的日期读本次的 Recovery / Sleep Performance（当天缓存尚未写入，不在窗口中）
+    current = {metric: list(columns.metrics[metric]) for metric in ('recovery', 'sleep_performance')}
+    results: Dict[str, Dict[str, Any]] = {}
+    for n, i in enumerate(targets):
+        window = [j for j in range(i - 1, max(-1, i - PACE_RECENT_DAYS), -1) if columns.present(j)]
+        pace = None
+        if len(window) >= 14:
+            hrv_values = [columns.metrics['hrv'][j] for j in window if columns.metrics['hrv'][j] is not None]
+            rhr_values = [columns.metrics['rhr'][j] for j in window if columns.metrics['rhr'][j] is not None]
+            recovery_values = [current['recovery'][j] for j in window
+                               if current['recovery'][j] is not None and current['recovery'][j] > 0]
+            sleep_values = [current['sleep_performance'][j] for j in window
+                            if current['sleep_performance'][j] is not None and current['sleep_performance'][j] > 0]
+            pace = _pace_from_values(hrv_values, rhr_values, recovery_values, sleep_values)
+        current['recovery'][i] = float(recovery_results[n]['recovery'])
+        current['sleep_performance'][i] = float(sleep_results[n].performance)
+
+        day = days[n]
+        results[columns.dates[i]] = _score_result(
+            day.strain, day.zone_times, sleep_results[n], recovery_results[n], body_age_results[n], pace,
+            consistency[n], day.latency_min, day_baselines[n], day.has_respiratory, day.hr_zone_times)
+    return results
+
+
+def _body_age_batch(columns: ScoreColumns, targets: List[int], days: List[_DayInputs], age: int,
+                    gender: str, use_numpy: bool) -> list:
+    """最近 BODY_AGE_RECENT_DAYS 天（当天缓存尚未写入，实际为之前的天数）的 Body Age；
+    有缓存的天数不足 3 天时按当天数据估算"""
+    width = BODY_AGE_RECENT_DAYS
+    means = None
+    if use_numpy:
+        # 从近到远依次累加（与 calculate_body_age 的求和顺序一致），窗口左侧补 width-1 个空位
+        pad = width - 1
+        present = np.concatenate([np.zeros(pad, dtype=bool),
+                                  np.array([doc is not None for doc in columns.docs], dtype=bool)])
+        idx = np.array(targets, dtype=np.int64) + pad
+        days_used = sum(present[idx - k].astype(np.int64) for k in range(1, width))
+        means = {}
+        for metric in BODY_AGE_METRICS:
+            raw = columns.metrics[metric]
+            values = np.concatenate([np.zeros(pad), np.array([v if v is not None else 0.0 for v in raw])])
+            valid = present & np.concatenate([np.zeros(pad, dtype=bool), np.array([v is not None for v in raw])])
+            total = np.zeros(len(targets))
+            count = np.zeros(len(targets), dtype=np.int64)
+            for k in range(1, width):
+                total = total + np.where(valid[idx - k], values[idx - k], 0.0)
+                count = count + valid[idx - k]
+            means[metric] = (np.where(count > 0, total / np.maximum(count, 1), 0.0).tolist(), count.tolist())
+        days_used = days_used.tolist()
+
+    results = []
+    for n, i in enumerate(targets):
+        window = [] if means is not None else [
+            columns.docs[j] for j in range(i - 1, max(-1, i - width), -1) if columns.docs[j] is not None]
+        if (days_used[n] if means is not None else len(window)) < 3:
+            data = columns.docs[i]
+            sleep = data.get('sleep', {}) or {}
+            single_day = {
+                'sleep': {'total_hours': sleep.get('total_hours', 7)},
+                'steps': data.get('steps', 8000),
+                'resting_hr': {'value': days[n].rhr},
+                'hrv': {'value': days[n].hrv},
+                'respiratory_rate': days[n].respiratory
+            }
+            results.append(calculate_body_age([single_day, single_day, single_day], age, gender))
+        elif means is None:
+            results.append(calculate_body_age(window, age, gender))
+        else:
+            metrics = {metric: means[metric][0][n] for metric in BODY_AGE_METRICS if means[metric][1][n] > 0}
+            results.append(_body_age_result(metrics, days_used[n], age, gender))
+    return results
@@ -13,7 +13,9 @@ from datetime import datetime, timedelta
 
 # V6.0.5: 使用共用工具函数
 sys.path.insert(0, str(Path(__file__).parent))
-from utils import load_config, safe_member_name, MAX_MEMBERS
+from utils import load_config, safe_member_name, directory_index
+from member_registry import (MemberRegistry, map_members, member_output_dir, member_shard_size, member_workers,
+                             pop_shard_arg)
 
 # 导入 Provider
 from email_providers import PROVIDER_MAP
@@ -119,15 +121,17 @@ def find_reports_for_member(date_str: str, upload_dir: str, member_name: str, me
     
     safe_name = safe_member_name(member_name)
     reports = []
+    # V6.1.0: 上传目录只扫描一次，各类报告在内存索引中匹配
+    upload_index = directory_index(upload_path)
     
     # 1. 日报 - 严格匹配文件名格式
     daily_pattern = f"{date_str}-daily-v5-medical-{safe_name}.pdf"
-    daily_reports = list(upload_path.glob(daily_pattern))
+    daily_reports = upload_index.match(daily_pattern)
     reports.extend(daily_reports)
     
     # 2. 周报 - 查找包含该日期的周报（支持任意日期范围）
     # 周报文件名格式：{start_date}_to_{end_date}-weekly-medical-{safe_name}.pdf
-    all_weekly = list(upload_path.glob(f"*_to_*-weekly-medical-{safe_name}.pdf"))
+    all_weekly = upload_index.match(f"*_to_*-weekly-medical-{safe_name}.pdf")
     for weekly_file in all_weekly:
         # 从文件名解析日期范围
         import re
@@ -141,14 +145,14 @@ def find_reports_for_member(date_str: str, upload_dir: str, member_name: str, me
     # 3. 月报 - 严格匹配
     year_month = date_str[:7]
     monthly_pattern = f"{year_month}-monthly-medical-{safe_name}.pdf"
-    monthly_reports = list(upload_path.glob(monthly_pattern))
+    monthly_reports = upload_index.match(monthly_pattern)
     reports.extend(monthly_reports)
     
     # 4. 旧格式兜底（仅当没有找到任何报告时，且成员名为空或默认）
     is_default_name = member_name in ['', '默认用户', 'User']
     is_first_member = (member_idx == 0)
     if not reports and (is_default_name or is_first_member):
-        old_daily = list(upload_path.glob(f"{date_str}-daily-v5-medical.pdf"))
+        old_daily = upload_index.match(f"{date_str}-daily-v5-medical.pdf")
         reports.extend(old_daily)
     
     if reports:
@@ -239,66 +243,72 @@ def send_email(date_str: str, report_files: list, member_idx: int = 0) -> bool:
     return False
 
 
-def send_email_to_all(date_str: str, report_files_pattern: list = None) -> bool:
-    """发送邮件给所有成员"""
-    config = load_config()
-    members = config.get('members', [])
+def _send_member(date_str: str, idx: int, member: dict, report_files_pattern: list, config: dict) -> bool:
+    """为单个成员查找报告并发送，返回是否成功（未找到报告视为失败）"""
+    member_name = member.get('name', f'成员{idx+1}')
+    
+    print(f"\n{'━' * 60}")
+    print(f"👤 成员 {idx+1}: {member_name}")
+    print('━' * 60)
+    
+    # 确定该成员的报告文件 - V5.8.1 严格匹配版
+    if report_files_pattern:
+        # 从指定文件列表中严格筛选
+        safe_name = safe_member_name(member_name)
+        member_files = []
+        for f in report_files_pattern:
+            filename = Path(f).name
+            # 严格匹配: 文件名必须以 -{safe_name}.pdf 结尾
+            if filename.endswith(f"-{safe_name}.pdf"):
+                member_files.append(f)
+    else:
+        # 自动查找（V6.1.0: 按成员解析报告目录）
+        member_files = find_reports_for_member(date_str, str(member_output_dir(config, member)), member_name, idx)
+    
+    if not member_files:
+        print(f"⚠️  未找到 {member_name} 的报告文件，跳过")
+        return False
+    
+    print(f"📊 找到 {len(member_files)} 个报告文件:")
+    for f in member_files:
+        print(f"   - {Path(f).name}")
     
-    # 限制最多 MAX_MEMBERS 位成员
-    if len(members) > MAX_MEMBERS:
-        print(f"⚠️ 成员数 {len(members)} 超过上限 {MAX_MEMBERS}，批量发送仅处理前 {MAX_MEMBERS} 位")
-        members = members[:MAX_MEMBERS]
+    return send_email(date_str, member_files, idx)
+
+
+def send_email_to_all(date_str: str, report_files_pattern: list = None, shard=None) -> bool:
+    """发送邮件给所有成员
+
+    V6.1.0: 不再限制成员数；成员按分片提交，最多 member_workers 个成员同时发送（I/O 密集，使用线程）。
+    shard=(K, N) 时只发送索引 % N == K 的成员。
+    """
+    config = load_config()
+    registry = MemberRegistry.from_config(config)
     
-    if not members:
+    if not len(registry):
         print("❌ 错误: 未配置任何成员")
         return False
     
-    upload_dir = config.get('output_dir', 
-                            '~/.openclaw/workspace/shared/health-reports/upload')
-    
+    selected = registry.select(shard)
     success_count = 0
     
     print(f"\n{'=' * 60}")
-    print(f"📧 批量发送模式: 共 {len(members)} 个成员")
+    print(f"📧 批量发送模式: 共 {len(selected)} 个成员")
     print('=' * 60)
     
-    for idx, member in enumerate(members):
-        member_name = member.get('name', f'成员{idx+1}')
-        
-        print(f"\n{'━' * 60}")
-        print(f"👤 成员 {idx+1}/{len(members)}: {member_name}")
-        print('━' * 60)
-        
-        # 确定该成员的报告文件 - V5.8.1 严格匹配版
-        if report_files_pattern:
-            # 从指定文件列表中严格筛选
-            safe_name = safe_member_name(member_name)
-            member_files = []
-            for f in report_files_pattern:
-                filename = Path(f).name
-                # 严格匹配: 文件名必须以 -{safe_name}.pdf 结尾
-                if filename.endswith(f"-{safe_name}.pdf"):
-                    member_files.append(f)
-        else:
-            # 自动查找
-            member_files = find_reports_for_member(date_str, upload_dir, member_name, idx)
-        
-        if not member_files:
-            print(f"⚠️  未找到 {member_name} 的报告文件，跳过")
-            continue
-        
-        print(f"📊 找到 {len(member_files)} 个报告文件:")
-        for f in member_files:
-            print(f"   - {Path(f).name}")
-        
-        if send_email(date_str, member_files, idx):
+    jobs = [(date_str, idx, member, report_files_pattern, config) for idx, member in selected]
+    for (_, idx, member, _, _), sent, error in map_members(
+            _send_member, jobs, member_workers(config), member_shard_size(config), processes=False):
+        if error:
+            print(f"❌ 成员 {member.get('name', idx + 1)} 发送异常: {error}")
+        elif sent:
             success_count += 1
     
     print(f"\n{'=' * 60}")
-    print(f"📊 发送完成: {success_count}/{len(members)} 成功")
+    print(f"📊 发送完成: {success_count}/{len(selected)} 成功")
     print('=' * 60)
     
-    return success_count == len(members)
+    return success_count == len(selected)
 
 
 def main():
@@ -306,15 +316,22 @@ def main():
         print(__doc__)
         sys.exit(1)
     
-    date_str = sys.argv[1]
+    # V6.1.0: all 模式支持 --shard K/N
+    try:
+        shard, argv = pop_shard_arg(sys.argv)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    date_str = argv[1]
     
     # 解析参数
     member_idx = 0
     report_files_start = 2
     send_to_all = False
     
-    if len(sys.argv) > 2:
-        second_arg = sys.argv[2]
+    if len(argv) > 2:
+        second_arg = argv[2]
         if second_arg.lower() == 'all':
             send_to_all = True
             report_files_start = 3
@@ -328,27 +345,23 @@ def main():
                 report_files_start = 2
     
     # 确定报告文件
-    if len(sys.argv) > report_files_start:
-        report_files = sys.argv[report_files_start:]
+    if len(argv) > report_files_start:
+        report_files = argv[report_files_start:]
     else:
         # 自动查找
         config = load_config()
-        upload_dir = config.get('output_dir', 
-                                '~/.openclaw/workspace/shared/health-reports/upload')
         
         if send_to_all:
             report_files = None  # 会在 send_email_to_all 中按成员查找
         else:
-            members = config.get('members', [])
-            if members and len(members) > member_idx:
-                member_name = members[member_idx].get('name', '')
-            else:
-                member_name = ''
+            member = MemberRegistry.from_config(config).get(member_idx) or {}
+            member_name = member.get('name', '')
+            upload_dir = str(member_output_dir(config, member))
             report_files = find_reports_for_member(date_str, upload_dir, member_name, member_idx)
     
     # 执行发送
     if send_to_all:
-        success = send_email_to_all(date_str, report_files)
+        success = send_email_to_all(date_str, report_files, shard)
     else:
         if not report_files:
             print(f"❌ 未找到 {date_str} 的报告文件")
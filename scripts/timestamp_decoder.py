@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""样本时间解码 - V6.1.0
+
+Health Auto Export 同一个指标流里的时间格式是固定的（通常是
+"YYYY-MM-DD HH:MM:SS +0800"，少数导出为秒/毫秒时间戳）。
+TimestampDecoder 在首条样本上嗅探格式并缓存选中的解析函数，后续样本直接按
+固定位置切片取整数，不再逐条尝试 float → 正则改写时区 → fromisoformat → strptime。
+
+解码结果为整数 (epoch 秒, 墙钟秒)：
+- epoch: 真实 UTC 秒，用于计算样本间隔
+- 墙钟秒: 当地日历时间按 UTC 计的秒数，墙钟秒 // 86400 即日期键（day key），
+  按天过滤只需比较整数
+
+日期归属与日报一致：带时区偏移的字符串按字面日期归日，数字时间戳与无时区字符串按本机时区归日。
+"""
+
+import math
+import re
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+SECONDS_PER_DAY = 86400
+
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_TZ_SUFFIX = re.compile(r'(.+?)\s+([+-]\d{4})$')
+_FALLBACK_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M')
+
+Decoded = Tuple[int, int]
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    """解析多种时间格式（秒/毫秒时间戳、ISO、常见日期字符串），返回 datetime
+
+    逐条尝试所有格式的通用解析，供少量数据（运动开始/结束时间等）与解码器兜底使用。
+    """
+    if value is None or value == '':
+        return None
+
+    # 1) 数值类型时间戳
+    if isinstance(value, (int, float)):
+        ts = float(value)
+        if ts > 1e12:  # 毫秒
+            ts /= 1000.0
+        try:
+            return datetime.fromtimestamp(ts)
+        except Exception:
+            return None
+
+    # 2) 字符串
+    text = str(value).strip()
+    if not text:
+        return None
+
+    # 2.1 纯数字字符串
+    try:
+        ts = float(text)
+        if ts > 1e12:
+            ts /= 1000.0
+        return datetime.fromtimestamp(ts)
+    except Exception:
+        pass
+
+    # 2.2 ISO / 带时区
+    iso_text = text.replace('Z', '+00:00')
+    match = _TZ_SUFFIX.match(iso_text)
+    if match:
+        dt_part, tz_part = match.groups()
+        iso_text = f"{dt_part}{tz_part[:3]}:{tz_part[3:]}"
+    try:
+        return datetime.fromisoformat(iso_text)
+    except Exception:
+        pass
+
+    # 2.3 常见格式兜底
+    for fmt in _FALLBACK_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except Exception:
+            continue
+
+    return None
+
+
+def day_key(date_str: str) -> int:
+    """YYYY-MM-DD -> 日期键（1970-01-01 起的天数）"""
+    return datetime.strptime(date_str, '%Y-%m-%d').toordinal() - _EPOCH_ORDINAL
+
+
+def wall_to_datetime(wall: int) -> datetime:
+    """墙钟秒 -> 无时区 datetime（当地日历时间）"""
+    return _EPOCH_NAIVE + timedelta(seconds=wall)
+
+
+def wall_hhmm(wall: int) -> str:
+    """墙钟秒 -> "HH:MM" """
+    sod = wall % SECONDS_PER_DAY
+    return f"{sod // 3600:02d}:{sod % 3600 // 60:02d}"
+
+
+class TimestampDecoder:
+    """按流嗅探格式的时间解码器（每个指标流/文件一个实例，非线程安全）
+
+    decode() 先用上次选中的解析函数；失败时重新嗅探，因此混合格式的流也能正确解码，
+    只是失去快速路径。
+    """
+
+    __slots__ = ('_parser', '_days', '_offsets')
+
+    def __init__(self):
+        self._parser: Optional[Callable[[Any], Optional[Decoded]]] = None
+        self._days: Dict[str, int] = {}       # "YYYY-MM-DD" -> day key
+        self._offsets: Dict[int, int] = {}    # 小时桶 -> 本机 UTC 偏移秒
+
+    def decode(self, value: Any) -> Optional[Decoded]:
+        """返回 (epoch 秒, 墙钟秒)；无法解析返回 None"""
+        parser = self._parser
+        if parser is not None:
+            result = parser(value)
+            if result is not None:
+                return result
+        parser = self._sniff(value)
+        if parser is None:
+            return None
+        result = parser(value)
+        if result is not None:
+            self._parser = parser
+        return result
+
+    def day(self, value: Any) -> Optional[int]:
+        """只取日期键"""
+        decoded = self.decode(value)
+        return decoded[1] // SECONDS_PER_DAY if decoded is not None else None
+
+    # ---------- 嗅探 ----------
+
+    def _sniff(self, value: Any):
+        if value is None or isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            return self._parse_number
+        if not isinstance(value, str):
+            return self._parse_generic
+        text = value.strip()
+        if not text:
+            return None
+        try:
+            float(text)
+            return self._parse_number
+        except ValueError:
+            pass
+        if self._parse_fixed(text) is not None:
+            return self._parse_fixed
+        if self._parse_fixed_naive(text) is not None:
+            return self._parse_fixed_naive
+        return self._parse_generic
+
+    # ---------- 快速路径 ----------
+
+    def _day_of(self, text10: str) -> int:
+        days = self._days.get(text10)
+        if days is None:
+            if text10[4] != '-' or text10[7] != '-':
+                raise ValueError(text10)
+            days = date(int(text10[:4]), int(text10[5:7]), int(text10[8:10])).toordinal() - _EPOCH_ORDINAL
+            self._days[text10] = days
+        return days
+
+    def _wall_of(self, text: str) -> Optional[int]:
+        """"YYYY-MM-DD HH:MM[:SS]" 或 "YYYY-MM-DDTHH:MM[:SS]" 前缀 -> 墙钟秒"""
+        if len(text) < 16 or text[10] not in ' T' or text[13] != ':':
+            return None
+        try:
+            wall = self._day_of(text[:10]) * SECONDS_PER_DAY + int(text[11:13]) * 3600 + int(text[14:16]) * 60
+            if len(text) >= 19 and text[16] == ':':
+                wall += int(text[17:19])
+        except ValueError:
+            return None
+        return wall
+
+    def _parse_fixed(self, value: Any) -> Optional[Decoded]:
+        """带时区："YYYY-MM-DD HH:MM:SS +0800" / ISO "…T…+08:00" / "…Z" """
+        if not isinstance(value, str) or len(value) < 20:
+            return None
+        wall = self._wall_of(value)
+        if wall is None or value[16] != ':':
+            return None
+        tz = value[19:].strip()
+        if tz == 'Z':
+            return wall, wall
+        if len(tz) == 6 and tz[3] == ':':
+            tz = tz[:3] + tz[4:]
+        if len(tz) != 5 or tz[0] not in '+-' or not tz[1:].isdigit():
+            return None
+        offset = int(tz[1:3]) * 3600 + int(tz[3:5]) * 60
+        if tz[0] == '-':
+            offset = -offset
+        return wall - offset, wall
+
+    def _parse_fixed_naive(self, value: Any) -> Optional[Decoded]:
+        """无时区："YYYY-MM-DD HH:MM[:SS]"，按本机时区换算 epoch"""
+        if not isinstance(value, str):
+            return None
+        n = len(value)
+        if n not in (16, 19):
+            return None
+        wall = self._wall_of(value)
+        if wall is None or (n == 19 and value[16] != ':'):
+            return None
+        return wall - self._local_offset_for_wall(wall), wall
+
+    def _parse_number(self, value: Any) -> Optional[Decoded]:
+        """秒/毫秒时间戳（数值或数字字符串），按本机时区取墙钟"""
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            ts = float(value)
+        elif isinstance(value, str):
+            try:
+                ts = float(value)
+            except ValueError:
+                return None
+        else:
+            return None
+        if not math.isfinite(ts):
+            return None
+        if ts > 1e12:  # 毫秒
+            ts /= 1000.0
+        epoch = int(math.floor(ts))
+        offset = self._local_offset_for_epoch(epoch)
+        if offset is None:
+            return None
+        return epoch, epoch + offset
+
+    def _parse_generic(self, value: Any) -> Optional[Decoded]:
+        dt = parse_datetime(value)
+        if dt is None:
+            return None
+        try:
+            epoch = int(math.floor(dt.timestamp()))
+        except (OverflowError, OSError, ValueError):
+            return None
+        wall = dt.replace(tzinfo=None) - _EPOCH_NAIVE
+        return epoch, wall.days * SECONDS_PER_DAY + wall.seconds
+
+    # ---------- 本机时区偏移（按小时缓存，兼容夏令时切换） ----------
+
+    def _local_offset_for_epoch(self, epoch: int) -> Optional[int]:
+        bucket = epoch // 3600
+        offset = self._offsets.get(bucket)
+        if offset is None:
+            try:
+                offset = time.localtime(epoch).tm_gmtoff
+            except (OverflowError, OSError, ValueError):
+                return None
+            self._offsets[bucket] = offset
+        return offset
+
+    def _local_offset_for_wall(self, wall: int) -> int:
+        bucket = -1 - wall // 3600  # 与 epoch 桶分开存放
+        offset = self._offsets.get(bucket)
+        if offset is None:
+            try:
+                epoch = wall_to_datetime(wall).timestamp()
+                offset = wall - int(math.floor(epoch))
+            except (OverflowError, OSError, ValueError):
+                offset = 0
+            self._offsets[bucket] = offset
+        return offset
@@ -1,19 +1,32 @@
 #!/usr/bin/env python3
 """Health Report 共用工具函数 - V6.0.5"""
 
+import fnmatch
 import json
 import math
+import os
 import re
 import sys
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Optional, Dict, Any, List, Union
 
+from timestamp_decoder import SECONDS_PER_DAY, day_key, wall_hhmm
+
 try:
     from langdetect import detect, LangDetectError
     LANGDETECT_AVAILABLE = True
 except ImportError:
     LANGDETECT_AVAILABLE = False
 
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows
+    FCNTL_AVAILABLE = False
+
 import logging
 
 # 配置日志
@@ -47,9 +60,6 @@ def _setup_file_handler():
     ))
     logger.addHandler(file_handler)
     _file_handler_initialized = True
-# 全局常量
-MAX_MEMBERS = 3  # 支持的最大成员数
-
 # 能量单位转换常量
 KJ_TO_KCAL = 4.184
 
@@ -126,6 +136,7 @@ def handle_error(error: Exception, context: str = "", exit_on_fatal: bool = True
 _config_cache = None
 _config_cache_path = None
 _config_cache_mtime = None
+_config_cache_registry = None
 
 def load_config() -> dict:
     """从 config.json 加载配置（带验证和缓存，支持文件修改检测）
@@ -134,7 +145,7 @@ def load_config() -> dict:
     1. 脚本所在目录的父目录/config.json
     2. ~/.openclaw/workspace-health/config.json
     """
-    global _config_cache, _config_cache_path, _config_cache_mtime
+    global _config_cache, _config_cache_path, _config_cache_mtime, _config_cache_registry
     
     config_paths = [
         Path(__file__).parent.parent / "config.json",
@@ -158,7 +169,8 @@ def load_config() -> dict:
         _config_cache_path == current_config_path and
         _config_cache_mtime is not None and
         current_mtime is not None and
-        _config_cache_mtime >= current_mtime):
+        _config_cache_mtime >= current_mtime and
+        (not _config_cache_registry or _registry_signature(_config_cache, current_config_path) == _config_cache_registry)):
         return _config_cache
 
     for config_path in config_paths:
@@ -166,6 +178,12 @@ def load_config() -> dict:
             with open(config_path, 'r', encoding='utf-8') as f:
                 config = json.load(f)
 
+            # V6.1.0: 合并独立成员注册表（members_file / members_dir）
+            registry = _registry_signature(config, config_path)
+            if registry:
+                from member_registry import apply_member_registry
+                apply_member_registry(config, config_path.parent)
+
             # 验证配置
             validation_errors = validate_config_schema(config)
             if validation_errors:
@@ -177,6 +195,7 @@ def load_config() -> dict:
             # 缓存配置（包含修改时间）
             _config_cache = config
             _config_cache_path = config_path
+            _config_cache_registry = registry
             try:
                 _config_cache_mtime = config_path.stat().st_mtime
             except OSError:
@@ -186,6 +205,14 @@ def load_config() -> dict:
     return {}
 
 
+def _registry_signature(config: dict, config_path: Path) -> tuple:
+    """成员注册表的修改时间签名；未配置注册表时为空元组"""
+    if not (config.get('members_file') or config.get('members_dir')):
+        return ()
+    from member_registry import registry_signature
+    return registry_signature(config, config_path.parent)
+
+
 def get_log_dir(config=None):
     """获取日志目录，优先从配置读取"""
     if config is None:
@@ -502,6 +529,25 @@ def validate_templates_exist(template_dir: Path, language: str = "CN") -> dict:
 from datetime import datetime, timedelta
 from typing import List
 
+
+def _sleep_window_dates(date_str: str, read_mode: str):
+    """根据读取模式确定 (要读取的文件日期列表, 窗口开始日期, 窗口结束日期)"""
+    date = datetime.strptime(date_str, '%Y-%m-%d')
+    if read_mode == 'next_day':
+        next_date = date + timedelta(days=1)
+        return [next_date], date, next_date
+    # same_day
+    prev_date = date - timedelta(days=1)
+    return [date], prev_date, date
+
+
+def sleep_source_files(date_str: str, health_dir: Path, read_mode: str = 'next_day') -> List[Path]:
+    """V6.1.0: parse_sleep_data_unified 会读取的导出文件（不判断是否存在），供增量回填比对输入"""
+    health_dir = Path(health_dir).expanduser()
+    return [health_dir / f'HealthAutoExport-{d.strftime("%Y-%m-%d")}.json'
+            for d in _sleep_window_dates(date_str, read_mode)[0]]
+
+
 def parse_sleep_data_unified(
     date_str: str,
     health_dir: Path,
@@ -532,25 +578,14 @@ def parse_sleep_data_unified(
             'waketime': str,  # 起床时间 (HH:MM)
         }
     """
-    date = datetime.strptime(date_str, '%Y-%m-%d')
-
-    # 根据模式确定要读取的文件和日期范围
-    if read_mode == 'next_day':
-        next_date = date + timedelta(days=1)
-        sleep_file_date = next_date
-        filter_start_date = date
-        filter_end_date = next_date
-    else:  # same_day
-        prev_date = date - timedelta(days=1)
-        sleep_file_date = date
-        filter_start_date = prev_date
-        filter_end_date = date
+    sleep_file_dates, filter_start_date, filter_end_date = _sleep_window_dates(date_str, read_mode)
 
     # 读取文件
     health_dir = Path(health_dir).expanduser()
-    sleep_file = health_dir / f'HealthAutoExport-{sleep_file_date.strftime("%Y-%m-%d")}.json'
+    sleep_files = [health_dir / f'HealthAutoExport-{d.strftime("%Y-%m-%d")}.json' for d in sleep_file_dates]
+    sleep_files = [f for f in sleep_files if directory_index(f.parent).exists(f.name)]
 
-    if not sleep_file.exists():
+    if not sleep_files:
         return {
             'records': [],
             'total_hours': 0,
@@ -563,30 +598,17 @@ def parse_sleep_data_unified(
         }
 
     try:
-        with open(sleep_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # V6.1.0: 与指标/运动读取共用解析缓存（次日文件即下一天的指标文件）；
+        # 睡眠会话按入睡时间建索引，窗口筛选是一次切片而不是全量扫描
+        from export_reader import read_sleep_index
+        from metric_columns import sleep_sessions_in_window
+        sleep_indexes = [read_sleep_index(f) for f in sleep_files]
     except Exception as e:
         import logging
         logging.warning(f"解析睡眠数据失败: {e}")
-        return {
-            'records': [],
-            'total_hours': 0,
-            'deep_hours': 0,
-            'core_hours': 0,
-            'rem_hours': 0,
-            'awake_hours': 0,
-            'bedtime': '--',
-            'waketime': '--',
-        }
-
-    # 提取睡眠记录（兼容两种数据结构）
-    sleep_data = data.get('data', {}).get('sleep_analysis')
-    if not sleep_data:
-        metrics = data.get('data', {}).get('metrics', [])
-        metrics_dict = {m.get('name'): m for m in metrics if 'name' in m}
-        sleep_data = metrics_dict.get('sleep_analysis', {})
+        sleep_indexes = []
 
-    if not sleep_data:
+    if not any(sleep_indexes):
         return {
             'records': [],
             'total_hours': 0,
@@ -603,155 +625,105 @@ def parse_sleep_data_unified(
     earliest_start = None
     latest_end = None
 
-    for record in sleep_data.get('data', []):
-        start_ts = record.get('sleepStart')
-        end_ts = record.get('sleepEnd')
-        if not start_ts or not end_ts:
-            continue
-
-        # 解析时间（兼容秒/毫秒时间戳，以及常见字符串格式）
-        def _parse_sleep_ts(ts):
-            # 边界值定义
-            MIN_TIMESTAMP = 0  # 1970-01-01
-            MAX_TIMESTAMP = 2147483647  # 2038-01-19 (32位系统上限)
+    # 统一筛选逻辑：筛选在指定时间窗口内的睡眠记录（入睡时间在 filter_start_date 的 start_hour 点
+    # 到 filter_end_date 的 end_hour 点之间）；read_mode 已经在文件选择阶段处理了差异
+    # V6.1.0: 按整点小时比较，小时数向上取整后即为墙钟秒区间 [window_start, window_end)
+    window_start = (day_key(filter_start_date.strftime('%Y-%m-%d')) * SECONDS_PER_DAY
+                    + min(max(math.ceil(start_hour), 0), 24) * 3600)
+    window_end = (day_key(filter_end_date.strftime('%Y-%m-%d')) * SECONDS_PER_DAY
+                  + min(max(math.ceil(end_hour), 0), 24) * 3600)
+
+    for start_wall, end_wall, record in sleep_sessions_in_window(sleep_indexes, window_start, window_end):
+        duration_hours = (end_wall - start_wall) / 3600
+
+        # 获取原始值
+        deep_raw = record.get('deep', 0) or 0
+        core_raw = record.get('core', 0) or 0
+        rem_raw = record.get('rem', 0) or 0
+        awake_raw = record.get('awake', 0) or 0
+
+        # 统一转换为小时（假设原始值可能是分钟或小时）
+        def normalize_hours(value, field_name=""):
+            """将睡眠时长值归一化为小时数 - 增强版
+            
+            规则:
+            1. 值 < 0: 无效，返回0
+            2. 值 < 3: 认为是小时，直接返回
+            3. 值 >= 3 且 < 100: 模糊区域，根据字段类型判断
+            4. 值 >= 100: 认为是分钟，转换为小时
+            5. 值 > 1440 (24小时): 视为无效数据
+            """
+            # 空值检查
+            if value is None:
+                return 0.0
             
-            if isinstance(ts, (int, float)):
-                ts_num = float(ts)
-                # 检查是否溢出或无效
-                if not math.isfinite(ts_num) or ts_num < 0:
-                    raise ValueError(f"无效时间戳: {ts}")
-                if ts_num > 1e12:  # 毫秒
-                    ts_num /= 1000.0
-                # 检查转换后是否在有效范围内
-                if ts_num > MAX_TIMESTAMP or ts_num < MIN_TIMESTAMP:
-                    raise ValueError(f"时间戳超出有效范围: {ts}")
-                return datetime.fromtimestamp(ts_num)
-
-            ts_text = str(ts).strip()
-            # 纯数字字符串（秒/毫秒）
+            # 类型转换
             try:
-                ts_num = float(ts_text)
-                if not math.isfinite(ts_num) or ts_num < 0:
-                    raise ValueError(f"无效时间戳: {ts}")
-                if ts_num > 1e12:
-                    ts_num /= 1000.0
-                if ts_num > MAX_TIMESTAMP or ts_num < MIN_TIMESTAMP:
-                    raise ValueError(f"时间戳超出有效范围: {ts}")
-                return datetime.fromtimestamp(ts_num)
-            except (ValueError, TypeError, OSError, OverflowError):
-                pass
-
-            # 字符串日期（保留到秒）
-            return datetime.strptime(ts_text[:19], '%Y-%m-%d %H:%M:%S')
-
-        try:
-            start_dt = _parse_sleep_ts(start_ts)
-            end_dt = _parse_sleep_ts(end_ts)
-        except (ValueError, TypeError, OSError, OverflowError):
-            continue
-
-        # 筛选逻辑
-        start_date = start_dt.strftime('%Y-%m-%d')
-        record_start_hour = start_dt.hour
+                val = float(value)
+            except (ValueError, TypeError, OverflowError):
+                return 0.0
+            
+            # 范围检查
+            if val < 0 or not math.isfinite(val):
+                return 0.0
+            
+            # 超过24小时视为无效
+            if val > 1440:  # 1440分钟 = 24小时
+                print(f"⚠️ 警告: {field_name} 值 {val} 超过24小时，视为无效数据", file=sys.stderr)
+                return 0.0
 
-        # 统一筛选逻辑：筛选在指定时间窗口内的睡眠记录
-        # read_mode 已经在文件选择阶段处理了差异
-        belongs_to_date = (
-            (start_date == filter_start_date.strftime('%Y-%m-%d') and record_start_hour >= start_hour) or
-            (start_date == filter_end_date.strftime('%Y-%m-%d') and record_start_hour < end_hour)
-        )
+            # 如果值很小(<3)，几乎肯定是小时（睡眠阶段不可能<3分钟）
+            if val < 3:
+                return round(val, 2)
 
-        if belongs_to_date:
-            duration_hours = (end_dt - start_dt).total_seconds() / 3600
-
-            # 获取原始值
-            deep_raw = record.get('deep', 0) or 0
-            core_raw = record.get('core', 0) or 0
-            rem_raw = record.get('rem', 0) or 0
-            awake_raw = record.get('awake', 0) or 0
-
-            # 统一转换为小时（假设原始值可能是分钟或小时）
-            def normalize_hours(value, field_name=""):
-                """将睡眠时长值归一化为小时数 - 增强版
-                
-                规则:
-                1. 值 < 0: 无效，返回0
-                2. 值 < 3: 认为是小时，直接返回
-                3. 值 >= 3 且 < 100: 模糊区域，根据字段类型判断
-                4. 值 >= 100: 认为是分钟，转换为小时
-                5. 值 > 1440 (24小时): 视为无效数据
-                """
-                # 空值检查
-                if value is None:
-                    return 0.0
-                
-                # 类型转换
-                try:
-                    val = float(value)
-                except (ValueError, TypeError, OverflowError):
-                    return 0.0
-                
-                # 范围检查
-                if val < 0 or not math.isfinite(val):
-                    return 0.0
-                
-                # 超过24小时视为无效
-                if val > 1440:  # 1440分钟 = 24小时
-                    print(f"⚠️ 警告: {field_name} 值 {val} 超过24小时，视为无效数据", file=sys.stderr)
-                    return 0.0
-
-                # 如果值很小(<3)，几乎肯定是小时（睡眠阶段不可能<3分钟）
-                if val < 3:
-                    return round(val, 2)
-
-                # 判断是否为睡眠阶段字段
-                is_stage = any(x in field_name.lower() for x in ['deep', 'core', 'rem', 'awake', 'light'])
-
-                if is_stage:
-                    # 睡眠阶段：正常范围 0.1-5 小时（6-300 分钟）
-                    # 深睡 1-2 小时很常见（60-120 分钟），提高阈值到 90
-                    if val > 90:  # 超过 90 才明确认为是分钟
-                        return round(val / 60.0, 2)
-                    # 30-90 的模糊区域：如果看起来像整数分钟
-                    if val >= 30 and abs(val - round(val)) < 0.01:
-                        return round(val / 60.0, 2)
-                else:
-                    # 总睡眠：正常范围 3-12 小时（180-720 分钟）
-                    # 如果值 > 24 (可能是分钟表示的24小时) 或 > 100 (明确是分钟)
-                    if val > 24 and val > 100:
+            # 判断是否为睡眠阶段字段
+            is_stage = any(x in field_name.lower() for x in ['deep', 'core', 'rem', 'awake', 'light'])
+
+            if is_stage:
+                # 睡眠阶段：正常范围 0.1-5 小时（6-300 分钟）
+                # 深睡 1-2 小时很常见（60-120 分钟），提高阈值到 90
+                if val > 90:  # 超过 90 才明确认为是分钟
+                    return round(val / 60.0, 2)
+                # 30-90 的模糊区域：如果看起来像整数分钟
+                if val >= 30 and abs(val - round(val)) < 0.01:
+                    return round(val / 60.0, 2)
+            else:
+                # 总睡眠：正常范围 3-12 小时（180-720 分钟）
+                # 如果值 > 24 (可能是分钟表示的24小时) 或 > 100 (明确是分钟)
+                if val > 24 and val > 100:
+                    return round(val / 60.0, 2)
+                # 如果值在 12-100 之间，可能是分钟的模糊区域
+                if val > 12 and val > 60:
+                    # 如果看起来像分钟（整数值且较大）
+                    if abs(val - round(val)) < 0.01 and val > 60:
                         return round(val / 60.0, 2)
-                    # 如果值在 12-100 之间，可能是分钟的模糊区域
-                    if val > 12 and val > 60:
-                        # 如果看起来像分钟（整数值且较大）
-                        if abs(val - round(val)) < 0.01 and val > 60:
-                            return round(val / 60.0, 2)
 
-                return round(val, 2)
-
-            deep_h = normalize_hours(deep_raw, 'deep')
-            core_h = normalize_hours(core_raw, 'core')
-            rem_h = normalize_hours(rem_raw, 'rem')
-            awake_h = normalize_hours(awake_raw, 'awake')
-            stage_total = deep_h + core_h + rem_h + awake_h
-
-            # 若分期字段缺失，则回退到 start/end 计算出的时长，避免 total_hours 被错误算成 0
-            total_h = stage_total if stage_total > 0 else max(duration_hours, 0.0)
-
-            sleep_records.append({
-                'start': start_dt.strftime('%H:%M'),
-                'end': end_dt.strftime('%H:%M'),
-                'total': round(total_h, 2),
-                'deep': deep_h,
-                'core': core_h,
-                'rem': rem_h,
-                'awake': awake_h,
-            })
-
-            # 记录最早入睡和最晚起床（按完整 datetime 比较）
-            if earliest_start is None or start_dt < earliest_start:
-                earliest_start = start_dt
-            if latest_end is None or end_dt > latest_end:
-                latest_end = end_dt
+            return round(val, 2)
+
+        deep_h = normalize_hours(deep_raw, 'deep')
+        core_h = normalize_hours(core_raw, 'core')
+        rem_h = normalize_hours(rem_raw, 'rem')
+        awake_h = normalize_hours(awake_raw, 'awake')
+        stage_total = deep_h + core_h + rem_h + awake_h
+
+        # 若分期字段缺失，则回退到 start/end 计算出的时长，避免 total_hours 被错误算成 0
+        total_h = stage_total if stage_total > 0 else max(duration_hours, 0.0)
+
+        sleep_records.append({
+            'start': wall_hhmm(start_wall),
+            'end': wall_hhmm(end_wall),
+            'total': round(total_h, 2),
+            'deep': deep_h,
+            'core': core_h,
+            'rem': rem_h,
+            'awake': awake_h,
+        })
+
+        # 记录最早入睡和最晚起床（按完整墙钟时间比较）
+        if earliest_start is None or start_wall < earliest_start:
+            earliest_start = start_wall
+        if latest_end is None or end_wall > latest_end:
+            latest_end = end_wall
 
     # 计算总时长
     deep = sum(r['deep'] for r in sleep_records)
@@ -767,8 +739,8 @@ def parse_sleep_data_unified(
         'core_hours': round(core, 2),
         'rem_hours': round(rem, 2),
         'awake_hours': round(awake, 2),
-        'bedtime': earliest_start.strftime('%H:%M') if earliest_start else '--',
-        'waketime': latest_end.strftime('%H:%M') if latest_end else '--',
+        'bedtime': wall_hhmm(earliest_start) if earliest_start is not None else '--',
+        'waketime': wall_hhmm(latest_end) if latest_end is not None else '--',
     }
 
 
@@ -793,11 +765,6 @@ def get_member_config_unified(
         ConfigError: 严格模式下索引越界时抛出
     """
     members = config.get('members', [])
-    MAX_MEMBERS = 3
-
-    # 限制最大成员数
-    if len(members) > MAX_MEMBERS:
-        members = members[:MAX_MEMBERS]
 
     if not members:
         raise ConfigError("config.json 中未配置任何成员")
@@ -1058,10 +1025,8 @@ def validate_config_schema(config: dict) -> list:
 
     if len(members) == 0:
         errors.append("至少需要配置 1 个成员")
-    if len(members) > 3:
-        errors.append(f"成员数量 {len(members)} 超过最大限制 3")
 
-    for i, member in enumerate(members[:3]):
+    for i, member in enumerate(members):
         if not isinstance(member, dict):
             errors.append(f"members[{i}] 必须是对象")
             continue
@@ -1098,15 +1063,15 @@ def validate_config_schema(config: dict) -> list:
                 errors.append(f"members[{i}].weight_kg 值 {weight_kg} 超出正常范围 (10-400 kg)")
 
     # 检查成员名唯一性
-    member_names = []
-    safe_names = []
-    for i, member in enumerate(members[:3]):
+    member_names = set()
+    safe_names = set()
+    for i, member in enumerate(members):
         if isinstance(member, dict):
             name = member.get('name', '')
             if name:
                 if name in member_names:
                     errors.append(f"members[{i}].name '{name}' 与其他成员重复")
-                member_names.append(name)
+                member_names.add(name)
 
                 # 检查 safe_member_name 冲突，避免输出文件名互相覆盖
                 safe_name = safe_member_name(name)
@@ -1114,7 +1079,7 @@ def validate_config_schema(config: dict) -> list:
                     errors.append(
                         f"members[{i}].name '{name}' 转换后的安全名 '{safe_name}' 与其他成员冲突，请修改成员名称"
                     )
-                safe_names.append(safe_name)
+                safe_names.add(safe_name)
 
     # language
     language = config.get('language', 'CN')
@@ -1657,50 +1622,313 @@ CATEGORY_LABELS = {
 }
 
 # 32项指标定义
+# V6.1.0: source = 导出文件中的源指标名，agg = 聚合方式（sum/mean/min/max/count），
+#         convert = 聚合后的单位换算（见 METRIC_CONVERSIONS）；睡眠指标来自睡眠解析，无 source
 METRIC_DEFS = {
     # 核心健康（10）
-    "hrv": {"category": "core_health", "importance": 10, "ai_key": "hrv", "label_cn": "HRV", "label_en": "HRV"},
-    "resting_hr": {"category": "core_health", "importance": 10, "ai_key": "resting_hr", "label_cn": "静息心率", "label_en": "Resting HR"},
-    "heart_rate_avg": {"category": "core_health", "importance": 8, "ai_key": "heart_rate_avg", "label_cn": "平均心率", "label_en": "Avg Heart Rate"},
-    "steps": {"category": "core_health", "importance": 9, "ai_key": "steps", "label_cn": "步数", "label_en": "Steps"},
-    "distance": {"category": "core_health", "importance": 8, "ai_key": "distance", "label_cn": "行走距离", "label_en": "Walking Distance"},
-    "active_energy": {"category": "core_health", "importance": 9, "ai_key": "active_energy", "label_cn": "活动能量", "label_en": "Active Energy"},
-    "spo2": {"category": "core_health", "importance": 8, "ai_key": "spo2", "label_cn": "血氧饱和度", "label_en": "SpO2"},
-    "respiratory_rate": {"category": "core_health", "importance": 7, "ai_key": "respiratory", "label_cn": "呼吸率", "label_en": "Respiratory Rate"},
-    "apple_stand_time": {"category": "core_health", "importance": 6, "ai_key": "stand", "label_cn": "站立时间", "label_en": "Stand Time"},
-    "basal_energy_burned": {"category": "core_health", "importance": 5, "ai_key": "basal", "label_cn": "基础代谢", "label_en": "Basal Energy"},
+    "hrv": {"category": "core_health", "importance": 10, "ai_key": "hrv", "label_cn": "HRV", "label_en": "HRV", "source": "heart_rate_variability", "agg": "mean"},
+    "resting_hr": {"category": "core_health", "importance": 10, "ai_key": "resting_hr", "label_cn": "静息心率", "label_en": "Resting HR", "source": "resting_heart_rate", "agg": "mean"},
+    "heart_rate_avg": {"category": "core_health", "importance": 8, "ai_key": "heart_rate_avg", "label_cn": "平均心率", "label_en": "Avg Heart Rate", "source": "heart_rate", "agg": "mean"},
+    "steps": {"category": "core_health", "importance": 9, "ai_key": "steps", "label_cn": "步数", "label_en": "Steps", "source": "step_count", "agg": "sum"},
+    "distance": {"category": "core_health", "importance": 8, "ai_key": "distance", "label_cn": "行走距离", "label_en": "Walking Distance", "source": "walking_running_distance", "agg": "sum"},
+    "active_energy": {"category": "core_health", "importance": 9, "ai_key": "active_energy", "label_cn": "活动能量", "label_en": "Active Energy", "source": "active_energy", "agg": "sum", "convert": "kj_to_kcal"},
+    "spo2": {"category": "core_health", "importance": 8, "ai_key": "spo2", "label_cn": "血氧饱和度", "label_en": "SpO2", "source": "blood_oxygen_saturation", "agg": "mean", "convert": "percent"},
+    "respiratory_rate": {"category": "core_health", "importance": 7, "ai_key": "respiratory", "label_cn": "呼吸率", "label_en": "Respiratory Rate", "source": "respiratory_rate", "agg": "mean"},
+    "apple_stand_time": {"category": "core_health", "importance": 6, "ai_key": "stand", "label_cn": "站立时间", "label_en": "Stand Time", "source": "apple_stand_time", "agg": "sum"},
+    "basal_energy_burned": {"category": "core_health", "importance": 5, "ai_key": "basal", "label_cn": "基础代谢", "label_en": "Basal Energy", "source": "basal_energy_burned", "agg": "sum", "convert": "kj_to_kcal"},
 
     # 心肺能力（2）
-    "vo2_max": {"category": "cardio_fitness", "importance": 9, "ai_key": "vo2_max", "label_cn": "VO₂ Max", "label_en": "VO2 Max"},
-    "physical_effort": {"category": "cardio_fitness", "importance": 7, "ai_key": "physical_effort", "label_cn": "体力消耗率", "label_en": "Physical Effort"},
+    "vo2_max": {"category": "cardio_fitness", "importance": 9, "ai_key": "vo2_max", "label_cn": "VO₂ Max", "label_en": "VO2 Max", "source": "vo2_max", "agg": "mean"},
+    "physical_effort": {"category": "cardio_fitness", "importance": 7, "ai_key": "physical_effort", "label_cn": "体力消耗率", "label_en": "Physical Effort", "source": "physical_effort", "agg": "mean"},
 
     # 睡眠恢复（4）
     "sleep_total_hours": {"category": "sleep_recovery", "importance": 10, "ai_key": "sleep", "label_cn": "总睡眠时长", "label_en": "Total Sleep"},
     "sleep_deep_hours": {"category": "sleep_recovery", "importance": 8, "ai_key": "sleep_deep_hours", "label_cn": "深睡时长", "label_en": "Deep Sleep"},
     "sleep_rem_hours": {"category": "sleep_recovery", "importance": 8, "ai_key": "sleep_rem_hours", "label_cn": "REM时长", "label_en": "REM Sleep"},
-    "breathing_disturbances": {"category": "sleep_recovery", "importance": 7, "ai_key": "breathing_disturbances", "label_cn": "呼吸紊乱", "label_en": "Breathing Disturbances"},
+    "breathing_disturbances": {"category": "sleep_recovery", "importance": 7, "ai_key": "breathing_disturbances", "label_cn": "呼吸紊乱", "label_en": "Breathing Disturbances", "source": "breathing_disturbances", "agg": "mean"},
 
     # 活动与机能（4）
-    "apple_exercise_time": {"category": "activity_mobility", "importance": 8, "ai_key": "apple_exercise_time", "label_cn": "锻炼时间", "label_en": "Exercise Time"},
-    "flights_climbed": {"category": "stairs_strength", "importance": 6, "ai_key": "flights", "label_cn": "爬楼层数", "label_en": "Flights Climbed"},
-    "apple_stand_hour": {"category": "activity_mobility", "importance": 5, "ai_key": "apple_stand_hour", "label_cn": "站立小时数", "label_en": "Stand Hours"},
-    "stair_speed_up": {"category": "stairs_strength", "importance": 5, "ai_key": "stair_speed_up", "label_cn": "上楼速度", "label_en": "Stair Speed Up"},
+    "apple_exercise_time": {"category": "activity_mobility", "importance": 8, "ai_key": "apple_exercise_time", "label_cn": "锻炼时间", "label_en": "Exercise Time", "source": "apple_exercise_time", "agg": "sum"},
+    "flights_climbed": {"category": "stairs_strength", "importance": 6, "ai_key": "flights", "label_cn": "爬楼层数", "label_en": "Flights Climbed", "source": "flights_climbed", "agg": "sum"},
+    "apple_stand_hour": {"category": "activity_mobility", "importance": 5, "ai_key": "apple_stand_hour", "label_cn": "站立小时数", "label_en": "Stand Hours", "source": "apple_stand_hour", "agg": "sum"},
+    "stair_speed_up": {"category": "stairs_strength", "importance": 5, "ai_key": "stair_speed_up", "label_cn": "上楼速度", "label_en": "Stair Speed Up", "source": "stair_speed_up", "agg": "mean"},
 
     # 高级跑步（5）
-    "running_speed": {"category": "running_advanced", "importance": 8, "ai_key": "running_speed", "label_cn": "跑步速度", "label_en": "Running Speed"},
-    "running_power": {"category": "running_advanced", "importance": 8, "ai_key": "running_power", "label_cn": "跑步功率", "label_en": "Running Power"},
-    "running_stride_length": {"category": "running_advanced", "importance": 7, "ai_key": "running_stride_length", "label_cn": "跑步步幅", "label_en": "Running Stride Length"},
-    "running_ground_contact_time": {"category": "running_advanced", "importance": 7, "ai_key": "running_ground_contact_time", "label_cn": "触地时间", "label_en": "Ground Contact Time"},
-    "running_vertical_oscillation": {"category": "running_advanced", "importance": 6, "ai_key": "running_vertical_oscillation", "label_cn": "垂直振幅", "label_en": "Vertical Oscillation"},
+    "running_speed": {"category": "running_advanced", "importance": 8, "ai_key": "running_speed", "label_cn": "跑步速度", "label_en": "Running Speed", "source": "running_speed", "agg": "mean", "convert": "speed_kmh"},
+    "running_power": {"category": "running_advanced", "importance": 8, "ai_key": "running_power", "label_cn": "跑步功率", "label_en": "Running Power", "source": "running_power", "agg": "mean"},
+    "running_stride_length": {"category": "running_advanced", "importance": 7, "ai_key": "running_stride_length", "label_cn": "跑步步幅", "label_en": "Running Stride Length", "source": "running_stride_length", "agg": "mean"},
+    "running_ground_contact_time": {"category": "running_advanced", "importance": 7, "ai_key": "running_ground_contact_time", "label_cn": "触地时间", "label_en": "Ground Contact Time", "source": "running_ground_contact_time", "agg": "mean"},
+    "running_vertical_oscillation": {"category": "running_advanced", "importance": 6, "ai_key": "running_vertical_oscillation", "label_cn": "垂直振幅", "label_en": "Vertical Oscillation", "source": "running_vertical_oscillation", "agg": "mean"},
 
     # 步行步态（5）
-    "walking_speed": {"category": "walking_gait", "importance": 6, "ai_key": "walking_speed", "label_cn": "步行速度", "label_en": "Walking Speed"},
-    "walking_step_length": {"category": "walking_gait", "importance": 6, "ai_key": "walking_step_length", "label_cn": "步行步长", "label_en": "Walking Step Length"},
-    "walking_heart_rate_average": {"category": "walking_gait", "importance": 5, "ai_key": "walking_heart_rate_average", "label_cn": "步行心率", "label_en": "Walking HR Avg"},
-    "walking_asymmetry_percentage": {"category": "walking_gait", "importance": 5, "ai_key": "walking_asymmetry_percentage", "label_cn": "步行不对称性", "label_en": "Walking Asymmetry"},
-    "walking_double_support_percentage": {"category": "walking_gait", "importance": 4, "ai_key": "walking_double_support_percentage", "label_cn": "双支撑时间占比", "label_en": "Double Support %"},
+    "walking_speed": {"category": "walking_gait", "importance": 6, "ai_key": "walking_speed", "label_cn": "步行速度", "label_en": "Walking Speed", "source": "walking_speed", "agg": "mean", "convert": "speed_kmh"},
+    "walking_step_length": {"category": "walking_gait", "importance": 6, "ai_key": "walking_step_length", "label_cn": "步行步长", "label_en": "Walking Step Length", "source": "walking_step_length", "agg": "mean", "convert": "length_cm"},
+    "walking_heart_rate_average": {"category": "walking_gait", "importance": 5, "ai_key": "walking_heart_rate_average", "label_cn": "步行心率", "label_en": "Walking HR Avg", "source": "walking_heart_rate_average", "agg": "mean"},
+    "walking_asymmetry_percentage": {"category": "walking_gait", "importance": 5, "ai_key": "walking_asymmetry_percentage", "label_cn": "步行不对称性", "label_en": "Walking Asymmetry", "source": "walking_asymmetry_percentage", "agg": "mean"},
+    "walking_double_support_percentage": {"category": "walking_gait", "importance": 4, "ai_key": "walking_double_support_percentage", "label_cn": "双支撑时间占比", "label_en": "Double Support %", "source": "walking_double_support_percentage", "agg": "mean"},
 
     # 环境暴露（2）
-    "headphone_audio_exposure": {"category": "environment_audio", "importance": 5, "ai_key": "headphone_audio_exposure", "label_cn": "耳机音频暴露", "label_en": "Headphone Exposure"},
-    "environmental_audio_exposure": {"category": "environment_audio", "importance": 3, "ai_key": "environmental_audio_exposure", "label_cn": "环境音频暴露", "label_en": "Environmental Exposure"},
+    "headphone_audio_exposure": {"category": "environment_audio", "importance": 5, "ai_key": "headphone_audio_exposure", "label_cn": "耳机音频暴露", "label_en": "Headphone Exposure", "source": "headphone_audio_exposure", "agg": "mean"},
+    "environmental_audio_exposure": {"category": "environment_audio", "importance": 3, "ai_key": "environmental_audio_exposure", "label_cn": "环境音频暴露", "label_en": "Environmental Exposure", "source": "environmental_audio_exposure", "agg": "mean"},
 }
+
+
+# ============ V6.1.0: 指标聚合计划 ============
+# 日报 load_data 与 extract_daily_data 共用：由 METRIC_DEFS 生成，每个源指标只切片一次
+
+# 评分 / 健康预警 / 日缓存始终需要的指标，即使未被 report_metrics.selected 选中也要聚合
+REQUIRED_METRIC_KEYS = (
+    'hrv', 'resting_hr', 'steps', 'distance', 'active_energy', 'spo2',
+    'respiratory_rate', 'apple_stand_time', 'apple_stand_hour',
+)
+
+
+def convert_length_to_cm(v: float, unit: str) -> float:
+    """长度单位转换为厘米"""
+    if v is None:
+        return None
+    if unit in ('m', 'meter', 'meters'):
+        return v * 100.0
+    return v
+
+
+def convert_speed_to_kmh(v: float, unit: str) -> float:
+    """速度单位转换为 km/h"""
+    if v is None:
+        return None
+    if unit in ('m/s', 'meter/s', 'meters/s'):
+        return v * 3.6
+    return v
+
+
+METRIC_CONVERSIONS = {
+    'kj_to_kcal': lambda v, unit: v / KJ_TO_KCAL,            # 能量源数据通常是 kJ
+    'percent': lambda v, unit: v if v > 1 else v * 100,      # 血氧智能单位（0-1 小数或百分比）
+    'length_cm': convert_length_to_cm,
+    'speed_kmh': convert_speed_to_kmh,
+}
+
+_AGGREGATORS = {
+    'sum': lambda vals: sum(vals),
+    'mean': lambda vals: sum(vals) / len(vals),
+    'min': min,
+    'max': max,
+    'count': len,
+}
+
+
+@dataclass(frozen=True)
+class MetricAggregation:
+    """聚合计划中的一项：METRIC_DEFS 键 <- 源指标 + 聚合方式 + 单位换算"""
+    key: str
+    source: str
+    agg: str = 'mean'
+    convert: Optional[str] = None
+
+
+def build_aggregation_plan(selected: Optional[List[str]] = None) -> List[MetricAggregation]:
+    """由 METRIC_DEFS 生成聚合计划
+
+    参数:
+        selected: 需要的指标键；None 表示全部。REQUIRED_METRIC_KEYS 总是包含在内
+    """
+    wanted = None if selected is None else set(selected) | set(REQUIRED_METRIC_KEYS)
+    plan = []
+    for key, metric_def in METRIC_DEFS.items():
+        source = metric_def.get('source')
+        if not source or (wanted is not None and key not in wanted):
+            continue
+        plan.append(MetricAggregation(key, source, metric_def.get('agg', 'mean'), metric_def.get('convert')))
+    return plan
+
+
+def evaluate_aggregation_plan(plan: List[MetricAggregation], columns: Dict[str, Any],
+                              date_str: str = None) -> Dict[str, tuple]:
+    """在列式指标（{源指标名: MetricColumns}）上执行聚合计划
+
+    参数:
+        date_str: 只聚合该日样本；None 表示整个文件
+
+    返回:
+        {METRIC_DEFS 键: (值, 样本数)}；无样本时值为 None
+    """
+    results = {}
+    for item in plan:
+        col = columns.get(item.source)
+        vals = col.values(date_str) if col is not None else ()
+        if not vals:
+            results[item.key] = (None, 0)
+            continue
+        value = _AGGREGATORS[item.agg](vals)
+        if item.convert:
+            value = METRIC_CONVERSIONS[item.convert](value, col.unit.strip().lower())
+        results[item.key] = (value, len(vals))
+    return results
+
+
+# ============ V6.1.0: 目录索引 ============
+
+# 目录 mtime 距扫描时间小于该值时不信任（部分文件系统 mtime 精度为秒）
+_DIR_INDEX_SETTLE_NS = 2_000_000_000
+_DATE_IN_NAME = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+class DirectoryIndex:
+    """单个目录的文件名索引
+
+    一次 os.scandir 建立 {文件名} 与 {日期: [文件名]} 索引，此后的存在性判断、
+    日期查找和通配匹配都在内存中完成；每次查询只 stat 目录本身，目录 mtime 变化
+    （新增/删除/重命名文件）时重新扫描。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path).expanduser()
+        self._mtime_ns: Optional[int] = None
+        self._stable = False
+        self._names: frozenset = frozenset()
+        self._by_date: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        with self._lock:
+            if self._stable and mtime_ns is not None and mtime_ns == self._mtime_ns:
+                return
+            names = set()
+            if mtime_ns is not None:
+                try:
+                    with os.scandir(self.path) as it:
+                        for entry in it:
+                            try:
+                                if entry.is_file():
+                                    names.add(entry.name)
+                            except OSError:
+                                continue
+                except OSError:
+                    names = set()
+            by_date: Dict[str, List[str]] = {}
+            for name in sorted(names):
+                match = _DATE_IN_NAME.search(name)
+                if match:
+                    by_date.setdefault(match.group(0), []).append(name)
+            self._names = frozenset(names)
+            self._by_date = by_date
+            self._mtime_ns = mtime_ns
+            self._stable = mtime_ns is not None and time.time_ns() - mtime_ns > _DIR_INDEX_SETTLE_NS
+
+    def exists(self, name: str) -> bool:
+        self._refresh()
+        return name in self._names
+
+    def names(self) -> frozenset:
+        self._refresh()
+        return self._names
+
+    def files_for_date(self, date_str: str) -> List[Path]:
+        """文件名中含该日期（YYYY-MM-DD）的全部文件"""
+        self._refresh()
+        return [self.path / name for name in self._by_date.get(date_str, [])]
+
+    def match(self, pattern: str) -> List[Path]:
+        """与 Path.glob(pattern) 等价的单层通配匹配（区分大小写，按文件名排序）"""
+        self._refresh()
+        if not any(ch in pattern for ch in '*?['):
+            return [self.path / pattern] if pattern in self._names else []
+        return [self.path / name for name in sorted(self._names) if fnmatch.fnmatchcase(name, pattern)]
+
+
+_dir_indexes: Dict[str, DirectoryIndex] = {}
+_dir_indexes_lock = threading.Lock()
+
+
+def directory_index(path: Union[str, Path]) -> DirectoryIndex:
+    """获取目录索引（进程内按绝对路径复用）"""
+    key = os.path.abspath(os.path.expanduser(str(path)))
+    with _dir_indexes_lock:
+        index = _dir_indexes.get(key)
+        if index is None:
+            index = _dir_indexes[key] = DirectoryIndex(key)
+        return index
+
+
+def find_existing_file(candidates: List[Union[str, Path]]) -> Optional[Path]:
+    """按顺序返回第一个存在的文件（通过所在目录的索引判断，不逐个 stat）"""
+    for candidate in candidates:
+        candidate = Path(candidate).expanduser()
+        if directory_index(candidate.parent).exists(candidate.name):
+            return candidate
+    return None
+
+
+# ============ V6.1.0: 原子写入与成员锁 ============
+
+LOCK_DIRNAME = '.locks'
+
+
+def _fsync_dir(path: Path) -> None:
+    """同步目录项，保证 rename 在断电后仍然生效（部分平台不支持打开目录，忽略）"""
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path: Union[str, Path], text: str, encoding: str = 'utf-8') -> None:
+    """原子写入：同目录临时文件 + fsync + rename，读者只会看到旧文件或完整的新文件"""
+    path = Path(path).expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 临时文件名带进程/线程号，多个写者互不覆盖；权限与普通 open() 创建的文件一致
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        with open(tmp, 'w', encoding=encoding) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(path.parent)
+
+
+def atomic_write_json(path: Union[str, Path], data: Any, **dump_kwargs) -> None:
+    """原子写入 JSON（参数同 json.dumps，默认 ensure_ascii=False）"""
+    dump_kwargs.setdefault('ensure_ascii', False)
+    atomic_write_text(path, json.dumps(data, **dump_kwargs))
+
+
+@contextmanager
+def member_lock(cache_dir: Union[str, Path], member_name: str, wait_message: bool = True):
+    """成员级建议锁（cache_dir/.locks/{成员}.lock，fcntl.flock 独占）
+
+    同一成员的缓存回填与日报写入串行执行；不同成员互不影响。锁随进程退出自动释放。
+    没有 fcntl 的平台上不加锁。
+    """
+    if not FCNTL_AVAILABLE:
+        yield
+        return
+    lock_path = Path(cache_dir).expanduser() / LOCK_DIRNAME / f'{safe_member_name(member_name)}.lock'
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a') as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if wait_message:
+                print(f"   ⏳ 等待成员锁: {member_name}（其他进程正在写入该成员缓存）", flush=True)
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
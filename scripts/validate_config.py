@@ -96,6 +96,9 @@ def main():
                 handle_error(ConfigError(f"找不到指定配置文件: {Path(args.config_path).expanduser()}"), "配置验证", exit_on_fatal=False)
                 return 1
             config = _load_config_from_path(config_path)
+            # V6.1.0: 合并独立成员注册表（与 load_config 一致）
+            from member_registry import apply_member_registry
+            apply_member_registry(config, config_path.parent)
         else:
             config_path = _find_config_path()
             config = load_config()
@@ -33,9 +33,9 @@ def verify():
     config = load_config()
     members = config.get('members', [])
     
-    # 检查所有成员（最多3位）
-    print(f"📋 发现 {len(members)} 个成员配置（最多检查3位）")
-    for idx, member in enumerate(members[:3]):
+    # 检查所有成员
+    print(f"📋 发现 {len(members)} 个成员配置")
+    for idx, member in enumerate(members):
         member_name = member.get('name', f'成员{idx+1}')
         health_dir_str = member.get('health_dir', '~/我的云端硬盘/Health Auto Export/Health Data')
         workout_dir_str = member.get('workout_dir', '~/我的云端硬盘/Health Auto Export/Workout Data')
@@ -0,0 +1,69 @@
+"""export_reader 流式解析：读块边界落在数字、字符串、字面量中间时结果与 json.load 一致"""
+
+import io
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import export_reader  # noqa: E402
+
+SAMPLES = [
+    ' [1.5,2]',
+    '[-0.25e+3, 12, 3E-2, 0, -7, true, null, false]',
+    '{"a": 1.125, "b": [10, 20.5], "c": "x,y", "d": {"e": -1e5}}',
+]
+
+DOC = {
+    'data': {
+        'metrics': [
+            {'name': 'heart_rate', 'units': 'count/min',
+             'data': [{'date': '2026-03-01 08:00:00 +0800', 'qty': 61.25},
+                      {'date': '2026-03-01 08:01:00 +0800', 'qty': 1.5e2},
+                      {'date': '2026-03-01 08:02:00 +0800', 'qty': 72}]},
+            {'name': 'step_count', 'units': 'count', 'data': [{'date': '2026-03-01', 'qty': 12345.678}]},
+        ],
+        'workouts': [{'name': 'Run', 'duration': 1805.5, 'avgHeartRate': {'qty': 151.75}}],
+    },
+}
+
+
+class TokenStreamChunkTest(unittest.TestCase):
+    def setUp(self):
+        self._chunk = export_reader._STREAM_CHUNK_CHARS
+
+    def tearDown(self):
+        export_reader._STREAM_CHUNK_CHARS = self._chunk
+
+    def test_value_across_every_chunk_size(self):
+        for text in SAMPLES:
+            for size in range(1, len(text) + 1):
+                export_reader._STREAM_CHUNK_CHARS = size
+                ts = export_reader._TokenStream(io.StringIO(text))
+                self.assertEqual(ts.value(), json.loads(text), (text, size))
+
+    def test_array_items_across_every_chunk_size(self):
+        text = ' [1.5,2,-3e1,4.25]'
+        for size in range(1, len(text) + 1):
+            export_reader._STREAM_CHUNK_CHARS = size
+            ts = export_reader._TokenStream(io.StringIO(text))
+            self.assertEqual([ts.value() for _ in ts.iter_array()], [1.5, 2, -30.0, 4.25], size)
+
+    def test_stream_export_matches_json_load(self):
+        text = json.dumps(DOC)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'HealthAutoExport-2026-03-01.json'
+            path.write_text(text, encoding='utf-8')
+            for size in (1, 2, 3, 4, 7, 16, 64):
+                export_reader._STREAM_CHUNK_CHARS = size
+                doc = export_reader.stream_export(path)
+                for metric in doc['data']['metrics']:
+                    metric.pop('summary', None)
+                self.assertEqual(doc, DOC, size)
+
+
+if __name__ == '__main__':
+    unittest.main()
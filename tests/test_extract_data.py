@@ -0,0 +1,76 @@
+"""extract_data_v5.extract_daily_data：输出格式与逐点心率保持源文件原样"""
+
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import extract_data_v5  # noqa: E402
+from export_reader import clear_export_cache  # noqa: E402
+
+DATE = '2024-05-01'
+
+HEART_RATE = [
+    {'date': f'{DATE} 09:30:00 +0800', 'qty': 88},
+    {'date': f'{DATE}T08:15:00+08:00', 'qty': 72.5},
+    {'startDate': f'{DATE} 18:05:00 +0800', 'qty': 151},
+    {'date': f'{DATE} 07:00:00 +0800', 'qty': None},
+]
+
+
+def _export(metrics):
+    return {'data': {'metrics': metrics + [{'name': 'sleep_analysis', 'units': 'hr', 'data': []}],
+                     'workouts': []}}
+
+
+class ExtractDailyDataTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.health_dir = Path(self._tmp.name)
+        clear_export_cache()
+
+    def tearDown(self):
+        clear_export_cache()
+        self._tmp.cleanup()
+
+    def _extract(self, metrics, config=None):
+        path = self.health_dir / f'HealthAutoExport-{DATE}.json'
+        path.write_text(json.dumps(_export(metrics)), encoding='utf-8')
+        config = config or {}
+        with mock.patch('utils.load_config', return_value=config), \
+                mock.patch.object(extract_data_v5, 'load_config', return_value=config), \
+                mock.patch('sys.stderr'):
+            return extract_data_v5.extract_daily_data(DATE, self.health_dir, self.health_dir, {'age': 35})
+
+    def test_heart_rate_data_keeps_source_timestamps_and_order(self):
+        expected = [{'timestamp': f'{DATE} 09:30:00 +0800', 'hr': 88},
+                    {'timestamp': f'{DATE}T08:15:00+08:00', 'hr': 72.5},
+                    {'timestamp': f'{DATE} 18:05:00 +0800', 'hr': 151}]
+        metrics = [{'name': 'heart_rate', 'units': 'count/min', 'data': HEART_RATE}]
+        self.assertEqual(self._extract(metrics)['heart_rate_data'], expected)
+        # 流式读取大文件时输出相同
+        clear_export_cache()
+        self.assertEqual(self._extract(metrics, {'export_stream_threshold_mb': 0})['heart_rate_data'], expected)
+
+    def test_output_independent_of_report_selection_and_in_source_units(self):
+        metrics = [
+            {'name': 'walking_step_length', 'units': 'm', 'data': [{'date': f'{DATE} 10:00:00 +0800', 'qty': 0.72}]},
+            {'name': 'walking_speed', 'units': 'm/s', 'data': [{'date': f'{DATE} 10:00:00 +0800', 'qty': 1.25}]},
+            {'name': 'running_speed', 'units': 'm/s', 'data': [{'date': f'{DATE} 18:00:00 +0800', 'qty': 3.1}]},
+            {'name': 'vo2_max', 'units': 'ml/(kg·min)', 'data': [{'date': f'{DATE} 18:00:00 +0800', 'qty': 44.2}]},
+        ]
+        result = self._extract(metrics)
+        self.assertEqual((result['walking_step_length'], result['walking_speed'], result['running_speed']),
+                         (0.7, 1.25, 3.1))
+        clear_export_cache()
+        selected = self._extract(metrics, {'report_metrics': {'selected': ['hrv', 'steps']}})
+        self.assertEqual(selected, result)
+        self.assertEqual(selected['vo2_max'], 44.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
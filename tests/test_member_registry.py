@@ -0,0 +1,50 @@
+"""member_registry.map_members：任务异常与工作进程崩溃只影响对应成员"""
+
+import os
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from member_registry import map_members  # noqa: E402
+
+
+def _job(idx, mode):
+    if mode == 'crash':
+        os._exit(3)
+    if mode == 'raise':
+        raise ValueError(f'member {idx}')
+    return idx * 10
+
+
+class MapMembersTest(unittest.TestCase):
+    def _run(self, modes, workers=3, shard_size=4, processes=True):
+        jobs = [(idx, mode) for idx, mode in enumerate(modes)]
+        return [(args[0], result, error)
+                for args, result, error in map_members(_job, jobs, workers, shard_size, processes=processes)]
+
+    def test_results_in_input_order(self):
+        for processes in (True, False):
+            results = self._run(['ok'] * 9, processes=processes)
+            self.assertEqual(results, [(idx, idx * 10, None) for idx in range(9)])
+
+    def test_exception_only_fails_that_member(self):
+        results = self._run(['ok', 'raise', 'ok', 'ok', 'ok'])
+        self.assertEqual([error is None for _, _, error in results], [True, False, True, True, True])
+        self.assertIn('ValueError', results[1][2])
+
+    def test_crashed_worker_only_fails_that_member(self):
+        modes = ['ok', 'ok', 'crash', 'ok', 'ok', 'ok', 'ok', 'crash', 'ok', 'ok']
+        results = self._run(modes)
+        self.assertEqual([idx for idx, _, _ in results], list(range(len(modes))))
+        for idx, result, error in results:
+            if modes[idx] == 'crash':
+                self.assertIsNone(result)
+                self.assertIn('BrokenProcessPool', error)
+            else:
+                self.assertEqual((result, error), (idx * 10, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""rescore.rescore_member：缓存回填后立即重算，评分与睡眠债不变"""
+
+import contextlib
+import io
+import random
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from generate_cache_only import generate_cache_for_date  # noqa: E402
+from health_score import HealthScoreHistory  # noqa: E402
+from history_store import open_history_store  # noqa: E402
+from rescore import rescore_member  # noqa: E402
+
+FIRST_DAY = datetime(2026, 3, 1)
+DAYS = 5
+
+
+def _date(n):
+    return (FIRST_DAY + timedelta(days=n)).strftime('%Y-%m-%d')
+
+
+def _heart_rate_data(rng, date_str):
+    """全天每 5 分钟一个心率样本，傍晚有一段中高强度活动"""
+    start = datetime.strptime(date_str, '%Y-%m-%d').replace(hour=7)
+    samples = []
+    for i in range(12 * 14):
+        ts = start + timedelta(minutes=5 * i)
+        hr = rng.randint(130, 175) if 17 <= ts.hour < 18 else rng.randint(62, 105)
+        samples.append({'timestamp': ts.strftime('%Y-%m-%d %H:%M:%S'), 'hr': hr})
+    return samples
+
+
+def _extracted(rng, n, with_workout):
+    """阶段 1 提取结果：没有运动区间（zone_times 全零），Strain 只能由全天心率得到"""
+    date_str = _date(n)
+    workouts = []
+    if with_workout:
+        workouts = [{'type': 'Walking', 'name': 'Walking', 'duration_min': 30.0, 'energy_kcal': 120.0,
+                     'avg_hr': 105.0, 'max_hr': 120.0}]
+    return {
+        'date': date_str,
+        'hrv': {'value': round(rng.uniform(30, 70), 1)},
+        'resting_hr': {'value': rng.randint(55, 65)},
+        'respiratory_rate': None,
+        'steps': rng.randint(4000, 12000),
+        'active_energy': round(rng.uniform(200, 600), 1),
+        'workouts': workouts,
+        'has_workout': with_workout,
+        'heart_rate_data': _heart_rate_data(rng, date_str),
+        'sleep': {'total_hours': round(rng.uniform(5.5, 8.5), 2)},
+        'bedtime': '23:10',
+        'waketime': '06:50',
+        'sleep_latency_min': 15,
+    }
+
+
+class RescoreAfterBackfillTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.member = {'name': '测试成员', 'age': 38, 'gender': 'male'}
+        self.config = {'members': [self.member], 'cache_dir': self._tmp.name}
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _backfill(self, with_workout):
+        rng = random.Random(24)
+        cache_dir = Path(self._tmp.name)
+        history = HealthScoreHistory(cache_dir, store=open_history_store(self.config, cache_dir))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for n in range(DAYS):
+                self.assertTrue(generate_cache_for_date(_date(n), 0, self.member['name'], self.config, history,
+                                                        data=_extracted(rng, n, with_workout)))
+
+    def _rescore(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return rescore_member(self.member, self.member['name'], self.config, _date(0), _date(DAYS - 1),
+                                  dry_run=True)
+
+    def test_days_without_workouts_unchanged(self):
+        self._backfill(with_workout=False)
+        store = open_history_store(self.config, Path(self._tmp.name))
+        for n in range(DAYS):
+            # 全天心率样本不写入缓存，Strain 用到的心率区间随缓存保存
+            doc = store.get(_date(n), self.member['name'])
+            self.assertNotIn('heart_rate_data', doc)
+            self.assertGreater(sum(doc['hr_zone_times'].values()), 0)
+        diff = self._rescore()
+        self.assertEqual(diff['days'], DAYS)
+        self.assertEqual(diff['changed'], 0, diff['fields'])
+
+    def test_days_with_workouts_unchanged(self):
+        self._backfill(with_workout=True)
+        self.assertEqual(self._rescore()['changed'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
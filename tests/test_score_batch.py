@@ -0,0 +1,105 @@
+"""score_batch.calculate_all_scores_batch：与按日期顺序逐天调用 calculate_all_scores 的结果逐位一致"""
+
+import random
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import score_batch  # noqa: E402
+from generate_cache_only import score_cache_fields  # noqa: E402
+from health_score import HealthScoreHistory, calculate_all_scores  # noqa: E402
+from history_store import open_history_store  # noqa: E402
+
+MEMBER = {'name': '测试成员', 'age': 41, 'gender': 'female'}
+FIRST_DAY = datetime(2024, 3, 1)
+DAYS = 60
+SCORED_FROM = 25  # 前 25 天只作为回看历史
+
+
+def _date(n):
+    return (FIRST_DAY + timedelta(days=n)).strftime('%Y-%m-%d')
+
+
+def _make_doc(rng, n):
+    """一天的缓存摘要：部分天缺少 HRV / 呼吸率 / 入睡时间 / 运动或已有评分"""
+    total = round(rng.uniform(3.5, 9.5), 2)
+    zone_times = {f'zone_{z}': 0.0 for z in range(1, 6)}
+    workouts = []
+    if rng.random() < 0.6:
+        zone_times = {f'zone_{z}': round(rng.uniform(0, 25), 1) for z in range(1, 6)}
+        workouts = [{'type': 'Running', 'name': 'Running', 'duration_min': 40.0, 'energy_kcal': 350.0,
+                     'avg_hr': round(rng.uniform(110, 165)), 'max_hr': 178.0}]
+    doc = {
+        'date': _date(n),
+        'member': MEMBER['name'],
+        'hrv': {'value': None if rng.random() < 0.08 else round(rng.uniform(20, 90), 2)},
+        'resting_hr': {'value': None if rng.random() < 0.05 else rng.randint(50, 72)},
+        'respiratory_rate': round(rng.uniform(11, 19), 1) if rng.random() < 0.6 else None,
+        'steps': rng.choice([0, rng.randint(2000, 18000)]),
+        'active_energy': round(rng.uniform(100, 900), 1),
+        'workouts': workouts,
+        'zone_times': zone_times,
+        'sleep': {'total_hours': total, 'awake_hours': round(rng.uniform(0, 2), 2)},
+        'bedtime': rng.choice(['--', '21:30', '22:10', '23:00', '23:55', '00:40', '02:30']),
+        'waketime': rng.choice(['--', '06:00', '06:30', '07:15', '08:40']),
+        'sleep_latency_min': rng.choice([5, 15, 25, 45, 90]),
+    }
+    if rng.random() < 0.9:
+        doc['health_scores'] = {'strain': round(rng.uniform(4, 18), 1), 'sleep_need': round(rng.uniform(6.5, 9), 1),
+                                'body_age': 40.0, 'pace_of_aging': 0.0}
+    return doc
+
+
+class BatchEquivalenceTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._tmp.name)
+        self.store = open_history_store({}, self.cache_dir)
+        rng = random.Random(23)
+        for n in range(DAYS):
+            if rng.random() < 0.05:
+                continue  # 缺失的日期
+            self.store.put(_date(n), MEMBER['name'], _make_doc(rng, n))
+        self.dates = [_date(n) for n in range(SCORED_FROM, DAYS)]
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _sequential(self):
+        """rescore 逐天评分的路径：按日期顺序评分，写回的评分供后一天读取"""
+        history = HealthScoreHistory(self.cache_dir, store=self.store)
+        results = {}
+        for date_str in self.dates:
+            doc = self.store.get(date_str, MEMBER['name'])
+            if not doc:
+                continue
+            # 与首次回填一致：评分当天时该天的缓存尚未写入
+            history.remember(date_str, MEMBER['name'], None)
+            scores = calculate_all_scores(doc, MEMBER, history, doc.get('zone_times', score_batch.ZERO_ZONE_TIMES))
+            legacy = score_batch.stored_legacy_strain(doc)
+            if legacy is not None:
+                scores['strain'], scores['zone_times'] = legacy
+            results[date_str] = scores
+            history.remember(date_str, MEMBER['name'], dict(doc, **score_cache_fields(doc, scores)))
+        return results
+
+    def _batch(self, use_numpy):
+        columns = score_batch.load_score_columns(self.store, MEMBER['name'], self.dates[0], self.dates[-1])
+        return score_batch.calculate_all_scores_batch(MEMBER, self.dates, columns, use_numpy=use_numpy)
+
+    def test_scalar_batch_matches_sequential(self):
+        expected = self._sequential()
+        self.assertGreater(len(expected), 30)
+        self.assertEqual(self._batch(use_numpy=False), expected)
+
+    @unittest.skipUnless(score_batch.NUMPY_AVAILABLE, "NumPy 未安装")
+    def test_numpy_batch_matches_sequential(self):
+        self.assertEqual(self._batch(use_numpy=None), self._sequential())
+
+
+if __name__ == '__main__':
+    unittest.main()